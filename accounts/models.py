@@ -89,6 +89,9 @@ class User(AbstractBaseUser, PermissionsMixin, TimeStampedModel):
 
     @property
     def active_ads(self) -> int:
+        # Querysets may precompute this as ``num_active_ads`` (see apiv1.manager.prefetch_user).
+        if 'num_active_ads' in self.__dict__:
+            return self.num_active_ads
         from django.db.models import Q
         from apiv1.models import Product
         return Product.objects.filter(
@@ -100,6 +103,8 @@ class User(AbstractBaseUser, PermissionsMixin, TimeStampedModel):
 
     @property
     def taken_ads(self) -> int:
+        if 'num_taken_ads' in self.__dict__:
+            return self.num_taken_ads
         from django.db.models import Q
         from apiv1.models import Product
         return Product.objects.filter(
@@ -1,8 +1,8 @@
 from django.contrib import admin
 from .models import (
-	ChatRoom, Message, Product, ProductImage, Category, SubCategory, Feature, ProductFeature, Review,
+	ChatRoom, ChatMembership, Message, Product, ProductImage, Category, SubCategory, Feature, ProductFeature, Review,
 	Coupon, CouponRedemption, Location, Feedback, Subscription, UserSubscription, Payment, AccountDeleteRequest,
-	Favourite, ProductLike, ProductReport,
+	Favourite, ProductLike, ProductReport, RelatedProduct,
 )
 
 # title and site header
@@ -24,12 +24,27 @@ class ChatRoomAdmin(admin.ModelAdmin):
 class MessageAdmin(admin.ModelAdmin):
 	list_display = ('id', 'room', 'sender', 'short_content', 'is_read', 'created_at')
 	search_fields = ('room__name', 'sender__email', 'sender__name', 'content')
-	list_filter = ('is_read', 'created_at')
+	list_filter = ('created_at',)
 	ordering = ('-created_at',)
 
+	def get_queryset(self, request):
+		return super().get_queryset(request).with_read_state()
+
 	def short_content(self, obj):
 		return (obj.content[:50] + '...') if len(obj.content) > 50 else obj.content
 
+	@admin.display(boolean=True, description='Read')
+	def is_read(self, obj):
+		return obj.is_read
+
+
+@admin.register(ChatMembership)
+class ChatMembershipAdmin(admin.ModelAdmin):
+	list_display = ('id', 'room', 'user', 'last_read_message_id', 'updated_at')
+	search_fields = ('room__name', 'user__email', 'user__name')
+	raw_id_fields = ('room', 'user')
+	ordering = ('-updated_at',)
+
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -173,3 +188,11 @@ class ProductReportAdmin(admin.ModelAdmin):
 	search_fields = ('product__name', 'product__pid', 'user__email', 'user__name', 'message')
 	list_filter = ('reason', 'created_at')
 	ordering = ('-created_at',)
+
+
+@admin.register(RelatedProduct)
+class RelatedProductAdmin(admin.ModelAdmin):
+	list_display = ('id', 'product', 'related', 'rank', 'score', 'updated_at')
+	search_fields = ('product__name', 'product__pid', 'related__name', 'related__pid')
+	raw_id_fields = ('product', 'related')
+	ordering = ('product', 'rank')
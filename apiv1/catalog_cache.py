@@ -0,0 +1,98 @@
+'''
+Response cache for anonymous product listings.
+
+Entries are keyed by a catalog *generation* number plus the normalised query
+parameters. Writes to products and the rows rendered with them bump the
+generation (see ``apiv1.signals``), which orphans every cached page at once;
+orphans simply expire after ``PRODUCT_LIST_CACHE_TTL``. Writes that bypass
+signals (queryset ``update()``) are only reflected once entries expire.
+'''
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+GENERATION_KEY = 'catalog:generation'
+HITS_KEY = 'catalog:list_cache:hits'
+MISSES_KEY = 'catalog:list_cache:misses'
+DEFAULT_TTL = 300
+
+
+def cache_ttl() -> int:
+    return getattr(settings, 'PRODUCT_LIST_CACHE_TTL', DEFAULT_TTL)
+
+
+def get_generation() -> int:
+    '''Return the current catalog generation, creating it if missing.'''
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Seed from the clock so a reset (eviction, restart) never reuses an
+        # old generation whose entries might still be cached.
+        cache.add(GENERATION_KEY, int(time.time() * 1000), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation() -> None:
+    '''Invalidate every cached listing.'''
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        get_generation()
+
+
+def list_cache_key(request, generation=None, scope='') -> str:
+    '''Build the cache key for a listing request.
+
+    Parameters are sorted and blank values dropped so equivalent URLs share
+    an entry; the host is included because paginated responses embed links.
+    ``scope`` separates audiences that see different product sets.
+    '''
+    if generation is None:
+        generation = get_generation()
+    params = sorted(
+        (key, value)
+        for key in request.query_params
+        for value in request.query_params.getlist(key)
+        if value != ''
+    )
+    raw = '|'.join([request.get_host(), request.path, str(scope), *(f'{k}={v}' for k, v in params)])
+    digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    return f'catalog:list:{generation}:{digest}'
+
+
+def _count(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_cached_list(key: str):
+    data = cache.get(key)
+    _count(MISSES_KEY if data is None else HITS_KEY)
+    return data
+
+
+def set_cached_list(key: str, data) -> None:
+    cache.set(key, data, timeout=cache_ttl())
+
+
+def cache_stats() -> dict:
+    hits = cache.get(HITS_KEY) or 0
+    misses = cache.get(MISSES_KEY) or 0
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+        'generation': get_generation(),
+        'ttl': cache_ttl(),
+    }
+
+
+def reset_stats() -> None:
+    cache.delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,141 @@
+'''
+Chat room list and message history queries.
+
+The room list is built from a single annotated queryset: the user's unread
+counter and the last message come from correlated subqueries, the product is
+joined and the other members are prefetched, so a list costs the same handful
+of queries however many rooms the user is in.
+
+History is read in windows keyed on the message id: the latest
+``HISTORY_LIMIT`` messages, then older ones with ``before=<oldest id seen>``.
+'''
+
+from django.db.models import IntegerField, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import ChatMembership, ChatRoom, Message
+
+HISTORY_LIMIT = 50
+MAX_HISTORY_LIMIT = 200
+
+
+def chatroom_list_queryset(user, queryset=None):
+    '''Annotate ``queryset`` (default: the user's live rooms) for list rendering.
+
+    Adds ``unread_count``, ``last_message_*`` columns and ``other_members``
+    (members other than ``user``, as a list).
+    '''
+    from accounts.models import User
+
+    if queryset is None:
+        queryset = ChatRoom.objects.filter(members=user, is_deleted=False)
+
+    unread = ChatMembership.objects.filter(room=OuterRef('pk'), user=user).values('unread_count')[:1]
+    last = Message.objects.filter(room=OuterRef('pk')).order_by('-created_at', '-id')
+    return (
+        queryset
+        .select_related('product')
+        .annotate(
+            unread_count=Coalesce(Subquery(unread, output_field=IntegerField()), Value(0)),
+            last_message_id=Subquery(last.values('id')[:1]),
+            last_message_text=Subquery(last.values('content')[:1]),
+            last_message_is_media=Subquery(last.values('is_media')[:1]),
+            last_message_created_at=Subquery(last.values('created_at')[:1]),
+            last_message_sender=Subquery(last.values('sender__name')[:1]),
+        )
+        .prefetch_related(
+            Prefetch('members', queryset=User.objects.exclude(pk=user.pk).order_by('id'), to_attr='other_members')
+        )
+    )
+
+
+def chatroom_list_item(room) -> dict:
+    '''Render one room of ``chatroom_list_queryset`` for ChatRoomsConsumer.'''
+    data = {
+        'id': room.id,
+        'room_id': room.room_id,
+        'name': room.name,
+        'is_group': room.is_group,
+        'is_closed': room.is_closed,
+        'product_id': room.product.pid if room.product else '',
+        'ad_name': room.ad_name,
+        'ad_image': room.ad_image_url,
+        'unread': room.unread_count,
+        'created_at': room.created_at.isoformat(),
+    }
+
+    # Add other user for private chats
+    if not room.is_group:
+        other = room.other_members[0] if room.other_members else None
+        data['other_user'] = other.name if other else None
+        data['other_user_avatar'] = other.avatar.url if other and other.avatar else ''
+
+    if room.last_message_id is not None:
+        data['last_message'] = {
+            'text': room.last_message_text,
+            'is_media': room.last_message_is_media,
+            'created_at': room.last_message_created_at.isoformat(),
+            'sender': room.last_message_sender,
+        }
+    else:
+        data['last_message'] = None
+    return data
+
+
+def build_chatroom_list(user) -> list[dict]:
+    return [chatroom_list_item(room) for room in chatroom_list_queryset(user).order_by('id')]
+
+
+def history_params(before=None, limit=None):
+    '''Validate a history cursor; returns ``(before, limit)``.
+
+    Raises ``ValueError`` with a client-facing message on malformed input.
+    '''
+    if before in (None, ''):
+        before = None
+    else:
+        try:
+            before = int(before)
+        except (TypeError, ValueError):
+            raise ValueError('before must be a message id')
+    if limit in (None, ''):
+        limit = HISTORY_LIMIT
+    else:
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            raise ValueError('limit must be an integer')
+        if limit < 1:
+            raise ValueError('limit must be positive')
+    return before, min(limit, MAX_HISTORY_LIMIT)
+
+
+def message_window(room, before=None, limit=HISTORY_LIMIT, queryset=None):
+    '''Return ``(messages, has_more)`` for one page of ``room``'s history.
+
+    ``messages`` are the ``limit`` newest messages older than ``before``
+    (all messages when ``before`` is None), oldest first. ``queryset``
+    defaults to messages with their sender joined. ``has_more`` tells
+    whether anything older remains.
+    '''
+    if queryset is None:
+        queryset = Message.objects.with_read_state().select_related('sender')
+    qs = queryset.filter(room=room)
+    if before is not None:
+        qs = qs.filter(id__lt=before)
+    window = list(qs.order_by('-id')[:limit + 1])
+    has_more = len(window) > limit
+    return window[:limit][::-1], has_more
+
+
+def history_item(msg) -> dict:
+    '''Render one message for the chat consumers' ``chat_history`` frames.'''
+    return {
+        'id': msg.id,
+        'sender': msg.sender.name,
+        'email': msg.sender.email,
+        'content': msg.content,
+        'is_media': msg.is_media,
+        'is_read': msg.is_read,
+        'timestamp': msg.created_at.isoformat()
+    }
@@ -2,6 +2,8 @@ import json
 import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from . import unread
+from .chatlist import HISTORY_LIMIT, history_item, history_params, message_window
 from .models import ChatRoom
 
 logger = logging.getLogger(__name__)
@@ -18,6 +20,52 @@ def _coerce_bool(value) -> bool:
         return value.strip().lower() in {"1", "true", "t", "yes", "y", "on"}
     return bool(value)
 
+
+def chatrooms_group(user_id) -> str:
+    """Channel group of one user's chat-list sockets (see ChatRoomsConsumer)."""
+    return f'chatrooms_{user_id}'
+
+
+def room_update_events(room, message_id=None):
+    """Build the chat-list delta each member of ``room`` should receive.
+
+    Returns ``{user_id: event}``. Events carry the room's unread count for
+    that member and, when ``message_id`` is given, the new last message, so
+    ChatRoomsConsumer can patch its list without re-querying.
+    """
+    from .models import Message
+
+    unread_by_member = dict(room.memberships.values_list('user_id', 'unread_count'))
+
+    last_message = None
+    if message_id is not None:
+        msg = Message.objects.select_related('sender').filter(pk=message_id).first()
+        if msg is not None:
+            last_message = {
+                'text': msg.content,
+                'is_media': msg.is_media,
+                'created_at': msg.created_at.isoformat(),
+                'sender': msg.sender.name,
+            }
+
+    events = {}
+    for user_id, unread_count in unread_by_member.items():
+        event = {
+            'type': 'chatrooms_delta',
+            'room': room.pk,
+            'unread': unread_count,
+        }
+        if last_message is not None:
+            event['last_message'] = last_message
+        events[user_id] = event
+    return events
+
+
+async def send_room_updates(channel_layer, events):
+    for user_id, event in events.items():
+        await channel_layer.group_send(chatrooms_group(user_id), event)
+
+
 class NewChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         logger.info(f"Attempting to connect: {self.scope}")
@@ -52,6 +100,9 @@ class NewChatConsumer(AsyncWebsocketConsumer):
         await self.send_chat_history()
         # Mark all messages as read for the user
         await self.mark_all_messages_as_read()
+        await self.channel_layer.group_send(
+            chatrooms_group(self.user.id), {'type': 'chatrooms_delta', 'room': self.room.pk, 'unread': 0}
+        )
         # Notify all members' unread count groups (including self) after marking as read
         await self.notify_unread_count_groups()
 
@@ -128,6 +179,8 @@ class NewChatConsumer(AsyncWebsocketConsumer):
                     'username': self.user.email,
                 }
             )
+        elif message_type == 'history':
+            await self.send_history_page(data)
         elif message:  # Normal chat message
             # Save the message to the database
             saved = await self.save_message(self.room, self.user, message, is_media=is_media)
@@ -155,29 +208,31 @@ class NewChatConsumer(AsyncWebsocketConsumer):
                 }
             )
                
-            # Notify chatrooms_updates group to refresh chatrooms list
-            await self.channel_layer.group_send(
-                'chatrooms_updates',
-                {
-                    'type': 'chatrooms_update'
-                }
-            )
+            # Patch the chat lists of this room's members only
+            await send_room_updates(self.channel_layer, await self.get_room_updates(message_id))
             # Notify all members' unread count groups
             await self.notify_unread_count_groups()
 
     @database_sync_to_async
-    def get_member_ids(self):
+    def get_room_updates(self, message_id=None):
+        if not getattr(self, 'room', None):
+            return {}
+        return room_update_events(self.room, message_id)
+
+    @database_sync_to_async
+    def get_unread_totals(self):
         if not getattr(self, 'room', None):
-            return []
-        return list(self.room.members.values_list('id', flat=True))
+            return {}
+        return unread.totals(self.room.memberships.values_list('user_id', flat=True))
 
     async def notify_unread_count_groups(self):
-        member_ids = await self.get_member_ids()
-        for user_id in member_ids:
+        # Events carry each member's new total so UnreadCountConsumer needs no query.
+        totals = await self.get_unread_totals()
+        for user_id, count in totals.items():
             group_name = f'unread_count_{user_id}'
             await self.channel_layer.group_send(
                 group_name,
-                {'type': 'unread_count_update'}
+                {'type': 'unread_count_update', 'count': count}
             )
 
     @database_sync_to_async
@@ -224,31 +279,33 @@ class NewChatConsumer(AsyncWebsocketConsumer):
         }))
 
     @database_sync_to_async
-    def get_chat_history(self):
-        from .models import Message
+    def get_chat_history(self, before=None, limit=HISTORY_LIMIT):
         if not getattr(self, 'room', None):
-            return []
-        messages = Message.objects.filter(room=self.room).order_by('created_at')
-        return [
-            {
-                'id': msg.id,
-                'sender': msg.sender.name,
-                'email': msg.sender.email,
-                'content': msg.content,
-                'is_media': msg.is_media,
-                'is_read': msg.is_read,
-                'timestamp': msg.created_at.isoformat()
-            }
-            for msg in messages
-        ]
+            return [], False
+        messages, has_more = message_window(self.room, before, limit)
+        return [history_item(msg) for msg in messages], has_more
 
-    async def send_chat_history(self):
-        history = await self.get_chat_history()
+    async def send_chat_history(self, before=None, limit=HISTORY_LIMIT):
+        history, has_more = await self.get_chat_history(before, limit)
         await self.send(text_data=json.dumps({
             'type': 'chat_history',
-            'messages': history
+            'messages': history,
+            'before': before,
+            'has_more': has_more,
         }))
 
+    async def send_history_page(self, data):
+        try:
+            before, limit = history_params(data.get('before'), data.get('limit'))
+        except ValueError as exc:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'detail': str(exc),
+                'code': 'invalid_history_request',
+            }))
+            return
+        await self.send_chat_history(before, limit)
+
     @database_sync_to_async
     def mark_all_messages_as_read(self):
         if not getattr(self, 'room', None):
@@ -288,6 +345,9 @@ class TemChatConsumer(AsyncWebsocketConsumer):
 
         await self.send_chat_history()
         await self.mark_all_messages_as_read()
+        await self.channel_layer.group_send(
+            chatrooms_group(self.user.id), {'type': 'chatrooms_delta', 'room': self.room.pk, 'unread': 0}
+        )
         await self.notify_unread_count_groups()
 
     async def disconnect(self, close_code):
@@ -320,6 +380,9 @@ class TemChatConsumer(AsyncWebsocketConsumer):
                 }
             )
             return
+        if message_type == 'history':
+            await self.send_history_page(data)
+            return
 
         if message:
             # save and broadcast to room
@@ -347,11 +410,8 @@ class TemChatConsumer(AsyncWebsocketConsumer):
                 }
             )
 
-            # notify viewers of chatrooms list and unread counts
-            await self.channel_layer.group_send(
-                'chatrooms_updates',
-                {'type': 'chatrooms_update'}
-            )
+            # notify the members' chat lists and unread counts
+            await send_room_updates(self.channel_layer, await self.get_room_updates(message_id))
             await self.notify_unread_count_groups()
 
     @database_sync_to_async
@@ -449,44 +509,53 @@ class TemChatConsumer(AsyncWebsocketConsumer):
         }
 
     @database_sync_to_async
-    def get_chat_history(self):
-        from .models import Message
+    def get_chat_history(self, before=None, limit=HISTORY_LIMIT):
         if not getattr(self, 'room', None):
-            return []
-        messages = Message.objects.filter(room=self.room).order_by('created_at')
-        return [
-            {
-                'id': msg.id,
-                'sender': msg.sender.name,
-                'email': msg.sender.email,
-                'content': msg.content,
-                'is_media': msg.is_media,
-                'is_read': msg.is_read,
-                'timestamp': msg.created_at.isoformat()
-            }
-            for msg in messages
-        ]
+            return [], False
+        messages, has_more = message_window(self.room, before, limit)
+        return [history_item(msg) for msg in messages], has_more
 
-    async def send_chat_history(self):
-        history = await self.get_chat_history()
+    async def send_chat_history(self, before=None, limit=HISTORY_LIMIT):
+        history, has_more = await self.get_chat_history(before, limit)
         await self.send(text_data=json.dumps({
             'type': 'chat_history',
-            'messages': history
+            'messages': history,
+            'before': before,
+            'has_more': has_more,
         }))
 
+    async def send_history_page(self, data):
+        try:
+            before, limit = history_params(data.get('before'), data.get('limit'))
+        except ValueError as exc:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'detail': str(exc),
+                'code': 'invalid_history_request',
+            }))
+            return
+        await self.send_chat_history(before, limit)
+
+    @database_sync_to_async
+    def get_room_updates(self, message_id=None):
+        if not getattr(self, 'room', None):
+            return {}
+        return room_update_events(self.room, message_id)
+
     @database_sync_to_async
-    def get_member_ids(self):
+    def get_unread_totals(self):
         if not getattr(self, 'room', None):
-            return []
-        return list(self.room.members.values_list('id', flat=True))
+            return {}
+        return unread.totals(self.room.memberships.values_list('user_id', flat=True))
 
     async def notify_unread_count_groups(self):
-        member_ids = await self.get_member_ids()
-        for user_id in member_ids:
+        # Events carry each member's new total so UnreadCountConsumer needs no query.
+        totals = await self.get_unread_totals()
+        for user_id, count in totals.items():
             group_name = f'unread_count_{user_id}'
             await self.channel_layer.group_send(
                 group_name,
-                {'type': 'unread_count_update'}
+                {'type': 'unread_count_update', 'count': count}
             )
 
     @database_sync_to_async
@@ -497,11 +566,18 @@ class TemChatConsumer(AsyncWebsocketConsumer):
 
 
 class ChatRoomsConsumer(AsyncWebsocketConsumer):
+    """Live chat list of the connected user.
+
+    The list is built once on connect and then patched from
+    ``chatrooms_delta`` events sent to the user's own group
+    (``chatrooms_<user_id>``) by the chat consumers.
+    """
     async def connect(self):
-        self.group_name = 'chatrooms_updates'
         self.user = await self.get_user_from_token(self.scope['query_string'])
         if self.user:
             self.scope['user'] = self.user
+            self.group_name = chatrooms_group(self.user.id)
+            self.chatrooms = {}
             await self.channel_layer.group_add(self.group_name, self.channel_name)
             await self.accept()
             await self.send_chatrooms_list()
@@ -529,7 +605,8 @@ class ChatRoomsConsumer(AsyncWebsocketConsumer):
             return None
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
     async def receive(self, text_data):
         # Optionally handle client messages
@@ -538,69 +615,36 @@ class ChatRoomsConsumer(AsyncWebsocketConsumer):
     async def chatrooms_update(self, event):
         await self.send_chatrooms_list()
 
+    async def chatrooms_delta(self, event):
+        room = self.chatrooms.get(event['room'])
+        if room is None:
+            # A room we have not listed yet (e.g. just created): rebuild once.
+            await self.send_chatrooms_list()
+            return
+        room['unread'] = event['unread']
+        if 'last_message' in event:
+            room['last_message'] = event['last_message']
+        await self.send_cached_chatrooms_list()
+
     @database_sync_to_async
     def get_chatrooms(self):
         """
         Return chatrooms where the user is a member,
         include `other_user` (if private) and the last message.
         """
-        from .models import Message
-
-        chatrooms = ChatRoom.objects.filter(members=self.user, is_deleted=False)
-
-        result = []
-        for room in chatrooms:
-            data = {
-                'id': room.id,
-                'room_id': room.room_id,
-                'name': room.name,
-                'is_group': room.is_group,
-                'is_closed': getattr(room, 'is_closed', False),
-                'product_id': getattr(room.product, 'pid', '') if getattr(room, 'product', None) else '',
-                'ad_name': getattr(room, 'ad_name', '') or '',
-                'ad_image': getattr(room, 'ad_image_url', '') or '',
-                'unread': room.get_total_unread_messages(self.user),
-                'created_at': room.created_at.isoformat(),
-            }
-
-            # Add other user for private chats
-            if not room.is_group:
-                other_members = room.members.exclude(id=self.user.id)
-                if other_members.exists():
-                    data['other_user'] = other_members.first().name
-                    # avatar
-                    data['other_user_avatar'] = other_members.first().avatar.url if other_members.first().avatar else ''
-                else:
-                    data['other_user'] = None
-                    data['other_user_avatar'] = ''
-
-            # Fetch last message
-            last_message = (
-                Message.objects.filter(room=room)
-                .order_by('-created_at')
-                .first()
-            )
-
-            if last_message:
-                data['last_message'] = {
-                    'text': last_message.content,
-                    'is_media': last_message.is_media,
-                    'created_at': last_message.created_at.isoformat(),
-                    'sender': last_message.sender.name,
-                }
-            else:
-                data['last_message'] = None
-
-            result.append(data)
-
-        return result
+        from .chatlist import build_chatroom_list
 
+        return build_chatroom_list(self.user)
 
     async def send_chatrooms_list(self):
         chatrooms = await self.get_chatrooms()
+        self.chatrooms = {room['id']: room for room in chatrooms}
+        await self.send_cached_chatrooms_list()
+
+    async def send_cached_chatrooms_list(self):
         await self.send(text_data=json.dumps({
             'type': 'chatrooms_list',
-            'chatrooms': chatrooms
+            'chatrooms': list(self.chatrooms.values())
         }, default=str))
 
 
@@ -641,15 +685,11 @@ class UnreadCountConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def get_total_unread_count(self):
-        from .models import ChatRoom
-        chatrooms = ChatRoom.objects.filter(members=self.user, is_deleted=False)
-        total = 0
-        for room in chatrooms:
-            total += room.get_total_unread_messages(self.user)
-        return total
-
-    async def send_unread_count(self):
-        count = await self.get_total_unread_count()
+        return unread.totals([self.user.pk])[self.user.pk]
+
+    async def send_unread_count(self, count=None):
+        if count is None:
+            count = await self.get_total_unread_count()
         await self.send(text_data=json.dumps({
             'type': 'unread_count',
             'count': count
@@ -660,4 +700,4 @@ class UnreadCountConsumer(AsyncWebsocketConsumer):
         await self.send_unread_count()
 
     async def unread_count_update(self, event):
-        await self.send_unread_count()
\ No newline at end of file
+        await self.send_unread_count(event.get('count'))
\ No newline at end of file
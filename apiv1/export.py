@@ -0,0 +1,90 @@
+'''
+Streaming catalogue export.
+
+Rows are read with ``QuerySet.iterator(chunk_size=...)`` and rendered one at
+a time, so memory stays flat however large the catalogue is and the first
+bytes go out as soon as the first chunk is read.
+'''
+
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.utils.dateparse import parse_datetime
+
+CHUNK_SIZE = 500
+FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def export_queryset(params):
+    '''Products to export, narrowed by the optional query parameters.
+
+    Raises ``ValueError`` with a client-facing message on malformed input.
+    '''
+    from .models import Product, ProductFeature
+
+    qs = (
+        Product.objects
+        .select_related('category', 'location')
+        .prefetch_related(
+            Prefetch('product_features', queryset=ProductFeature.objects.select_related('feature').order_by('id'))
+        )
+        .order_by('id')
+    )
+    for name in ('category', 'owner'):
+        value = params.get(name)
+        if value:
+            if not value.isdigit():
+                raise ValueError(f'{name} must be an integer')
+            qs = qs.filter(**{f'{name}_id': int(value)})
+    if params.get('status'):
+        qs = qs.filter(status=params['status'])
+    updated_since = params.get('updated_since')
+    if updated_since:
+        moment = parse_datetime(updated_since)
+        if moment is None:
+            raise ValueError('updated_since must be an ISO 8601 datetime')
+        qs = qs.filter(updated_at__gte=moment)
+    return qs
+
+
+def iter_rows(queryset, serializer):
+    '''Yield one serialized dict per product.
+
+    ``serializer`` is a single instance reused for every row; prefetches run
+    once per chunk of ``CHUNK_SIZE`` products.
+    '''
+    for product in queryset.iterator(chunk_size=CHUNK_SIZE):
+        yield serializer.to_representation(product)
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    '''File-like object whose ``write`` hands the line back to the caller.'''
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_csv_value(row.get(column)) for column in columns])
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return value
@@ -0,0 +1,153 @@
+'''
+Facet counts for the product catalogue.
+
+Every facet is one grouped aggregate over the same filtered product set, so
+the whole response costs a handful of queries regardless of catalogue size.
+'''
+
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from oysloecore.sysutils.constants import ProductType
+
+from .search import get_search_backend, tokenize
+
+# Upper edges of the price buckets; the last bucket is open-ended.
+DEFAULT_PRICE_BUCKETS = (100, 500, 1000, 5000, 10000, 50000)
+
+
+def price_buckets() -> list[Decimal]:
+    return [Decimal(str(edge)) for edge in getattr(settings, 'PRODUCT_PRICE_BUCKETS', DEFAULT_PRICE_BUCKETS)]
+
+
+def _int_param(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+
+
+def _decimal_param(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f'{name} must be a number')
+
+
+def apply_facet_filters(qs, params):
+    '''Narrow ``qs`` by the filter parameters of a facets request.
+
+    Raises ``ValueError`` with a client-facing message on malformed input.
+    '''
+    category = _int_param(params, 'category')
+    subcategory = _int_param(params, 'subcategory')
+    location = _int_param(params, 'location')
+    min_price = _decimal_param(params, 'min_price')
+    max_price = _decimal_param(params, 'max_price')
+    region = params.get('region')
+    product_type = params.get('type')
+    if product_type and product_type not in [tag.value for tag in ProductType]:
+        raise ValueError('Invalid type')
+
+    if category is not None:
+        qs = qs.filter(category_id=category)
+    if subcategory is not None:
+        qs = qs.filter(product_features__feature__subcategory_id=subcategory).distinct()
+    if location is not None:
+        qs = qs.filter(location_id=location)
+    if region:
+        qs = qs.filter(location__region=region)
+    if product_type:
+        qs = qs.filter(type=product_type)
+    if min_price is not None:
+        qs = qs.filter(price__gte=min_price)
+    if max_price is not None:
+        qs = qs.filter(price__lte=max_price)
+
+    query = params.get('q') or params.get('search')
+    if tokenize(query):
+        # Every match counts, not just the best-ranked ones.
+        qs = get_search_backend().matches(qs, query)
+    return qs
+
+
+def compute_facets(qs) -> dict:
+    '''Return facet counts for the products in ``qs``.'''
+    ids = qs.order_by().values('pk')
+    products = qs.model.objects.filter(pk__in=ids).order_by()
+
+    categories = (
+        products.exclude(category__isnull=True)
+        .values('category_id', 'category__name')
+        .annotate(count=Count('pk'))
+        .order_by('-count', 'category__name')
+    )
+    subcategories = (
+        products.filter(product_features__feature__subcategory__isnull=False)
+        .values('product_features__feature__subcategory_id', 'product_features__feature__subcategory__name')
+        .annotate(count=Count('pk', distinct=True))
+        .order_by('-count', 'product_features__feature__subcategory__name')
+    )
+    locations = (
+        products.exclude(location__isnull=True)
+        .values('location_id', 'location__name', 'location__region')
+        .annotate(count=Count('pk'))
+        .order_by('-count', 'location__name')
+    )
+    regions = (
+        products.exclude(location__isnull=True)
+        .values('location__region')
+        .annotate(count=Count('pk'))
+        .order_by('-count', 'location__region')
+    )
+    types = products.values('type').annotate(count=Count('pk')).order_by('-count', 'type')
+
+    edges = price_buckets()
+    bounds = list(zip([None, *edges], [*edges, None]))
+    aggregates = {'total': Count('pk')}
+    for i, (low, high) in enumerate(bounds):
+        condition = Q()
+        if low is not None:
+            condition &= Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        aggregates[f'bucket_{i}'] = Count('pk', filter=condition)
+    totals = products.aggregate(**aggregates)
+
+    return {
+        'total': totals['total'],
+        'category': [
+            {'id': row['category_id'], 'name': row['category__name'], 'count': row['count']}
+            for row in categories
+        ],
+        'subcategory': [
+            {
+                'id': row['product_features__feature__subcategory_id'],
+                'name': row['product_features__feature__subcategory__name'],
+                'count': row['count'],
+            }
+            for row in subcategories
+        ],
+        'location': [
+            {'id': row['location_id'], 'name': row['location__name'], 'region': row['location__region'], 'count': row['count']}
+            for row in locations
+        ],
+        'region': [{'name': row['location__region'], 'count': row['count']} for row in regions],
+        'type': [{'name': row['type'], 'count': row['count']} for row in types],
+        'price': [
+            {
+                'min': str(low) if low is not None else None,
+                'max': str(high) if high is not None else None,
+                'count': totals[f'bucket_{i}'],
+            }
+            for i, (low, high) in enumerate(bounds)
+        ],
+    }
@@ -0,0 +1,284 @@
+'''
+Bulk product import for vendors.
+
+``ProductImporter`` reads rows from a CSV, NDJSON or JSON-array file,
+validates each one against taxonomy lookups loaded once up front (categories,
+locations, features and their possible values) and inserts valid rows with
+``bulk_create`` in chunks. Invalid rows are reported, not raised.
+
+CSV columns are the field names of ``ProductImportRowSerializer``; ``images``
+holds URLs separated by ``|`` and ``features`` a JSON object such as
+``{"Brand": "Samsung"}``. Features may be keyed by id or by name.
+'''
+
+import codecs
+import csv
+import json
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import F
+
+from oysloecore.sysutils.constants import ProductStatus
+
+from . import catalog_cache
+from .models import Category, Feature, Location, PosibleFeatureValue, Product, ProductFeature, ProductImage
+from .search import get_search_backend
+from .serializers import ProductImportRowSerializer
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'ndjson', 'json')
+CHUNK_SIZE = 500
+
+
+def detect_format(filename) -> str | None:
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension == 'jsonl':
+        return 'ndjson'
+    return extension if extension in FORMATS else None
+
+
+class ReadError(ValueError):
+    '''The file could not be read past ``line`` (1-based; ``None`` if unknown).'''
+
+    def __init__(self, message, line=None):
+        super().__init__(message)
+        self.line = line
+
+
+def read_rows(lines, file_format):
+    '''Yield ``(row_number, data)`` from an iterable of raw byte lines.
+
+    CSV and NDJSON are decoded lazily, line by line; a JSON array has to be
+    parsed in one go. Unparseable NDJSON lines yield ``ValueError`` as data.
+    A file that cannot be decoded or parsed raises ``ReadError`` with the
+    offending line, possibly after earlier rows were yielded.
+    '''
+    if file_format not in FORMATS:
+        raise ValueError(f'Unsupported format: {file_format}')
+    consumed = 0
+
+    def counted():
+        nonlocal consumed
+        for line in lines:
+            consumed += 1
+            yield line
+
+    text = codecs.iterdecode(counted(), 'utf-8-sig')
+    try:
+        if file_format == 'csv':
+            # Row 1 is the header.
+            for number, row in enumerate(csv.DictReader(text), start=2):
+                yield number, _from_csv(row)
+        elif file_format == 'ndjson':
+            for number, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield number, json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield number, ValueError(f'Invalid JSON: {exc}')
+        else:
+            data = json.loads(''.join(text))
+            if not isinstance(data, list):
+                raise ReadError('A JSON import must be an array of products')
+            yield from enumerate(data, start=1)
+    except ReadError:
+        raise
+    except (ValueError, csv.Error) as exc:
+        raise ReadError(str(exc), line=getattr(exc, 'lineno', None) or consumed) from exc
+
+
+def _from_csv(row):
+    data = {key: value for key, value in row.items() if key and value not in (None, '')}
+    if 'images' in data:
+        data['images'] = [url.strip() for url in data['images'].split('|') if url.strip()]
+    if 'features' in data:
+        try:
+            data['features'] = json.loads(data['features'])
+        except ValueError:
+            pass  # reported by the row serializer
+    return data
+
+
+class Taxonomy:
+    '''Lookups for resolving row references without per-row queries.'''
+
+    def __init__(self):
+        self.categories = {}
+        for pk, name in Category.objects.values_list('id', 'name'):
+            self.categories[str(pk)] = pk
+            self.categories[name.lower()] = pk
+        self.locations = {}
+        for pk, name in Location.objects.filter(is_active=True).values_list('id', 'name'):
+            self.locations[str(pk)] = pk
+            self.locations[name.lower()] = pk
+        self.feature_category = {}
+        self.features_by_name = {}
+        for pk, name, category_id in Feature.objects.values_list('id', 'name', 'subcategory__category_id'):
+            self.feature_category[pk] = category_id
+            self.features_by_name.setdefault((category_id, name.lower()), pk)
+        self.values = {}
+        for feature_id, value in PosibleFeatureValue.objects.values_list('feature_id', 'value'):
+            self.values.setdefault(feature_id, set()).add(value)
+
+    def feature(self, key, category_id):
+        key = str(key).strip()
+        if key.isdigit() and int(key) in self.feature_category:
+            return int(key)
+        return self.features_by_name.get((category_id, key.lower()))
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created_ids: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    # ``{'line': n, 'detail': message}`` when reading stopped partway through the file.
+    read_error: dict | None = None
+
+    def as_dict(self) -> dict:
+        return {
+            'rows': self.rows,
+            'created': len(self.created_ids),
+            'created_ids': self.created_ids,
+            'errors': self.errors,
+            'read_error': self.read_error,
+        }
+
+
+class ProductImporter:
+    '''Import products for ``owner``.
+
+    ``limit`` caps how many products may be created (the owner's remaining
+    subscription quota, ``None`` for unlimited); rows past it are reported
+    as errors. Imported products start PENDING, like products created
+    through the API, and so go through moderation.
+    '''
+
+    def __init__(self, owner, *, limit=None, chunk_size=CHUNK_SIZE, dry_run=False):
+        self.owner = owner
+        self.limit = limit
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.taxonomy = Taxonomy()
+
+    def run(self, rows) -> ImportResult:
+        '''Import ``rows`` (as yielded by ``read_rows``).
+
+        Chunks are committed as they fill up. If the file turns out to be
+        unreadable partway through, the rows read so far are still imported
+        and ``read_error`` says where reading stopped, so ``created_ids``
+        always lists every product that exists.
+        '''
+        result = ImportResult()
+        pending = []
+        accepted = 0
+        try:
+            for number, data in rows:
+                result.rows += 1
+                entry, errors = self.validate(data)
+                if errors:
+                    result.errors.append({'row': number, 'errors': errors})
+                    continue
+                if self.limit is not None and accepted >= self.limit:
+                    result.errors.append({'row': number, 'errors': {'non_field_errors': ['Subscription product limit reached.']}})
+                    continue
+                accepted += 1
+                if self.dry_run:
+                    continue
+                pending.append(entry)
+                if len(pending) >= self.chunk_size:
+                    result.created_ids.extend(self.insert(pending))
+                    pending = []
+        except ReadError as exc:
+            result.read_error = {'line': exc.line, 'detail': str(exc)}
+        if pending:
+            result.created_ids.extend(self.insert(pending))
+        if result.created_ids:
+            catalog_cache.bump_generation()
+        return result
+
+    def validate(self, data):
+        '''Return ``(entry, errors)``; ``entry`` is ``(product, features, images)``.'''
+        if isinstance(data, Exception):
+            return None, {'non_field_errors': [str(data)]}
+        if not isinstance(data, dict):
+            return None, {'non_field_errors': ['Each row must be an object.']}
+        serializer = ProductImportRowSerializer(data=data)
+        if not serializer.is_valid():
+            return None, {name: [str(error) for error in errors] for name, errors in serializer.errors.items()}
+        row = serializer.validated_data
+        errors = {}
+
+        category_id = location_id = None
+        if row.get('category'):
+            category_id = self.taxonomy.categories.get(row['category'].strip().lower())
+            if category_id is None:
+                errors['category'] = ['Unknown category.']
+        if row.get('location'):
+            location_id = self.taxonomy.locations.get(row['location'].strip().lower())
+            if location_id is None:
+                errors['location'] = ['Unknown location.']
+
+        features = {}
+        for key, value in (row.get('features') or {}).items():
+            feature_id = self.taxonomy.feature(key, category_id)
+            value = value.strip()
+            if feature_id is None:
+                errors.setdefault('features', []).append(f'{key}: unknown feature.')
+            elif category_id is not None and self.taxonomy.feature_category[feature_id] != category_id:
+                errors.setdefault('features', []).append(f'{key}: feature does not belong to the category.')
+            elif value not in self.taxonomy.values.get(feature_id, ()):
+                errors.setdefault('features', []).append(
+                    f'{key}: value must be one of the possible feature values for this feature.'
+                )
+            else:
+                features[feature_id] = value
+        if errors:
+            return None, errors
+
+        product = Product(
+            owner=self.owner,
+            name=row['name'],
+            description=row['description'],
+            price=row['price'],
+            image=row.get('image') or None,
+            category_id=category_id,
+            location_id=location_id,
+            status=ProductStatus.PENDING.value,
+        )
+        for name in ('type', 'duration'):
+            if name in row:
+                setattr(product, name, row[name])
+        images = list(dict.fromkeys(row.get('images') or []))
+        product.image_urls = product.build_image_urls(gallery=images)
+        return (product, features, images), None
+
+    def insert(self, entries) -> list[int]:
+        '''Insert one chunk of validated rows; returns the new product ids.'''
+        products = [product for product, _, _ in entries]
+        with transaction.atomic():
+            Product.objects.bulk_create(products)
+            ProductFeature.objects.bulk_create([
+                ProductFeature(product=product, feature_id=feature_id, value=value)
+                for product, features, _ in entries
+                for feature_id, value in features.items()
+            ])
+            ProductImage.objects.bulk_create([
+                ProductImage(product=product, image=image)
+                for product, _, images in entries
+                for image in images
+            ])
+            owners = Counter(product.owner_id for product in products if product.owner_id)
+            for owner_id, count in owners.items():
+                self.owner.__class__.objects.filter(pk=owner_id).update(total_ads=F('total_ads') + count)
+        try:
+            get_search_backend().index(products)
+        except Exception:
+            # Search may lag behind; `manage.py rebuild_search_index` repairs it.
+            logger.exception('Failed to index %s imported products', len(products))
+        return [product.pk for product in products]
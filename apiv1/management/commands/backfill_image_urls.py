@@ -0,0 +1,53 @@
+'''
+This management command fills Product.image_urls from the image columns.
+Usage:
+    python manage.py backfill_image_urls [--all] [--chunk-size N]
+'''
+
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apiv1.models import Product, ProductImage
+
+
+class Command(BaseCommand):
+    help = "Compute the denormalised image URL list for products that do not have one yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recompute every product, not only missing ones.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Products updated per batch.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        qs = Product.objects.only('id', 'image').order_by('id')
+        if not options['all']:
+            qs = qs.filter(image_urls__isnull=True)
+
+        self.stdout.write(self.style.NOTICE("[IMAGES] Backfilling product image URLs..."))
+        total = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                # Lock the batch so concurrent image writes cannot be overwritten
+                # with a stale list; walking by id keeps the window stable.
+                batch = list(qs.select_for_update().filter(id__gt=last_id)[:chunk_size])
+                if not batch:
+                    break
+                gallery = defaultdict(list)
+                images = (
+                    ProductImage.objects
+                    .filter(product_id__in=[p.id for p in batch])
+                    .order_by('id')
+                    .values_list('product_id', 'image')
+                )
+                for product_id, image in images:
+                    gallery[product_id].append(image)
+                for product in batch:
+                    product.image_urls = product.build_image_urls(gallery[product.id])
+                Product.objects.bulk_update(batch, ['image_urls'])
+            total += len(batch)
+            last_id = batch[-1].id
+
+        self.stdout.write(self.style.SUCCESS(f"[IMAGES] Updated {total} products."))
@@ -0,0 +1,30 @@
+'''
+This management command rebuilds the precomputed related-products table.
+Usage:
+    python manage.py build_related_products [--top-k N] [--pending]
+
+With --pending only the products queued by recent saves are refreshed; run it
+often (e.g. every minute from cron) and the full rebuild nightly.
+'''
+
+from django.core.management.base import BaseCommand
+
+from apiv1.related import TOP_K, rebuild_related_products, refresh_pending
+
+
+class Command(BaseCommand):
+    help = "Recompute the top-K related products for every ACTIVE product."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=TOP_K, help='Neighbours stored per product.')
+        parser.add_argument('--pending', action='store_true', help='Only refresh products queued by saves.')
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            self.stdout.write(self.style.NOTICE("[RELATED] Refreshing queued products..."))
+            count = refresh_pending(top_k=options['top_k'], stdout=self.stdout)
+            self.stdout.write(self.style.SUCCESS(f"[RELATED] Refreshed {count} products."))
+            return
+        self.stdout.write(self.style.NOTICE("[RELATED] Building related-products index..."))
+        total = rebuild_related_products(top_k=options['top_k'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"[RELATED] Stored {total} neighbour entries."))
@@ -0,0 +1,54 @@
+'''
+This management command bulk-imports products for one owner from a file.
+Usage:
+    python manage.py import_products <path> --owner <id|email> [--format csv|ndjson|json] [--chunk-size N] [--limit N] [--dry-run]
+'''
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from apiv1.importing import CHUNK_SIZE, FORMATS, ProductImporter, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import products from a CSV, NDJSON or JSON file (see apiv1.importing for the row format)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument('--owner', required=True, help='Owner id or email.')
+        parser.add_argument('--format', choices=FORMATS, help='File format; inferred from the extension by default.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Products inserted per batch.')
+        parser.add_argument('--limit', type=int, help='Create at most N products.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate without writing.')
+
+    def handle(self, *args, **options):
+        owner_ref = options['owner']
+        lookup = {'pk': int(owner_ref)} if owner_ref.isdigit() else {'email__iexact': owner_ref}
+        owner = User.objects.filter(**lookup).first()
+        if owner is None:
+            raise CommandError(f"Owner not found: {owner_ref}")
+        file_format = options['format'] or detect_format(options['path'])
+        if file_format is None:
+            raise CommandError("Cannot infer the file format; pass --format.")
+
+        importer = ProductImporter(
+            owner, limit=options['limit'], chunk_size=options['chunk_size'], dry_run=options['dry_run'],
+        )
+        self.stdout.write(self.style.NOTICE(f"[IMPORT] Importing {options['path']} for {owner.email}..."))
+        try:
+            with open(options['path'], 'rb') as handle:
+                result = importer.run(read_rows(handle, file_format))
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Could not read file: {exc}")
+
+        for error in result.errors:
+            self.stdout.write(self.style.WARNING(f"[IMPORT] row {error['row']}: {error['errors']}"))
+        if result.read_error:
+            self.stdout.write(self.style.ERROR(
+                f"[IMPORT] Stopped reading at line {result.read_error['line']}: {result.read_error['detail']}"
+            ))
+        verb = 'Validated' if options['dry_run'] else 'Created'
+        count = result.rows - len(result.errors) if options['dry_run'] else len(result.created_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f"[IMPORT] {verb} {count} of {result.rows} rows, {len(result.errors)} errors."
+        ))
@@ -0,0 +1,26 @@
+'''
+This management command rebuilds the product full-text search index.
+Usage:
+    python manage.py rebuild_search_index [--chunk-size N]
+'''
+
+from django.core.management.base import BaseCommand
+
+from apiv1.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index from the Product table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Products indexed per batch.')
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        if not backend.maintains_index:
+            self.stdout.write(self.style.WARNING(f"[SEARCH] {type(backend).__name__} keeps no index; nothing to rebuild."))
+            return
+
+        self.stdout.write(self.style.NOTICE(f"[SEARCH] Rebuilding index with {type(backend).__name__}..."))
+        total = backend.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"[SEARCH] Indexed {total} products."))
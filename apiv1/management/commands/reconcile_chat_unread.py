@@ -0,0 +1,51 @@
+'''
+This management command recomputes the per-member chat unread counters.
+Usage:
+    python manage.py reconcile_chat_unread [--chunk-size N] [--dry-run]
+'''
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apiv1 import unread
+from apiv1.models import ChatMembership
+
+
+class Command(BaseCommand):
+    help = "Repair drift in ChatMembership unread counters from the read cursors."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Memberships reconciled per batch.')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        self.stdout.write(self.style.NOTICE("[UNREAD] Reconciling chat unread counters..."))
+
+        scanned = fixed = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                # Lock the batch so concurrent F() increments cannot interleave with the rewrite.
+                batch = list(
+                    ChatMembership.objects.select_for_update()
+                    .filter(id__gt=last_id)
+                    .order_by('id')
+                    .annotate(actual=unread.actual_unread())
+                    .only('id', 'user_id', 'unread_count')[:chunk_size]
+                )
+                if not batch:
+                    break
+                drifted = [membership for membership in batch if membership.unread_count != membership.actual]
+                for membership in drifted:
+                    membership.unread_count = membership.actual
+                if drifted and not dry_run:
+                    ChatMembership.objects.bulk_update(drifted, ['unread_count'])
+                    unread.invalidate({membership.user_id for membership in drifted})
+            scanned += len(batch)
+            fixed += len(drifted)
+            last_id = batch[-1].id
+
+        verb = 'would fix' if dry_run else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f"[UNREAD] Scanned {scanned} memberships, {verb} {fixed}."))
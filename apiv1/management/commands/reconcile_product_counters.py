@@ -0,0 +1,73 @@
+'''
+This management command recomputes the engagement counters on Product.
+Usage:
+    python manage.py reconcile_product_counters [--chunk-size N] [--dry-run]
+'''
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from apiv1.models import Favourite, Product, ProductLike, ProductReport, Review
+
+COUNTER_FIELDS = Product.COUNTER_FIELDS
+
+
+def _grouped(model, ids, **aggregates):
+    rows = model.objects.filter(product_id__in=ids).values('product_id').annotate(**aggregates).order_by()
+    return {row.pop('product_id'): row for row in rows}
+
+
+class Command(BaseCommand):
+    help = "Repair drift in Product engagement counters from the underlying rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Products reconciled per batch.')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        self.stdout.write(self.style.NOTICE("[COUNTERS] Reconciling product engagement counters..."))
+
+        scanned = fixed = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                # Lock the batch so concurrent F() updates cannot interleave with the rewrite.
+                batch = list(
+                    Product.objects.select_for_update()
+                    .filter(id__gt=last_id)
+                    .order_by('id')
+                    .only('id', *COUNTER_FIELDS)[:chunk_size]
+                )
+                if not batch:
+                    break
+                ids = [p.id for p in batch]
+                likes = _grouped(ProductLike, ids, n=Count('id'))
+                favourites = _grouped(Favourite, ids, n=Count('id'))
+                reviews = _grouped(Review, ids, n=Count('id'), total=Sum('rating'))
+                reports = _grouped(ProductReport, ids, n=Count('id'))
+
+                drifted = []
+                for product in batch:
+                    review = reviews.get(product.id, {})
+                    actual = {
+                        'likes_count': likes.get(product.id, {}).get('n', 0),
+                        'favourites_count': favourites.get(product.id, {}).get('n', 0),
+                        'reviews_count': review.get('n', 0),
+                        'rating_sum': review.get('total') or 0,
+                        'reports_count': reports.get(product.id, {}).get('n', 0),
+                    }
+                    if any(getattr(product, field) != value for field, value in actual.items()):
+                        for field, value in actual.items():
+                            setattr(product, field, value)
+                        drifted.append(product)
+                if drifted and not dry_run:
+                    Product.objects.bulk_update(drifted, COUNTER_FIELDS)
+            scanned += len(batch)
+            fixed += len(drifted)
+            last_id = batch[-1].id
+
+        verb = 'would fix' if dry_run else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f"[COUNTERS] Scanned {scanned} products, {verb} {fixed}."))
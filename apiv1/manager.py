@@ -0,0 +1,91 @@
+from django.db import models
+from django.db.models import Count, Exists, OuterRef, Prefetch, Q, Value
+
+
+class ProductQuerySet(models.QuerySet):
+    '''Query helpers for listing products'''
+
+    def with_engagement(self, user=None):
+        '''Annotate the requesting user's like/favourite flags in the main query.
+
+        Engagement counts are denormalised columns on Product; only the
+        per-user flags need ``Exists`` subqueries. ``ProductSerializer``
+        reads them when present and falls back to per-row queries otherwise.
+        '''
+        from .models import Favourite, ProductLike
+
+        if user is not None and getattr(user, 'is_authenticated', False):
+            return self.annotate(
+                is_liked=Exists(ProductLike.objects.filter(product=OuterRef('pk'), user=user)),
+                is_favourited=Exists(Favourite.objects.filter(product=OuterRef('pk'), user=user)),
+            )
+        return self.annotate(
+            is_liked=Value(False, output_field=models.BooleanField()),
+            is_favourited=Value(False, output_field=models.BooleanField()),
+        )
+
+    def with_details(self, *, owner=True, images=True, features=True):
+        '''Load everything ``ProductSerializer`` nests in a fixed number of queries.
+
+        Joins owner, location and category, and prefetches images plus
+        ``product_features -> feature -> values``. Views pass ``False`` for
+        blocks a sparse fieldset leaves out.
+        '''
+        from .models import ProductFeature, ProductImage
+
+        qs = self.select_related('location', 'category', *(['owner'] if owner else []))
+        prefetches = []
+        if images:
+            prefetches.append(Prefetch('images', queryset=ProductImage.objects.order_by('id')))
+        if features:
+            prefetches.append(Prefetch(
+                'product_features',
+                queryset=ProductFeature.objects.select_related('feature').prefetch_related('feature__values'),
+            ))
+        return qs.prefetch_related(*prefetches)
+
+
+class MessageQuerySet(models.QuerySet):
+    '''Query helpers for chat messages'''
+
+    def with_read_state(self):
+        '''Annotate ``is_read``: every other member's read cursor has passed the message.
+
+        ``MessageSerializer`` reads the annotation when present and falls back
+        to a per-row query otherwise.
+        '''
+        from .models import ChatMembership
+
+        behind = (
+            ChatMembership.objects
+            .filter(room=OuterRef('room'), last_read_message_id__lt=OuterRef('pk'))
+            .exclude(user=OuterRef('sender'))
+        )
+        return self.annotate(is_read=~Exists(behind))
+
+
+def prefetch_product(user=None, lookup='product'):
+    '''Prefetch a related product with engagement annotations and nested details.
+
+    For models that embed ``ProductSerializer`` (reviews, reports), so each
+    row does not trigger the product serializer's per-row fallbacks.
+    '''
+    from .models import Product
+
+    return Prefetch(lookup, queryset=Product.objects.with_engagement(user).with_details())
+
+
+def with_ad_counts(queryset):
+    '''Annotate the ad counters ``UserSerializer`` renders (``active_ads``/``taken_ads``).'''
+    listed = Q(products__status='VERIFIED') | Q(products__status='ACTIVE')
+    return queryset.annotate(
+        num_active_ads=Count('products', filter=listed & Q(products__is_taken=False)),
+        num_taken_ads=Count('products', filter=listed & Q(products__is_taken=True)),
+    )
+
+
+def prefetch_user(lookup='user'):
+    '''Prefetch a related user with the ad counters ``UserSerializer`` renders.'''
+    from accounts.models import User
+
+    return Prefetch(lookup, queryset=with_ad_counts(User.objects.all()))
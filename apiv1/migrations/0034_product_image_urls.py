@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiv1', '0033_relatedproduct'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_urls',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
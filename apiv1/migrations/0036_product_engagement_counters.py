@@ -0,0 +1,64 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:17
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Product = apps.get_model('apiv1', 'Product')
+
+    def grouped(model_name, aggregate):
+        model = apps.get_model('apiv1', model_name)
+        qs = (
+            model.objects.filter(product=OuterRef('pk'))
+            .order_by()
+            .values('product')
+            .annotate(value=aggregate)
+            .values('value')
+        )
+        return Coalesce(Subquery(qs, output_field=models.IntegerField()), Value(0))
+
+    Product.objects.update(
+        likes_count=grouped('ProductLike', Count('id')),
+        favourites_count=grouped('Favourite', Count('id')),
+        reviews_count=grouped('Review', Count('id')),
+        rating_sum=grouped('Review', Sum('rating')),
+        reports_count=grouped('ProductReport', Count('id')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiv1', '0035_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='favourites_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reports_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.5 on 2026-10-17 02:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_memberships(apps, schema_editor):
+    '''One membership per room member, read up to the newest message they had marked read.'''
+    ChatRoom = apps.get_model('apiv1', 'ChatRoom')
+    ChatMembership = apps.get_model('apiv1', 'ChatMembership')
+    Message = apps.get_model('apiv1', 'Message')
+    Members = ChatRoom._meta.get_field('members').remote_field.through
+
+    last_read = (
+        Message.objects
+        .filter(room=OuterRef('chatroom_id'), is_read=True)
+        .exclude(sender=OuterRef('user_id'))
+        .order_by('-id')
+        .values('id')[:1]
+    )
+    rows = (
+        Members.objects
+        .annotate(last_read=Coalesce(Subquery(last_read), Value(0)))
+        .values_list('chatroom_id', 'user_id', 'last_read')
+        .iterator(chunk_size=1000)
+    )
+    batch = []
+    for room_id, user_id, cursor in rows:
+        batch.append(ChatMembership(room_id=room_id, user_id=user_id, last_read_message_id=cursor))
+        if len(batch) >= 1000:
+            ChatMembership.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    ChatMembership.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def restore_is_read(apps, schema_editor):
+    ChatMembership = apps.get_model('apiv1', 'ChatMembership')
+    Message = apps.get_model('apiv1', 'Message')
+    for room_id, user_id, cursor in ChatMembership.objects.values_list('room_id', 'user_id', 'last_read_message_id'):
+        Message.objects.filter(room_id=room_id, id__lte=cursor).exclude(sender_id=user_id).update(is_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiv1', '0037_product_moderation_claims'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_read_message_id', models.PositiveBigIntegerField(default=0)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='apiv1.chatroom')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('room', 'user')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['room', 'id'], name='apiv1_messa_room_id_671cd7_idx'),
+        ),
+        migrations.RunPython(backfill_memberships, restore_is_read),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='message_room_unread_idx',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+    ]
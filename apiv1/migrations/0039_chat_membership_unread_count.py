@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-17 03:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_counts(apps, schema_editor):
+    ChatMembership = apps.get_model('apiv1', 'ChatMembership')
+    Message = apps.get_model('apiv1', 'Message')
+
+    unread = (
+        Message.objects
+        .filter(room=OuterRef('room'), id__gt=OuterRef('last_read_message_id'), sender__is_active=True)
+        .exclude(sender=OuterRef('user'))
+        .order_by()
+        .values('room')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    ChatMembership.objects.update(
+        unread_count=Coalesce(Subquery(unread, output_field=models.IntegerField()), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiv1', '0038_chat_memberships'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmembership',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
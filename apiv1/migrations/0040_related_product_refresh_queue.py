@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-17 03:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiv1', '0039_chat_membership_unread_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedProductRefresh',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='related_refresh', to='apiv1.product')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
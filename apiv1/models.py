@@ -7,6 +7,32 @@ from django.utils import timezone
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.db import transaction
+from django.db.models import F, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from . import unread
+from .manager import MessageQuerySet, ProductQuerySet
+
+
+def normalize_image_url(value) -> str:
+    '''Return an absolute URL for a stored image value.
+
+    Values may be URL strings or, for legacy data, File/Image instances;
+    relative paths are prefixed with MEDIA_URL.
+    '''
+    if not value:
+        return ''
+    try:
+        if getattr(value, 'url', None):
+            return value.url
+    except Exception:
+        pass
+    img_val = str(value).strip()
+    if img_val and not (img_val.lower().startswith('http://') or img_val.lower().startswith('https://')):
+        base = (getattr(settings, 'MEDIA_URL', '') or '').rstrip('/')
+        if base:
+            return f"{base}/{img_val.lstrip('/')}"
+    return img_val
 
 
 class ChatRoom(TimeStampedModel):
@@ -30,11 +56,17 @@ class ChatRoom(TimeStampedModel):
 
     def get_total_unread_messages(self, user):
         '''Returns the total number of unread messages for a user in this chatroom'''
-        return self.messages.filter(is_read=False, sender__is_active=True).exclude(sender=user).count()
-    
+        return self.memberships.filter(user=user).values_list('unread_count', flat=True).first() or 0
+
     def read_all_messages(self, user):
         '''Marks all messages as read for a user in this chatroom'''
-        self.messages.filter(is_read=False, sender__is_active=True).exclude(sender=user).update(is_read=True)
+        # Moves the user's read cursor up to the newest message: one row, one UPDATE.
+        latest = Message.objects.filter(room=self).order_by('-id').values('id')[:1]
+        self.memberships.filter(user=user).update(
+            last_read_message_id=Greatest(F('last_read_message_id'), Coalesce(Subquery(latest), 0)),
+            unread_count=0,
+        )
+        unread.invalidate([user.pk])
 
     def __str__(self):
         return self.name
@@ -49,49 +81,8 @@ class ChatRoom(TimeStampedModel):
     def ad_image_url(self) -> str:
         if not self.product:
             return ''
-        # Prefer the product's primary image field.
-        # This may now be a URL string (URLField) or, for legacy data, a File/Image instance.
-        if getattr(self.product, 'image', None):
-            try:
-                # If it is an Image/File, attempt to resolve the storage URL
-                if getattr(self.product.image, 'url', None):
-                    return self.product.image.url  # type: ignore[attr-defined]
-            except Exception:
-                pass
-            # Otherwise treat as a plain URL string
-            try:
-                img_val = str(self.product.image).strip()
-                if img_val:
-                    # If it's not an absolute URL, prefix MEDIA_URL for backward compatibility
-                    if not (img_val.lower().startswith('http://') or img_val.lower().startswith('https://')):
-                        base = (getattr(settings, 'MEDIA_URL', '') or '').rstrip('/')
-                        if base:
-                            return f"{base}/{img_val.lstrip('/')}"
-                    return img_val
-            except Exception:
-                pass
-        try:
-            first = self.product.images.first()
-            if first and first.image:
-                # first.image may be a URL string now; still support legacy File types.
-                try:
-                    if getattr(first.image, 'url', None):
-                        return first.image.url  # type: ignore[attr-defined]
-                except Exception:
-                    pass
-                try:
-                    img_val = str(first.image).strip()
-                    if img_val:
-                        if not (img_val.lower().startswith('http://') or img_val.lower().startswith('https://')):
-                            base = (getattr(settings, 'MEDIA_URL', '') or '').rstrip('/')
-                            if base:
-                                return f"{base}/{img_val.lstrip('/')}"
-                        return img_val
-                except Exception:
-                    pass
-        except Exception:
-            return ''
-        return ''
+        urls = self.product.all_images
+        return urls[0] if urls else ''
 
 class Message(TimeStampedModel):
     '''Messsage model for storing user messages'''
@@ -99,14 +90,41 @@ class Message(TimeStampedModel):
     sender = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
     is_media = models.BooleanField(default=False)
-    is_read = models.BooleanField(default=False)
+
+    objects = MessageQuerySet.as_manager()
+
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Room history in order, and unread counts past a member's read
+            # cursor (``room = ? AND id > ?``).
+            models.Index(fields=['room', 'created_at']),
+            models.Index(fields=['room', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.sender.name}: {self.content[:20]}"
 
 
+class ChatMembership(TimeStampedModel):
+    '''A member's read position in a chatroom.
+
+    Rows mirror ``ChatRoom.members`` (kept in sync by a signal). Messages with
+    an id above ``last_read_message_id`` that the member did not send are
+    unread for them; ``unread_count`` keeps their number (see ``apiv1.unread``).
+    '''
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_memberships')
+    last_read_message_id = models.PositiveBigIntegerField(default=0)
+    unread_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        unique_together = ('room', 'user')
+
+    def __str__(self):
+        return f"{self.user_id} in {self.room_id} (read to {self.last_read_message_id})"
+
+
 class Product(TimeStampedModel):
     '''Product model for storing product details'''
     def generate_pid():
@@ -127,49 +145,107 @@ class Product(TimeStampedModel):
     duration = models.CharField(max_length=100, default='One Time Payment')
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='products', null=True)
     suspension_note = models.TextField(blank=True, null=True, help_text='Reason provided when this product is suspended by an admin.')
-    
+    # Denormalised from `image` and ProductImage rows; None until backfilled.
+    image_urls = models.JSONField(null=True, blank=True, editable=False)
+    # Engagement counters, kept in step by the API actions (see `adjust_counters`)
+    # and repaired by `manage.py reconcile_product_counters`.
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    favourites_count = models.PositiveIntegerField(default=0, editable=False)
+    reviews_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.IntegerField(default=0, editable=False)
+    reports_count = models.PositiveIntegerField(default=0, editable=False)
+    # Moderation queue claim (see ProductViewSet.moderation_queue); expired claims are free again.
+    claimed_by = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='moderation_claims', null=True, blank=True, editable=False)
+    claimed_until = models.DateTimeField(null=True, blank=True, editable=False)
+
+    COUNTER_FIELDS = ('likes_count', 'favourites_count', 'reviews_count', 'rating_sum', 'reports_count')
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Public feed, moderation queue, owner dashboards and category browsing.
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['owner', 'is_taken']),
+            models.Index(fields=['category', 'status', 'created_at']),
+        ]
+
     @property
-    def all_images(self):
-        # Return a list of URLs, preferring the primary image first when available.
-        urls: list[str] = []
-        # Include primary image if set
-        try:
-            if getattr(self, 'image', None):
-                if getattr(self.image, 'url', None):
-                    urls.append(self.image.url)  # type: ignore[attr-defined]
-                else:
-                    img_val = str(self.image).strip()
-                    if img_val:
-                        if not (img_val.lower().startswith('http://') or img_val.lower().startswith('https://')):
-                            base = (getattr(settings, 'MEDIA_URL', '') or '').rstrip('/')
-                            if base:
-                                urls.append(f"{base}/{img_val.lstrip('/')}")
-                            else:
-                                urls.append(img_val)
-                        else:
-                            urls.append(img_val)
-        except Exception:
-            pass
+    def all_images(self) -> list[str]:
+        '''Normalised image URLs, primary image first.'''
+        if self.image_urls is None:
+            # Not backfilled yet (see `manage.py backfill_image_urls`).
+            return self.build_image_urls()
+        return self.image_urls
+
+    def build_image_urls(self, gallery=None) -> list[str]:
+        '''Compute the de-duplicated image URL list from the image columns.
+
+        ``gallery`` may supply the ProductImage values (ordered by id) when
+        they were already loaded, e.g. by a batch backfill.
+        '''
+        values = [self.image]
+        if gallery is not None:
+            values += list(gallery)
+        elif self.pk:
+            values += list(ProductImage.objects.filter(product_id=self.pk).order_by('id').values_list('image', flat=True))
+        urls = []
+        for value in values:
+            url = normalize_image_url(value)
+            if url and url not in urls:
+                urls.append(url)
+        return urls
+
+    @classmethod
+    def refresh_image_urls(cls, product_id) -> None:
+        '''Recompute ``image_urls`` for one product inside the caller's transaction.'''
+        with transaction.atomic():
+            # Lock the row so concurrent image writes cannot interleave.
+            product = cls.objects.select_for_update().filter(pk=product_id).only('id', 'image').first()
+            if product is not None:
+                cls.objects.filter(pk=product_id).update(image_urls=product.build_image_urls())
 
-        # Append additional images from ProductImage
-        try:
-            for img in ProductImage.objects.filter(product__pid=self.pid):
-                try:
-                    if img.image and getattr(img.image, 'url', None):
-                        urls.append(img.image.url)  # type: ignore[attr-defined]
-                except Exception:
-                    continue
-        except Exception:
-            pass
+    @property
+    def average_rating(self):
+        if not self.reviews_count:
+            return None
+        return self.rating_sum / self.reviews_count
+
+    @classmethod
+    def adjust_counters(cls, product_id, **deltas) -> None:
+        '''Atomically add ``deltas`` to counter columns, e.g. ``likes_count=1``.'''
+        updates = {}
+        for field, delta in deltas.items():
+            if not delta:
+                continue
+            # rating_sum may legitimately be negative; the counts never are.
+            updates[field] = F(field) + delta if field == 'rating_sum' else Greatest(F(field) + delta, Value(0))
+        if updates:
+            cls.objects.filter(pk=product_id).update(**updates)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        # Counters only change through `adjust_counters`; unless a save names
+        # them, writing back the values loaded into memory would undo
+        # concurrent F() updates (see `_do_update`).
+        self._skip_counters = update_fields is None
+        if update_fields is None:
+            # An instance loaded without its image cannot have changed it.
+            rebuild_images = 'image' not in self.get_deferred_fields()
+        else:
+            rebuild_images = 'image' in update_fields
+        if rebuild_images:
+            self.image_urls = self.build_image_urls()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'image_urls'}
+        super().save(*args, **kwargs)
 
-        # De-duplicate while preserving order
-        seen = set()
-        deduped = []
-        for u in urls:
-            if u and u not in seen:
-                seen.add(u)
-                deduped.append(u)
-        return deduped
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # Dropping the counters here rather than forcing ``update_fields``
+        # keeps Django's handling of deferred fields and of rows deleted
+        # underneath the instance (which are inserted again).
+        if getattr(self, '_skip_counters', False):
+            values = [value for value in values if value[0].name not in self.COUNTER_FIELDS]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
 
     def __str__(self):
         return self.name
@@ -306,6 +382,39 @@ class ProductReport(TimeStampedModel):
         return f"Report on {self.product.pid} by {self.user.email}"
 
 
+class RelatedProduct(TimeStampedModel):
+    """Precomputed nearest neighbours of a product, served by ProductViewSet.related.
+
+    Rows are rebuilt by `manage.py build_related_products`; saving a product
+    (or one of its features) queues it for `build_related_products --pending`.
+    """
+    product = models.ForeignKey('Product', on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey('Product', on_delete=models.CASCADE, related_name='neighbour_of')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ('product', 'related')
+        indexes = [
+            models.Index(fields=['product', 'rank']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} (#{self.rank})"
+
+
+class RelatedProductRefresh(TimeStampedModel):
+    """A product whose neighbour list must be recomputed.
+
+    Product and feature saves queue a row (see `apiv1.related.schedule_refresh`);
+    `manage.py build_related_products --pending` drains the queue.
+    """
+    product = models.OneToOneField('Product', on_delete=models.CASCADE, related_name='related_refresh')
+
+    def __str__(self):
+        return f"refresh {self.product_id}"
+
+
 class Location(TimeStampedModel):
     """Location model for admin-managed locations."""
     name = models.CharField(max_length=150, unique=True)
@@ -438,6 +547,10 @@ class UserSubscription(TimeStampedModel):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Active-subscription lookups per user.
+            models.Index(fields=['user', 'end_date'], condition=models.Q(is_active=True), name='usersub_active_end_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} -> {self.subscription.name} ({self.start_date} - {self.end_date})"
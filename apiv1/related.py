@@ -0,0 +1,233 @@
+'''
+Related-products similarity model.
+
+Each ACTIVE product is described by hashed tokens from its name, its
+subcategories and its feature values, weighted by TF-IDF inside its category.
+Neighbours are the top-K cosine matches within the same category, computed
+with NumPy in row chunks and stored in the RelatedProduct table.
+
+Saves never compute neighbours in the request: they queue the product in
+RelatedProductRefresh, and ``build_related_products --pending`` refreshes the
+queued products, sharing one matrix per category.
+'''
+
+import re
+import zlib
+
+import numpy as np
+from django.db import transaction
+
+from oysloecore.sysutils.constants import ProductStatus
+
+TOP_K = 20
+# Hashed feature space; collisions only add a little noise to the scores.
+DIMENSIONS = 2048
+CHUNK_SIZE = 1024
+# Upper bound on candidates considered when refreshing queued products.
+MAX_INCREMENTAL_CANDIDATES = 5000
+# Queued products refreshed per batch.
+PENDING_BATCH_SIZE = 500
+
+NAME_WEIGHT = 1.0
+SUBCATEGORY_WEIGHT = 1.0
+FEATURE_WEIGHT = 1.5
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _bucket(token: str) -> int:
+    # crc32 is stable across processes, unlike hash().
+    return zlib.crc32(token.encode('utf-8')) % DIMENSIONS
+
+
+def _active_in_category(category_id):
+    from .models import Product
+
+    return Product.objects.filter(status=ProductStatus.ACTIVE.value, category_id=category_id)
+
+
+def _load_block(products):
+    '''Return ``(ids, tokens)`` for a queryset of products.
+
+    ``tokens`` holds one ``{token: weight}`` dict per product.
+    '''
+    from .models import ProductFeature
+
+    rows = list(products.values_list('id', 'name'))
+    ids = [pk for pk, _ in rows]
+    position = {pk: i for i, pk in enumerate(ids)}
+
+    tokens = [{} for _ in ids]
+    for i, (_, name) in enumerate(rows):
+        for term in _TERM_RE.findall((name or '').lower()):
+            tokens[i][f'n:{term}'] = NAME_WEIGHT
+
+    # Chunked so the IN list stays under the database's parameter limit.
+    for start in range(0, len(ids), CHUNK_SIZE):
+        features = (
+            ProductFeature.objects
+            .filter(product_id__in=ids[start:start + CHUNK_SIZE])
+            .values_list('product_id', 'feature_id', 'feature__subcategory_id', 'value')
+        )
+        for product_id, feature_id, subcategory_id, value in features:
+            i = position[product_id]
+            tokens[i][f's:{subcategory_id}'] = SUBCATEGORY_WEIGHT
+            tokens[i][f'f:{feature_id}={(value or "").strip().lower()}'] = FEATURE_WEIGHT
+    return ids, tokens
+
+
+def _vectorize(tokens) -> np.ndarray:
+    '''Build L2-normalised TF-IDF rows for a block of token dicts.'''
+    n = len(tokens)
+    rows, cols, weights = [], [], []
+    for i, bag in enumerate(tokens):
+        for token, weight in bag.items():
+            rows.append(i)
+            cols.append(_bucket(token))
+            weights.append(weight)
+
+    matrix = np.zeros((n, DIMENSIONS), dtype=np.float32)
+    if not rows:
+        return matrix
+    rows = np.asarray(rows)
+    cols = np.asarray(cols)
+    np.add.at(matrix, (rows, cols), np.asarray(weights, dtype=np.float32))
+
+    document_frequency = np.count_nonzero(matrix, axis=0)
+    idf = np.log((1 + n) / (1 + document_frequency)).astype(np.float32) + 1.0
+    matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores: np.ndarray, k: int):
+    '''Return ``(indices, scores)`` of the k best columns per row, best first.'''
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=int), np.empty((scores.shape[0], 0))
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1)
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+
+def _neighbours(matrix, ids, source_rows, top_k):
+    '''Yield ``(product_id, [(related_id, score), ...])`` for ``source_rows``.'''
+    for start in range(0, len(source_rows), CHUNK_SIZE):
+        chunk = source_rows[start:start + CHUNK_SIZE]
+        scores = matrix[chunk] @ matrix.T
+        scores[np.arange(len(chunk)), chunk] = -np.inf  # never relate a product to itself
+        indices, values = _top_k(scores, top_k)
+        for row, (cols, col_scores) in enumerate(zip(indices, values)):
+            yield ids[chunk[row]], [
+                (ids[col], float(score)) for col, score in zip(cols, col_scores) if score > 0
+            ]
+
+
+def _store(neighbour_lists) -> int:
+    from .models import RelatedProduct
+
+    entries = []
+    product_ids = []
+    for product_id, neighbours in neighbour_lists:
+        product_ids.append(product_id)
+        entries.extend(
+            RelatedProduct(product_id=product_id, related_id=related_id, score=score, rank=rank)
+            for rank, (related_id, score) in enumerate(neighbours)
+        )
+    with transaction.atomic():
+        RelatedProduct.objects.filter(product_id__in=product_ids).delete()
+        RelatedProduct.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
+
+
+def rebuild_related_products(top_k=TOP_K, stdout=None) -> int:
+    '''Recompute neighbours for every ACTIVE product, one category at a time.'''
+    from .models import Product, RelatedProduct, RelatedProductRefresh
+
+    # Products queued before the rebuild starts are covered by it.
+    last_queued = RelatedProductRefresh.objects.order_by('-id').values_list('id', flat=True).first()
+
+    categories = (
+        Product.objects
+        .filter(status=ProductStatus.ACTIVE.value)
+        .order_by()
+        .values_list('category_id', flat=True)
+        .distinct()
+    )
+    total = 0
+    for category_id in list(categories):
+        ids, tokens = _load_block(_active_in_category(category_id).order_by('id'))
+        if not ids:
+            continue
+        matrix = _vectorize(tokens)
+        for start in range(0, len(ids), CHUNK_SIZE):
+            rows = list(range(start, min(start + CHUNK_SIZE, len(ids))))
+            total += _store(_neighbours(matrix, ids, rows, top_k))
+        if stdout is not None:
+            stdout.write(f"[RELATED] category={category_id}: {len(ids)} products")
+
+    # Drop neighbour lists of products that are no longer ACTIVE.
+    RelatedProduct.objects.exclude(product__status=ProductStatus.ACTIVE.value).delete()
+    if last_queued is not None:
+        RelatedProductRefresh.objects.filter(id__lte=last_queued).delete()
+    return total
+
+
+def refresh_related_products(product_ids, top_k=TOP_K) -> int:
+    '''Recompute the neighbour lists of the given products.
+
+    Only their own lists change; other products pick them up as neighbours
+    on the next full ``build_related_products`` run. Products are grouped by
+    category so each category builds a single matrix.
+    '''
+    from .models import Product, RelatedProduct
+
+    by_category = {}
+    inactive = []
+    for pk, status, category_id in Product.objects.filter(pk__in=product_ids).values_list('id', 'status', 'category_id'):
+        if status == ProductStatus.ACTIVE.value:
+            by_category.setdefault(category_id, []).append(pk)
+        else:
+            inactive.append(pk)
+    RelatedProduct.objects.filter(product_id__in=inactive).delete()
+
+    total = 0
+    for category_id, targets in by_category.items():
+        candidates = _active_in_category(category_id).exclude(pk__in=targets)
+        candidates = candidates.order_by('-created_at')[:MAX_INCREMENTAL_CANDIDATES]
+        ids, tokens = _load_block(Product.objects.filter(pk__in=targets).order_by('id'))
+        candidate_ids, candidate_tokens = _load_block(candidates)
+        matrix = _vectorize(tokens + candidate_tokens)
+        total += _store(_neighbours(matrix, ids + candidate_ids, list(range(len(ids))), top_k))
+    return total
+
+
+def schedule_refresh(*product_ids) -> None:
+    '''Queue products for a neighbour refresh.
+
+    The queue row is written in the caller's transaction, so rolled-back
+    writes queue nothing; repeated saves of a product queue it once.
+    '''
+    from .models import RelatedProductRefresh
+
+    RelatedProductRefresh.objects.bulk_create(
+        [RelatedProductRefresh(product_id=pk) for pk in product_ids], ignore_conflicts=True,
+    )
+
+
+def refresh_pending(top_k=TOP_K, batch_size=PENDING_BATCH_SIZE, stdout=None) -> int:
+    '''Refresh every queued product, oldest first; returns the products refreshed.'''
+    from .models import RelatedProductRefresh
+
+    refreshed = 0
+    while True:
+        batch = list(RelatedProductRefresh.objects.order_by('id').values_list('id', 'product_id')[:batch_size])
+        if not batch:
+            return refreshed
+        refresh_related_products([product_id for _, product_id in batch], top_k=top_k)
+        RelatedProductRefresh.objects.filter(id__in=[pk for pk, _ in batch]).delete()
+        refreshed += len(batch)
+        if stdout is not None:
+            stdout.write(f"[RELATED] refreshed {refreshed} queued products")
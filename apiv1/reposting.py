@@ -0,0 +1,96 @@
+'''
+Cloning taken products into fresh ads.
+
+``clone_products`` copies a batch of products together with their features
+and images using one ``bulk_create`` per table. ``bulk_create`` skips
+``Product.save()`` and the model signals, so the work they would do (image
+URL list, search index, listing cache, related products, owner counters)
+is repeated here for the whole batch.
+'''
+
+import logging
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+
+from oysloecore.sysutils.constants import ProductStatus
+
+from . import catalog_cache
+from .models import Product, ProductFeature, ProductImage, RelatedProduct
+from .related import schedule_refresh
+from .search import get_search_backend
+
+logger = logging.getLogger(__name__)
+
+# Product columns carried over to the clone.
+CLONED_FIELDS = ('owner_id', 'name', 'image', 'description', 'category_id', 'price', 'location_id')
+
+
+def repostable_products(ids):
+    '''Products with the rows ``clone_products`` copies already loaded.'''
+    return (
+        Product.objects.filter(pk__in=ids)
+        .select_related('owner')
+        .prefetch_related('images', 'product_features')
+    )
+
+
+def clone_products(originals) -> list[Product]:
+    '''Create an ACTIVE, untaken copy of each product in ``originals``.
+
+    ``originals`` should come from ``repostable_products``. Returns the
+    clones in the same order. Likes, favourites, reviews and reports are
+    not carried over.
+    '''
+    if not originals:
+        return []
+
+    clones, galleries = [], []
+    for original in originals:
+        clone = Product(
+            **{field: getattr(original, field) for field in CLONED_FIELDS},
+            status=ProductStatus.ACTIVE.value,
+            is_taken=False,
+        )
+        gallery = [img.image for img in sorted(original.images.all(), key=lambda img: img.pk)]
+        clone.image_urls = clone.build_image_urls(gallery=gallery)
+        clones.append(clone)
+        galleries.append(gallery)
+
+    with transaction.atomic():
+        Product.objects.bulk_create(clones)
+
+        features, images = [], []
+        for original, clone, gallery in zip(originals, clones, galleries):
+            features.extend(
+                ProductFeature(product=clone, feature_id=pf.feature_id, value=pf.value)
+                for pf in original.product_features.all()
+            )
+            images.extend(ProductImage(product=clone, image=image) for image in gallery)
+        ProductFeature.objects.bulk_create(features)
+        ProductImage.objects.bulk_create(images)
+
+        # A clone has the same name, category and features as its original,
+        # so it starts out with the original's neighbours.
+        clone_of = {original.pk: clone.pk for original, clone in zip(originals, clones)}
+        neighbours = RelatedProduct.objects.filter(product_id__in=clone_of)
+        entries = [
+            RelatedProduct(product_id=clone_of[row.product_id], related_id=row.related_id, score=row.score, rank=row.rank)
+            for row in neighbours
+        ]
+        RelatedProduct.objects.bulk_create(entries)
+        covered = {entry.product_id for entry in entries}
+        schedule_refresh(*(clone.pk for clone in clones if clone.pk not in covered))
+
+        User = Product._meta.get_field('owner').related_model
+        for owner_id, count in Counter(clone.owner_id for clone in clones if clone.owner_id).items():
+            User.objects.filter(pk=owner_id).update(total_ads=F('total_ads') + count)
+
+    try:
+        get_search_backend().index(clones)
+    except Exception:
+        # Search may lag behind; `manage.py rebuild_search_index` repairs it.
+        logger.exception('Failed to index reposted products %s', [clone.pk for clone in clones])
+    catalog_cache.bump_generation()
+    return clones
@@ -0,0 +1,268 @@
+'''
+Full-text search backends for products.
+
+The SQLite backend keeps an FTS5 inverted index (``apiv1_product_fts``) in
+sync from the Product signals and ranks matches with BM25. The Postgres
+backend ranks with ``tsvector``/``tsquery``; any other database falls back to
+``icontains`` so search keeps working everywhere.
+'''
+
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+FTS_TABLE = 'apiv1_product_fts'
+MAX_QUERY_TERMS = 8
+# Column weights for bm25(): name matches outrank description matches.
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query: str) -> list[str]:
+    '''Split a user query into lowercase word terms.'''
+    return _TERM_RE.findall((query or '').lower())[:MAX_QUERY_TERMS]
+
+
+class BaseSearchBackend:
+    '''Interface shared by the product search backends.'''
+    full_text = False
+    # True when the backend maintains its own index that must be kept in sync.
+    maintains_index = False
+
+    def index(self, products) -> None:
+        pass
+
+    def remove(self, product_ids) -> None:
+        pass
+
+    def rebuild(self, chunk_size=2000) -> int:
+        return 0
+
+    def search(self, query, *, category=None, location=None, status=None, limit=50, offset=0) -> list[int]:
+        '''Return product ids matching ``query``, best match first.'''
+        raise NotImplementedError
+
+    def matches(self, queryset, query):
+        '''Narrow ``queryset`` to every product matching ``query``, without a limit.'''
+        raise NotImplementedError
+
+    def ranked(self, queryset, query):
+        '''Like ``matches``, annotating ``search_rank`` (higher is better) where supported.'''
+        return self.matches(queryset, query)
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    full_text = True
+    maintains_index = True
+
+    # The index table itself is created by migration 0032_product_fts_index.
+
+    def index(self, products) -> None:
+        rows = [
+            (p.pk, p.name or '', p.description or '', p.category_id, p.location_id, p.status)
+            for p in products
+        ]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description, category_id, location_id, status) '
+                'VALUES (%s, %s, %s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove(self, product_ids) -> None:
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in product_ids])
+
+    def rebuild(self, chunk_size=2000) -> int:
+        from .models import Product
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        total = 0
+        batch = []
+        fields = ('id', 'name', 'description', 'category_id', 'location_id', 'status')
+        for product in Product.objects.only(*fields).iterator(chunk_size=chunk_size):
+            batch.append(product)
+            if len(batch) >= chunk_size:
+                self.index(batch)
+                total += len(batch)
+                batch = []
+        self.index(batch)
+        return total + len(batch)
+
+    @staticmethod
+    def match_expression(query) -> str:
+        # Quote each term (so FTS operators in user input are literal) and
+        # make it a prefix match; terms are implicitly ANDed.
+        return ' '.join(f'"{term}"*' for term in tokenize(query))
+
+    def matches(self, queryset, query):
+        if not tokenize(query):
+            return queryset.none()
+        # Uncorrelated, so it stays valid when the queryset is nested in another query.
+        rowids = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [self.match_expression(query)])
+        return queryset.filter(pk__in=rowids)
+
+    def ranked(self, queryset, query):
+        queryset = self.matches(queryset, query)
+        if not tokenize(query):
+            return queryset
+        table = connection.ops.quote_name(queryset.model._meta.db_table)
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, %s, %s) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id',
+            [NAME_WEIGHT, DESCRIPTION_WEIGHT, self.match_expression(query)],
+            output_field=FloatField(),
+        )
+        return queryset.annotate(search_rank=rank)
+
+    def search(self, query, *, category=None, location=None, status=None, limit=50, offset=0) -> list[int]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        match = self.match_expression(query)
+        sql = [f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s']
+        params = [match]
+        # UNINDEXED FTS5 columns have no type affinity, so ids must be bound as ints.
+        for column, value, cast in (('category_id', category, int), ('location_id', location, int), ('status', status, str)):
+            if value not in (None, ''):
+                sql.append(f'AND {column} = %s')
+                params.append(cast(value))
+        sql.append(f'ORDER BY bm25({FTS_TABLE}, %s, %s) LIMIT %s OFFSET %s')
+        params += [NAME_WEIGHT, DESCRIPTION_WEIGHT, limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(' '.join(sql), params)
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    '''Ranks with ``ts_rank`` over a weighted tsvector built at query time.
+
+    A stored ``tsvector`` column with a GIN index can replace the computed
+    vector without changing this interface.
+    '''
+    full_text = True
+
+    def search(self, query, *, category=None, location=None, status=None, limit=50, offset=0) -> list[int]:
+        from .models import Product
+
+        if not tokenize(query):
+            return []
+        qs = _apply_filters(Product.objects.all(), category, location, status)
+        qs = self.ranked(qs, query).order_by('-search_rank', '-created_at')
+        return list(qs.values_list('pk', flat=True)[offset:offset + limit])
+
+    def matches(self, queryset, query):
+        return self.ranked(queryset, query)
+
+    def ranked(self, queryset, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        terms = tokenize(query)
+        if not terms:
+            return queryset.none()
+        vector = SearchVector('name', weight='A') + SearchVector('description', weight='B')
+        ts_query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw')
+        return queryset.annotate(search_rank=SearchRank(vector, ts_query)).filter(search_rank__gt=0)
+
+
+class IContainsSearchBackend(BaseSearchBackend):
+    '''Fallback for databases without full-text support.'''
+
+    def search(self, query, *, category=None, location=None, status=None, limit=50, offset=0) -> list[int]:
+        from .models import Product
+
+        if not tokenize(query):
+            return []
+        qs = self.matches(_apply_filters(Product.objects.all(), category, location, status), query)
+        return list(qs.order_by('-created_at').values_list('pk', flat=True)[offset:offset + limit])
+
+    def matches(self, queryset, query):
+        terms = tokenize(query)
+        if not terms:
+            return queryset.none()
+        for term in terms:
+            queryset = queryset.filter(Q(name__icontains=term) | Q(description__icontains=term))
+        return queryset
+
+
+def _apply_filters(qs, category, location, status):
+    if category not in (None, ''):
+        qs = qs.filter(category_id=category)
+    if location not in (None, ''):
+        qs = qs.filter(location_id=location)
+    if status not in (None, ''):
+        qs = qs.filter(status=status)
+    return qs
+
+
+def sqlite_has_fts5() -> bool:
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            return bool(cursor.fetchone()[0])
+    except Exception:
+        return False
+
+
+_backend = None
+
+
+def get_search_backend() -> BaseSearchBackend:
+    '''Return the search backend for the default database.
+
+    ``PRODUCT_SEARCH_BACKEND`` (``fts5``, ``postgres`` or ``icontains``) can
+    force a backend; otherwise it is picked from the database vendor.
+    '''
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    name = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+    if not name:
+        if connection.vendor == 'sqlite' and sqlite_has_fts5():
+            name = 'fts5'
+        elif connection.vendor == 'postgresql':
+            name = 'postgres'
+        else:
+            name = 'icontains'
+
+    _backend = {
+        'fts5': SQLiteFTS5Backend,
+        'postgres': PostgresSearchBackend,
+    }.get(name, IContainsSearchBackend)()
+    return _backend
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    '''``?search=`` filter backed by the full-text index when available.
+
+    Every match is kept and, unless the request picks an ``ordering``, the
+    best matches come first; ``ProductViewSet`` pages those by offset since a
+    cursor cannot key on the score. Falls back to DRF's ``icontains`` search on
+    databases without a full-text index.
+    '''
+
+    def is_ranked(self, request) -> bool:
+        '''True when results come back in relevance order rather than by a column.'''
+        return (
+            get_search_backend().full_text
+            and bool(tokenize(request.query_params.get(self.search_param, '')))
+            and not request.query_params.get(filters.OrderingFilter.ordering_param)
+        )
+
+    def filter_queryset(self, request, queryset, view):
+        backend = get_search_backend()
+        query = request.query_params.get(self.search_param, '')
+        if not backend.full_text or not tokenize(query):
+            return super().filter_queryset(request, queryset, view)
+        return backend.ranked(queryset, query).order_by('-search_rank', '-created_at')
@@ -1,4 +1,5 @@
 from django.contrib.auth import authenticate
+from django.db import models
 from rest_framework import serializers
 
 from accounts.models import User, WalletCashoutRequest
@@ -29,10 +30,11 @@ from apiv1.models import (
     JobApplication,
 )
 from notifications.models import Alert
-from oysloecore.sysutils.constants import ProductStatus
+from oysloecore.sysutils.constants import ProductStatus, ProductType
+from oysloecore.sysutils.fieldsets import SparseFieldsetsMixin
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     active_ads = serializers.IntegerField(read_only=True)
     taken_ads = serializers.IntegerField(read_only=True)
     total_ads = serializers.IntegerField(read_only=True)
@@ -216,7 +218,19 @@ class ProductOwnerSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'email', 'phone', 'second_number', 'name', 'total_ads', 'total_taken_ads', 'admin_verified', 'id_verified', 'level', 'avatar', 'business_logo', 'business_name']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductListSerializer(serializers.ListSerializer):
+    """Resolves owner subscription multipliers for the whole page in one go."""
+
+    def to_representation(self, data):
+        from oysloecore.sysutils.services import resolve_owner_multipliers
+
+        items = list(data.all() if isinstance(data, models.Manager) else data)
+        if 'owner_multipliers' not in self.context and 'multiplier' in self.child.fields:
+            self.context['owner_multipliers'] = resolve_owner_multipliers(p.owner_id for p in items)
+        return super().to_representation(items)
+
+
+class ProductSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
     product_features = ProductFeatureSerializer(many=True, read_only=True)
     location = ProductLocationSerializer(read_only=True)
@@ -239,19 +253,33 @@ class ProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
-        fields = "__all__"
+        # Moderation-queue claims are staff bookkeeping, not part of the ad. The
+        # raw counter columns are exposed through the ``total_*`` fields below,
+        # and the stored image list repeats ``image`` and ``images``.
+        exclude = ('claimed_by', 'claimed_until', 'image_urls') + Product.COUNTER_FIELDS
+        list_serializer_class = ProductListSerializer
+        # ``?expand=category`` replaces the category id with the category object.
+        expandable_fields = {'category': ('apiv1.serializers.CategorySerializer', {})}
 
     def get_multiplier(self, obj) -> float:
-        sub = UserSubscription.objects.filter(user=obj.owner, is_active=True).order_by('-created_at').first()
-        if sub and sub.subscription:
-            return sub.subscription.multiplier
-        return 1.0
+        from oysloecore.sysutils.services import resolve_owner_multipliers
+
+        multipliers = self.context.get('owner_multipliers') or {}
+        if obj.owner_id not in multipliers:
+            multipliers = resolve_owner_multipliers([obj.owner_id])
+        return multipliers.get(obj.owner_id, 1.0)
+
+    # Counters come from the denormalised columns on Product. The per-user flags
+    # are annotated by ``Product.objects.with_engagement``; the per-row queries
+    # below are only used for single, un-annotated instances.
 
     def get_favourited_by_user(self, obj) -> bool:
         request = self.context.get('request')
         user = getattr(request, 'user', None)
         if not user or not getattr(user, 'is_authenticated', False):
             return False
+        if hasattr(obj, 'is_favourited'):
+            return bool(obj.is_favourited)
         return obj.favourited_by.filter(user=user).exists()
 
     def get_liked_by_user(self, obj) -> bool:
@@ -259,27 +287,103 @@ class ProductSerializer(serializers.ModelSerializer):
         user = getattr(request, 'user', None)
         if not user or not getattr(user, 'is_authenticated', False):
             return False
+        if hasattr(obj, 'is_liked'):
+            return bool(obj.is_liked)
         return obj.liked_by.filter(user=user).exists()
 
     def get_total_likes(self, obj) -> int:
-        return obj.liked_by.count()
+        return obj.likes_count
 
     def get_total_favourites(self, obj) -> int:
-        return obj.favourited_by.count()
+        return obj.favourites_count
 
     def get_total_reviews(self, obj) -> int:
-        return obj.reviews.count()
+        return obj.reviews_count
 
     def get_average_rating(self, obj) -> str | None:
-        from django.db.models import Avg
-        agg = obj.reviews.aggregate(avg=Avg('rating'))
-        avg = agg.get('avg')
+        avg = obj.average_rating
         if avg is None:
             return None
         return f"{avg:.1f}"
 
     def get_total_reports(self, obj) -> int:
-        return obj.reports.count()
+        return obj.reports_count
+
+
+class ProductCardSerializer(ProductSerializer):
+    """Compact product representation for feeds (``?view=card``).
+
+    Skips the nested images, features and owner blocks; pair it with
+    ``ProductViewSet.CARD_FIELDS`` so only these columns are loaded.
+    """
+    image = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'pid', 'name', 'price', 'type', 'status', 'is_taken', 'image', 'location',
+            'multiplier', 'liked_by_user', 'favourited_by_user', 'total_likes', 'total_favourites',
+            'total_reviews', 'average_rating', 'created_at',
+        ]
+        read_only_fields = fields
+        list_serializer_class = ProductListSerializer
+
+    def get_image(self, obj) -> str:
+        from apiv1.models import normalize_image_url
+
+        if obj.image_urls:
+            return obj.image_urls[0]
+        return normalize_image_url(obj.image)
+
+
+class ProductExportSerializer(serializers.ModelSerializer):
+    """Flat product row for the streaming catalogue export (NDJSON / CSV)."""
+    category_name = serializers.CharField(source='category.name', default=None, read_only=True)
+    location_name = serializers.CharField(source='location.name', default=None, read_only=True)
+    region = serializers.CharField(source='location.region', default=None, read_only=True)
+    image_urls = serializers.ListField(source='all_images', child=serializers.CharField(), read_only=True)
+    features = serializers.SerializerMethodField(read_only=True)
+    average_rating = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'pid', 'name', 'description', 'type', 'status', 'is_taken', 'price', 'duration',
+            'owner', 'category', 'category_name', 'location', 'location_name', 'region', 'image_urls',
+            'features', 'likes_count', 'favourites_count', 'reviews_count', 'average_rating',
+            'reports_count', 'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+    def get_features(self, obj) -> dict:
+        return {pf.feature.name: pf.value for pf in obj.product_features.all()}
+
+
+class ProductImportRowSerializer(serializers.Serializer):
+    """Scalar checks for one imported product row.
+
+    Taxonomy references (category, location, features) are resolved by
+    ``apiv1.importing.ProductImporter`` against preloaded lookups, so this
+    serializer never touches the database.
+    """
+    name = serializers.CharField(max_length=100)
+    description = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    type = serializers.ChoiceField(choices=[tag.value for tag in ProductType], required=False)
+    duration = serializers.CharField(max_length=100, required=False)
+    image = serializers.URLField(max_length=800, required=False, allow_blank=True)
+    images = serializers.ListField(child=serializers.URLField(max_length=800), required=False)
+    category = serializers.CharField(required=False, allow_blank=True)
+    location = serializers.CharField(required=False, allow_blank=True)
+    features = serializers.DictField(child=serializers.CharField(allow_blank=True), required=False)
+
+
+class ProductImportResultSerializer(serializers.Serializer):
+    rows = serializers.IntegerField()
+    created = serializers.IntegerField()
+    created_ids = serializers.ListField(child=serializers.IntegerField())
+    errors = serializers.ListField(child=serializers.DictField())
+    read_error = serializers.DictField(allow_null=True, help_text='Where reading stopped, if the file broke partway through.')
 
 
 class FeedbackSerializer(serializers.ModelSerializer):
@@ -323,13 +427,20 @@ class AdminCategoryWithSubcategoriesSerializer(serializers.ModelSerializer):
 
 class MessageSerializer(serializers.ModelSerializer):
     sender = UserSerializer(read_only=True)
+    is_read = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Message
         fields = ["id", "room", "sender", 'is_media', "content", "created_at", "is_read"]
 
+    def get_is_read(self, obj) -> bool:
+        # Annotated by ``Message.objects.with_read_state``; single messages fall back to a query.
+        if hasattr(obj, 'is_read'):
+            return bool(obj.is_read)
+        return not obj.room.memberships.filter(last_read_message_id__lt=obj.pk).exclude(user_id=obj.sender_id).exists()
 
-class ChatRoomSerializer(serializers.ModelSerializer):
+
+class ChatRoomSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     members = UserSerializer(many=True, read_only=True)
     messages = MessageSerializer(many=True, read_only=True)
     total_unread = serializers.SerializerMethodField(read_only=True)
@@ -355,6 +466,9 @@ class ChatRoomSerializer(serializers.ModelSerializer):
         ]
 
     def get_total_unread(self, obj) -> int:
+        # Annotated by apiv1.chatlist.chatroom_list_queryset for the requester.
+        if hasattr(obj, "unread_count"):
+            return obj.unread_count
         request = self.context.get("request")
         user = getattr(request, "user", None)
         if user and hasattr(obj, "get_total_unread_messages"):
@@ -383,6 +497,8 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'likes_count']
 
     def get_likes_count(self, obj) -> int:
+        if hasattr(obj, 'num_likes'):
+            return obj.num_likes
         return obj.likes.count()
 
 class CreateReviewSerializer(serializers.ModelSerializer):
@@ -673,10 +789,41 @@ class AdminChangeProductStatusSerializer(serializers.Serializer):
         return attrs
 
 
+class AdminBatchProductStatusSerializer(AdminChangeProductStatusSerializer):
+    id = None
+    ids = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=500)
+
+
+class AdminBatchProductStatusResultSerializer(serializers.Serializer):
+    updated = serializers.ListField(child=serializers.IntegerField())
+    not_found = serializers.ListField(child=serializers.IntegerField())
+    alerts_created = serializers.IntegerField()
+
+
+class ModerationQueueRequestSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class ModerationQueueResponseSerializer(serializers.Serializer):
+    claimed_until = serializers.DateTimeField(allow_null=True)
+    results = ProductSerializer(many=True)
+
+
 class MarkAsTakenSerializer(serializers.Serializer):
     product = serializers.IntegerField()
 
 
+class BulkRepostSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=100)
+
+
+class BulkRepostResultSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=['created', 'error'])
+    detail = serializers.CharField(required=False)
+    product = ProductSerializer(required=False)
+
+
 class AlertSerializer(serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(
         queryset=User.objects.all(),
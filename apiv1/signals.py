@@ -0,0 +1,122 @@
+import logging
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from oysloecore.sysutils.services import invalidate_owner_multiplier
+
+from . import catalog_cache, unread
+from .models import (
+    ChatMembership, ChatRoom, Favourite, Location, Message, Product, ProductFeature, ProductImage, ProductLike,
+    ProductReport, Review, UserSubscription,
+)
+from .related import schedule_refresh
+from .search import get_search_backend
+
+logger = logging.getLogger(__name__)
+
+# Saves touching only these fields can change a product's neighbours.
+RELATED_FIELDS = {'name', 'category', 'category_id', 'status'}
+
+
+@receiver(post_save, sender=UserSubscription)
+@receiver(post_delete, sender=UserSubscription)
+def invalidate_subscription_multiplier(sender, instance: UserSubscription, **kwargs):
+    invalidate_owner_multiplier(instance.user_id)
+
+
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, instance: Product, raw: bool = False, **kwargs):
+    if raw:
+        return
+    try:
+        get_search_backend().index([instance])
+    except Exception:
+        # Search may lag behind; `manage.py rebuild_search_index` repairs it.
+        logger.exception('Failed to index product %s for search', instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_search(sender, instance: Product, **kwargs):
+    try:
+        get_search_backend().remove([instance.pk])
+    except Exception:
+        logger.exception('Failed to remove product %s from search index', instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def refresh_related_for_product(sender, instance: Product, raw: bool = False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not RELATED_FIELDS.intersection(update_fields)):
+        return
+    schedule_refresh(instance.pk)
+
+
+@receiver(post_save, sender=ProductFeature)
+@receiver(post_delete, sender=ProductFeature)
+def refresh_related_for_feature(sender, instance: ProductFeature, raw: bool = False, **kwargs):
+    if raw:
+        return
+    schedule_refresh(instance.product_id)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def refresh_product_image_urls(sender, instance: ProductImage, raw: bool = False, **kwargs):
+    # Skip when the product itself is being deleted along with its images.
+    if raw or isinstance(kwargs.get('origin'), Product):
+        return
+    Product.refresh_image_urls(instance.product_id)
+
+
+@receiver(m2m_changed, sender=ChatRoom.members.through)
+def sync_chat_memberships(sender, instance, action, reverse, pk_set, **kwargs):
+    # ``instance`` is the room, or the user when changed via ``user.chatrooms``.
+    side = 'user' if reverse else 'room'
+    other = 'room' if reverse else 'user'
+    if action == 'post_add' and pk_set:
+        ChatMembership.objects.bulk_create(
+            [ChatMembership(**{f'{side}_id': instance.pk, f'{other}_id': pk}) for pk in pk_set],
+            ignore_conflicts=True,
+        )
+        # New members start unread; seed their counters from the room history.
+        added = ChatMembership.objects.filter(**{side: instance, f'{other}_id__in': pk_set})
+        added.update(unread_count=unread.actual_unread())
+        unread.invalidate(added.values_list('user_id', flat=True))
+    elif action in ('post_remove', 'post_clear'):
+        removed = ChatMembership.objects.filter(**{side: instance})
+        if action == 'post_remove':
+            if not pk_set:
+                return
+            removed = removed.filter(**{f'{other}_id__in': pk_set})
+        user_ids = list(removed.values_list('user_id', flat=True))
+        removed.delete()
+        unread.invalidate(user_ids)
+
+
+@receiver(post_save, sender=Message)
+def count_unread_message(sender, instance: Message, created: bool, raw: bool = False, **kwargs):
+    if created and not raw:
+        unread.record_message(instance)
+
+
+@receiver(post_save, sender=ChatRoom)
+def refresh_unread_totals_for_room(sender, instance: ChatRoom, created: bool, raw: bool = False, update_fields=None, **kwargs):
+    # Totals only cover live rooms, so (un)deleting a room changes its members' totals.
+    if created or raw or (update_fields is not None and 'is_deleted' not in update_fields):
+        return
+    unread.invalidate(instance.memberships.values_list('user_id', flat=True))
+
+
+# Models rendered in product listings; any write invalidates cached pages.
+CATALOG_MODELS = (
+    Product, ProductImage, ProductFeature, Review, ProductLike, Favourite, ProductReport, UserSubscription, Location,
+)
+
+
+def bump_catalog_generation(sender, **kwargs):
+    catalog_cache.bump_generation()
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(bump_catalog_generation, sender=model, dispatch_uid=f'catalog_generation_save_{model.__name__}')
+    post_delete.connect(bump_catalog_generation, sender=model, dispatch_uid=f'catalog_generation_delete_{model.__name__}')
@@ -1,3 +1,1585 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from apiv1 import catalog_cache
+from apiv1.models import (
+    Category, ChatRoom, Favourite, Feature, PosibleFeatureValue, Product, ProductFeature, ProductImage, ProductLike,
+    RelatedProduct, Review, SubCategory, Subscription, UserSubscription,
+)
+from apiv1.related import rebuild_related_products
+from apiv1.serializers import ProductCardSerializer
+from oysloecore.sysutils.constants import ProductStatus
+
+
+def make_user(n, **kwargs):
+    return User.objects.create_user(
+        email=f'user{n}@example.com',
+        phone=f'02000000{n:02d}',
+        password='pass1234',
+        name=f'User {n}',
+        **kwargs,
+    )
+
+
+def make_product(owner, n, **kwargs):
+    kwargs.setdefault('status', ProductStatus.ACTIVE.value)
+    kwargs.setdefault('name', f'Product {n}')
+    kwargs.setdefault('description', 'A product')
+    kwargs.setdefault('price', Decimal('10.00'))
+    return Product.objects.create(owner=owner, **kwargs)
+
+
+class ProductEngagementCounterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = make_user(1)
+        self.viewer = make_user(2)
+        self.products = [make_product(self.owner, i) for i in range(3)]
+
+    def _list(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api-v1/products/')
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in ctx.captured_queries]
+
+    def _engage(self, user, product, *actions, rating=None):
+        self.client.force_authenticate(user)
+        for name in actions:
+            self.assertEqual(self.client.post(f'/api-v1/products/{product.id}/{name}/', {'reason': 'OTHER'}).status_code, 200)
+        if rating is not None:
+            response = self.client.post('/api-v1/reviews/', {'product': product.id, 'rating': rating})
+            self.assertEqual(response.status_code, 201)
+        self.client.force_authenticate(None)
+
+    def test_actions_maintain_counters(self):
+        product = self.products[0]
+        self._engage(self.viewer, product, 'like', 'favourite', 'report', rating=4)
+        self._engage(self.owner, product, 'like', 'like', rating=5)
+
+        self.client.force_authenticate(self.viewer)
+        response, _ = self._list()
+        row = next(p for p in response.data if p['id'] == product.id)
+        self.assertEqual(row['total_likes'], 1)
+        self.assertEqual(row['total_favourites'], 1)
+        self.assertEqual(row['total_reviews'], 2)
+        self.assertEqual(row['average_rating'], '4.5')
+        self.assertEqual(row['total_reports'], 1)
+        self.assertTrue(row['liked_by_user'])
+        self.assertTrue(row['favourited_by_user'])
+        self.assertFalse(set(Product.COUNTER_FIELDS) & set(row))
+
+        review = Review.objects.get(user=self.viewer)
+        self.client.force_authenticate(self.viewer)
+        self.client.delete(f'/api-v1/reviews/{review.id}/')
+        product.refresh_from_db()
+        self.assertEqual((product.reviews_count, product.rating_sum), (1, 5))
+
+    def test_engagement_needs_no_count_queries(self):
+        self.client.force_authenticate(self.viewer)
+        _, queries = self._list()
+        for table, expected in (('apiv1_productlike', 1), ('apiv1_favourite', 1), ('apiv1_review', 0), ('apiv1_productreport', 0)):
+            self.assertEqual(sum(table in sql for sql in queries), expected, table)
+
+    def test_reconcile_repairs_drift(self):
+        product = self.products[0]
+        ProductLike.objects.create(user=self.viewer, product=product)
+        Review.objects.create(user=self.viewer, product=product, rating=3)
+        Product.objects.filter(pk=self.products[1].pk).update(favourites_count=7)
+        out = StringIO()
+        call_command('reconcile_product_counters', stdout=out)
+        self.assertIn('fixed 2', out.getvalue())
+        product.refresh_from_db()
+        self.assertEqual((product.likes_count, product.reviews_count, product.rating_sum), (1, 1, 3))
+        self.assertEqual(Product.objects.get(pk=self.products[1].pk).favourites_count, 0)
+
+    def test_full_save_keeps_concurrent_counter_updates(self):
+        stale = Product.objects.get(pk=self.products[0].pk)
+        Product.adjust_counters(stale.pk, likes_count=1, reviews_count=1, rating_sum=4)
+        stale.name = 'Renamed'
+        stale.save()
+        product = Product.objects.get(pk=stale.pk)
+        self.assertEqual(product.name, 'Renamed')
+        self.assertEqual((product.likes_count, product.reviews_count, product.rating_sum), (1, 1, 4))
+
+        # The owner's edit goes through the serializer's full save.
+        self._engage(self.viewer, product, 'like')
+        self.client.force_authenticate(self.owner)
+        response = self.client.patch(f'/api-v1/products/{product.pk}/', {'description': 'Edited'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        product.refresh_from_db()
+        self.assertEqual((product.description, product.likes_count), ('Edited', 2))
+
+    def test_full_save_of_a_deferred_instance_writes_only_loaded_fields(self):
+        product = Product.objects.only('id', 'name').get(pk=self.products[0].pk)
+        product.name = 'Renamed'
+        with CaptureQueriesContext(connection) as ctx:
+            product.save()
+        # The write itself is one UPDATE of the loaded column; later queries belong to the signals.
+        self.assertRegex(ctx.captured_queries[0]['sql'], r'^UPDATE "apiv1_product" SET "name" = \S+ WHERE')
+        self.assertEqual(Product.objects.get(pk=product.pk).name, 'Renamed')
+
+    def test_full_save_reinserts_a_deleted_row(self):
+        product = self.products[0]
+        Product.objects.filter(pk=product.pk).delete()
+        product.save()
+        self.assertTrue(Product.objects.filter(pk=product.pk).exists())
+
+
+class OptionalKeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        owner = make_user(1)
+        self.products = [make_product(owner, i) for i in range(5)]
+
+    def test_unpaginated_without_parameters(self):
+        response = self.client.get('/api-v1/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 5)
+
+    def test_cursor_walks_every_product_once(self):
+        seen = []
+        url = '/api-v1/products/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(p['id'] for p in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, [p.id for p in reversed(self.products)])
+
+    def test_ordering_keeps_a_unique_cursor_key(self):
+        response = self.client.get('/api-v1/products/', {'page_size': 2, 'ordering': 'price'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api-v1/products/', {'ordering': 'price'}).status_code, 200)
+
+        Product.objects.update(created_at=self.products[0].created_at)
+        seen = []
+        url = '/api-v1/products/?page_size=2&ordering=created_at'
+        while url:
+            response = self.client.get(url)
+            seen.extend(p['id'] for p in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, [p.id for p in self.products])
+
+
+class OwnerMultiplierResolverTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        self.owner = make_user(1)
+        self.other = make_user(2)
+        for i in range(3):
+            make_product(self.owner, i)
+        make_product(self.other, 3)
+        self.plan = Subscription.objects.create(
+            name='Gold', tier='gold', price=Decimal('50.00'), multiplier=Decimal('2.50'),
+            features='boost', duration_days=30, max_products=0,
+        )
+
+    def _subscribe(self, user, **kwargs):
+        now = timezone.now()
+        kwargs.setdefault('end_date', now + timedelta(days=30))
+        return UserSubscription.objects.create(user=user, subscription=self.plan, start_date=now, **kwargs)
+
+    def _multipliers(self):
+        response = self.client.get('/api-v1/products/')
+        return {p['owner']['id']: p['multiplier'] for p in response.data}
+
+    def test_page_resolves_multipliers_in_one_query(self):
+        self._subscribe(self.owner)
+        with CaptureQueriesContext(connection) as ctx:
+            multipliers = self._multipliers()
+        subscription_queries = [q for q in ctx.captured_queries if 'apiv1_usersubscription' in q['sql']]
+        self.assertEqual(len(subscription_queries), 1)
+        self.assertEqual(multipliers, {self.owner.id: Decimal('2.50'), self.other.id: 1.0})
+
+    def test_saving_a_subscription_invalidates_the_cache(self):
+        self.assertEqual(self._multipliers()[self.other.id], 1.0)
+        self._subscribe(self.other)
+        self.assertEqual(self._multipliers()[self.other.id], Decimal('2.50'))
+
+    def test_expired_subscription_is_ignored(self):
+        self._subscribe(self.owner, end_date=timezone.now() - timedelta(days=1))
+        self.assertEqual(self._multipliers()[self.owner.id], 1.0)
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        owner = make_user(1)
+        self.category = Category.objects.create(name='Phones')
+        self.phone = make_product(owner, 1, category=self.category)
+        self.phone.name = 'Samsung Galaxy phone'
+        self.phone.save()
+        self.case = make_product(owner, 2)
+        self.case.description = 'Leather case that fits any Samsung phone'
+        self.case.save()
+        self.pending = make_product(owner, 3, status=ProductStatus.PENDING.value)
+        self.pending.name = 'Samsung charger'
+        self.pending.save()
+
+    def _search(self, **params):
+        response = self.client.get('/api-v1/products/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [p['id'] for p in response.data]
+
+    def test_name_matches_rank_first_and_prefixes_match(self):
+        self.assertEqual(self._search(q='sams'), [self.phone.id, self.case.id])
+
+    def test_filters_and_visibility(self):
+        self.assertEqual(self._search(q='samsung', category=self.category.id), [self.phone.id])
+        self.assertNotIn(self.pending.id, self._search(q='charger'))
+
+    def test_pages_only_count_visible_hits(self):
+        other = make_user(2)
+        for i in range(3):
+            # A shorter name ranks above the requester's own "Samsung charger".
+            make_product(other, 10 + i, status=ProductStatus.PENDING.value, name='Charger')
+        self.client.force_authenticate(self.pending.owner)
+        self.assertEqual(self._search(q='charger', status=ProductStatus.PENDING.value, limit=1), [self.pending.id])
+
+    def test_index_follows_product_writes(self):
+        self.phone.name = 'Nokia brick'
+        self.phone.save()
+        self.assertEqual(self._search(q='nokia'), [self.phone.id])
+        self.phone.delete()
+        self.assertEqual(self._search(q='nokia'), [])
+
+    def test_requires_query(self):
+        self.assertEqual(self.client.get('/api-v1/products/search/').status_code, 400)
+
+    def test_list_search_keeps_every_match_in_relevance_order(self):
+        from apiv1.search import get_search_backend
+
+        owner = make_user(2)
+        # More description-only matches than the BM25 id list used to be cut to.
+        extra = Product.objects.bulk_create([
+            Product(owner=owner, name=f'Accessory {i}', description='Fits a Samsung phone',
+                    price=Decimal('5.00'), status=ProductStatus.ACTIVE.value, pid=f'pid_bulk{i:06d}')
+            for i in range(1005)
+        ])
+        get_search_backend().index(extra)
+
+        response = self.client.get('/api-v1/products/', {'search': 'samsung', 'fields': 'id'})
+        self.assertEqual(response.status_code, 200)
+        ids = [p['id'] for p in response.data]
+        self.assertEqual(len(ids), 1007)
+        self.assertEqual(ids[0], self.phone.id)
+        self.assertNotIn(self.pending.id, ids)
+
+        response = self.client.get('/api-v1/products/', {'search': 'samsung', 'fields': 'id', 'ordering': 'created_at'})
+        self.assertEqual(response.data[0]['id'], self.phone.id)
+        self.assertEqual(response.data[-1]['id'], extra[-1].id)
+
+    def test_paged_list_search_keeps_relevance_order(self):
+        params = {'search': 'samsung', 'fields': 'id', 'page_size': 1}
+        first = self.client.get('/api-v1/products/', params)
+        second = self.client.get('/api-v1/products/', {**params, 'offset': 1})
+        self.assertEqual([p['id'] for p in first.data['results']], [self.phone.id])
+        self.assertEqual([p['id'] for p in second.data['results']], [self.case.id])
+        self.assertEqual(first.data['count'], 2)
+
+
+class RelatedProductIndexTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        owner = make_user(1)
+        phones = Category.objects.create(name='Phones')
+        other = Category.objects.create(name='Furniture')
+        subcategory = SubCategory.objects.create(category=phones, name='Smartphones')
+        self.brand = Feature.objects.create(subcategory=subcategory, name='Brand', description='Brand')
+        self.base = make_product(owner, 1, category=phones)
+        self.close = make_product(owner, 2, category=phones)
+        self.far = make_product(owner, 3, category=phones)
+        self.elsewhere = make_product(owner, 4, category=other)
+        names = {
+            self.base: 'Samsung Galaxy S21',
+            self.close: 'Samsung Galaxy S20',
+            self.far: 'iPhone 12',
+            self.elsewhere: 'Samsung Galaxy sofa',
+        }
+        for product, name in names.items():
+            product.name = name
+            product.save()
+        for product, brand in ((self.base, 'Samsung'), (self.close, 'Samsung'), (self.far, 'Apple')):
+            ProductFeature.objects.create(product=product, feature=self.brand, value=brand)
+
+    def _related(self):
+        response = self.client.get('/api-v1/products/related/', {'product_id': self.base.id})
+        self.assertEqual(response.status_code, 200)
+        return [p['id'] for p in response.data]
+
+    def test_neighbours_are_ranked_within_the_category(self):
+        rebuild_related_products()
+        self.assertEqual(self._related(), [self.close.id, self.far.id])
+
+    def test_saves_queue_a_refresh_instead_of_computing_inline(self):
+        from django.core.management import call_command
+        from apiv1.models import RelatedProductRefresh
+
+        RelatedProductRefresh.objects.all().delete()
+        product = make_product(self.base.owner, 5, category=self.base.category)
+        product.name = 'Samsung Galaxy S22'
+        product.save()
+        ProductFeature.objects.create(product=product, feature=self.brand, value='Samsung')
+        self.assertFalse(RelatedProduct.objects.filter(product=product).exists())
+        self.assertEqual(list(RelatedProductRefresh.objects.values_list('product_id', flat=True)), [product.id])
+
+        call_command('build_related_products', '--pending', stdout=StringIO())
+        self.assertFalse(RelatedProductRefresh.objects.exists())
+        neighbours = list(
+            RelatedProduct.objects.filter(product=product).order_by('rank').values_list('related_id', flat=True)
+        )
+        self.assertCountEqual(neighbours[:2], [self.base.id, self.close.id])
+        self.assertEqual(neighbours[2:], [self.far.id])
+
+    def test_falls_back_when_not_indexed(self):
+        self.assertFalse(RelatedProduct.objects.exists())
+        self.assertEqual(self.client.get('/api-v1/products/related/', {'product_id': self.base.id}).status_code, 200)
+
+
+class ProductImageUrlsTests(TestCase):
+    def setUp(self):
+        self.owner = make_user(1)
+        self.product = make_product(self.owner, 1, image='https://cdn.example.com/a.jpg')
+
+    def test_list_follows_image_writes(self):
+        self.assertEqual(self.product.image_urls, ['https://cdn.example.com/a.jpg'])
+        extra = ProductImage.objects.create(product=self.product, image='https://cdn.example.com/b.jpg')
+        ProductImage.objects.create(product=self.product, image='https://cdn.example.com/a.jpg')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_urls, ['https://cdn.example.com/a.jpg', 'https://cdn.example.com/b.jpg'])
+
+        extra.delete()
+        self.product.image = ''
+        self.product.save(update_fields=['image'])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_urls, ['https://cdn.example.com/a.jpg'])
+
+    def test_only_cards_expose_the_list(self):
+        client = APIClient()
+        detail = client.get(f'/api-v1/products/{self.product.pk}/').data
+        self.assertNotIn('image_urls', detail)
+        card = client.get('/api-v1/products/', {'view': 'card'}).data[0]
+        self.assertEqual(card['image'], 'https://cdn.example.com/a.jpg')
+
+    def test_backfill_command(self):
+        ProductImage.objects.create(product=self.product, image='/uploads/b.jpg')
+        Product.objects.update(image_urls=None)
+        call_command('backfill_image_urls', stdout=StringIO())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_urls, ['https://cdn.example.com/a.jpg', '/assets/uploads/b.jpg'])
+
+    def test_chat_room_list_reads_stored_images(self):
+        other = make_user(2)
+        for i in range(3):
+            room = ChatRoom.objects.create(room_id=f'room-{i}', name=f'room-{i}', product=self.product)
+            room.members.add(self.owner, other)
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api-v1/chatrooms/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({r['ad_image'] for r in response.data}, {'https://cdn.example.com/a.jpg'})
+        self.assertFalse(any('apiv1_productimage' in q['sql'] for q in ctx.captured_queries))
+
+
+class ProductCardViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = make_user(1)
+        self.product = make_product(self.user, 1, image='https://cdn.example.com/a.jpg')
+        Favourite.objects.create(user=self.user, product=self.product)
+
+    def test_card_view_is_compact(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api-v1/products/', {'view': 'card'})
+        self.assertEqual(response.status_code, 200)
+        card = response.data[0]
+        self.assertEqual(card['image'], 'https://cdn.example.com/a.jpg')
+        self.assertNotIn('product_features', card)
+        self.assertNotIn('owner', card)
+        product_query = next(q['sql'] for q in ctx.captured_queries if 'FROM "apiv1_product"' in q['sql'])
+        self.assertNotIn('"apiv1_product"."description"', product_query)
+        self.assertFalse(any('apiv1_productfeature' in q['sql'] for q in ctx.captured_queries))
+
+    def test_card_view_on_favourites(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api-v1/products/favourites/', {'view': 'card'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data[0]), set(ProductCardSerializer.Meta.fields))
+        self.assertTrue(response.data[0]['favourited_by_user'])
+
+
+class ProductPrefetchPlanTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        self.owner = make_user(1)
+        self.reviewer = make_user(2)
+        category = Category.objects.create(name='Phones')
+        subcategory = SubCategory.objects.create(category=category, name='Smartphones')
+        self.features = []
+        for name in ('Brand', 'Colour', 'Storage'):
+            feature = Feature.objects.create(subcategory=subcategory, name=name, description=name)
+            feature.values.create(value='A')
+            feature.values.create(value='B')
+            self.features.append(feature)
+
+    def _add_products(self, count):
+        for i in range(count):
+            product = make_product(self.owner, Product.objects.count())
+            ProductImage.objects.create(product=product, image=f'https://cdn.example.com/{product.pk}.jpg')
+            for feature in self.features:
+                ProductFeature.objects.create(product=product, feature=feature, value='A')
+            Review.objects.create(user=self.reviewer, product=product, rating=4)
+
+    def _get(self, url, expected):
+        from django.core.cache import cache
+        cache.clear()
+        with self.assertNumQueries(expected):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_product_list_query_count_is_flat(self):
+        # products, images, product features, feature values, owner multipliers
+        self._add_products(1)
+        self._get('/api-v1/products/', 5)
+        self._add_products(4)
+        response = self._get('/api-v1/products/', 5)
+        self.assertEqual(len(response.data[0]['product_features'][0]['feature']['values']), 2)
+
+    def test_product_detail_query_count(self):
+        # the list plan; the ETag is built from the fetched object
+        self._add_products(1)
+        self._get(f'/api-v1/products/{Product.objects.get().pk}/', 5)
+
+    def test_review_list_query_count_is_flat(self):
+        # reviews, reviewers, products, images, product features, feature values, owner multiplier
+        self._add_products(1)
+        self._get('/api-v1/reviews/', 7)
+        self._add_products(4)
+        response = self._get('/api-v1/reviews/', 7)
+        self.assertEqual(response.data[0]['user']['active_ads'], 0)
+
+    def test_report_list_query_count_is_flat(self):
+        from apiv1.models import ProductReport
+
+        self._add_products(3)
+        for product in Product.objects.all():
+            ProductReport.objects.create(product=product, user=self.reviewer, reason=ProductReport.REASON_OTHER)
+        self.client.force_authenticate(self.owner)
+        self.owner.is_staff = True
+        self.owner.save(update_fields=['is_staff'])
+        # reports, reporters, products, images, product features, feature values, owner multiplier
+        response = self._get('/api-v1/product-reports/', 7)
+        self.assertEqual(len(response.data), 3)
+
+
+class ProductListCacheTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        self.owner = make_user(1)
+        self.product = make_product(self.owner, 1)
+
+    def _list(self, **params):
+        response = self.client.get('/api-v1/products/', params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_anonymous_hits_share_an_entry(self):
+        self._list(ordering='price', view='')
+        with self.assertNumQueries(0):
+            response = self._list(view='', ordering='price')
+        self.assertEqual([p['id'] for p in response.data], [self.product.id])
+        stats = catalog_cache.cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_writes_invalidate_cached_pages(self):
+        self._list()
+        make_product(self.owner, 2)
+        self.assertEqual(len(self._list().data), 2)
+        self.product.name = 'Renamed'
+        self.product.save()
+        row = next(p for p in self._list().data if p['id'] == self.product.id)
+        self.assertEqual(row['name'], 'Renamed')
+
+    def test_reports_invalidate_cached_pages(self):
+        self.assertEqual(self._list().data[0]['total_reports'], 0)
+        self.client.force_authenticate(make_user(2))
+        self.client.post(f'/api-v1/products/{self.product.id}/report/', {'reason': 'OTHER'})
+        self.client.force_authenticate(None)
+        self.assertEqual(self._list().data[0]['total_reports'], 1)
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        self.client.force_authenticate(self.owner)
+        self._list()
+        self._list()
+        self.assertEqual(catalog_cache.cache_stats()['hits'], 0)
+
+    def test_stats_endpoint_is_staff_only(self):
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.client.get('/api-v1/products/cache-stats/').status_code, 403)
+        self.owner.is_staff = True
+        self.owner.save(update_fields=['is_staff'])
+        self.assertEqual(self.client.get('/api-v1/products/cache-stats/').status_code, 200)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Phones')
+
+    def _revalidate(self, url, response, expected_status):
+        with CaptureQueriesContext(connection) as ctx:
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, expected_status)
+        return again, ctx
+
+    def test_taxonomy_list_revalidates(self):
+        response = self.client.get('/api-v1/categories/')
+        self.assertIn('Last-Modified', response)
+        again, ctx = self._revalidate('/api-v1/categories/', response, 304)
+        self.assertEqual(again.content, b'')
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(
+            self.client.get('/api-v1/categories/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304,
+        )
+
+        Category.objects.create(name='Laptops')
+        self._revalidate('/api-v1/categories/', response, 200)
+
+    def test_feature_list_tracks_possible_values(self):
+        subcategory = SubCategory.objects.create(category=self.category, name='Smartphones')
+        feature = Feature.objects.create(subcategory=subcategory, name='Brand', description='Brand')
+        response = self.client.get('/api-v1/features/')
+        self._revalidate('/api-v1/features/', response, 304)
+        feature.values.create(value='Nokia')
+        self._revalidate('/api-v1/features/', response, 200)
+
+    def test_product_detail_uses_the_catalog_generation(self):
+        owner = make_user(1)
+        product = make_product(owner, 1)
+        url = f'/api-v1/products/{product.pk}/'
+        response = self.client.get(url)
+        self.assertIn('Authorization', response['Vary'])
+        self._revalidate(url, response, 304)
+        ProductLike.objects.create(user=owner, product=product)
+        self._revalidate(url, response, 200)
+
+    def test_product_detail_404s_before_revalidating(self):
+        hidden = make_product(make_user(1), 1, status=ProductStatus.PENDING.value)
+        for url in ('/api-v1/products/not-a-number/', '/api-v1/products/999999/', f'/api-v1/products/{hidden.pk}/'):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 404)
+
+    def test_legal_latest_revalidates(self):
+        from apiv1.models import PrivacyPolicy
+
+        policy = PrivacyPolicy.objects.create(date=timezone.now().date(), body='v1')
+        response = self.client.get('/api-v1/privacy-policies/latest/')
+        self.assertEqual(response.status_code, 200)
+        self._revalidate('/api-v1/privacy-policies/latest/', response, 304)
+        policy.body = 'v2'
+        policy.save()
+        self._revalidate('/api-v1/privacy-policies/latest/', response, 200)
+
+
+class ProductFacetsTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from apiv1.models import Location
+        cache.clear()
+        self.client = APIClient()
+        owner = make_user(1)
+        self.phones = Category.objects.create(name='Phones')
+        self.cars = Category.objects.create(name='Cars')
+        self.accra = Location.objects.create(name='Osu', region='Greater Accra')
+        make_product(owner, 1, category=self.phones, location=self.accra, price=Decimal('50'))
+        make_product(owner, 2, category=self.phones, price=Decimal('700'))
+        make_product(owner, 3, category=self.cars, location=self.accra, price=Decimal('60000'), type='RENT')
+        make_product(owner, 4, category=self.cars, status=ProductStatus.PENDING.value)
+
+    def _facets(self, **params):
+        response = self.client.get('/api-v1/products/facets/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_counts_visible_products(self):
+        data = self._facets()
+        self.assertEqual(data['total'], 3)
+        self.assertEqual({c['name']: c['count'] for c in data['category']}, {'Phones': 2, 'Cars': 1})
+        self.assertEqual(data['region'], [{'name': 'Greater Accra', 'count': 2}])
+        self.assertEqual({t['name']: t['count'] for t in data['type']}, {'SALE': 2, 'RENT': 1})
+        buckets = {b['max']: b['count'] for b in data['price']}
+        self.assertEqual((buckets['100'], buckets['1000'], buckets[None]), (1, 1, 1))
+
+    def test_filters_and_cache(self):
+        data = self._facets(category=self.phones.id)
+        self.assertEqual(data['total'], 2)
+        with self.assertNumQueries(0):
+            self._facets(category=self.phones.id)
+        make_product(make_user(2), 5, category=self.phones)
+        self.assertEqual(self._facets(category=self.phones.id)['total'], 3)
+
+    def test_rejects_bad_filters(self):
+        self.assertEqual(self.client.get('/api-v1/products/facets/', {'category': 'x'}).status_code, 400)
+
+    def test_search_counts_every_visible_match(self):
+        from apiv1.search import get_search_backend
+
+        owner = make_user(2)
+        # Hidden name matches outrank the visible description matches and
+        # outnumber the 1000 search hits facets used to be cut to.
+        products = Product.objects.bulk_create([
+            Product(owner=owner, name='Gadget', description='A gadget', price=Decimal('5.00'),
+                    status=ProductStatus.PENDING.value, pid=f'pid_hidden{i:05d}')
+            for i in range(1000)
+        ] + [
+            Product(owner=owner, name=f'Item {i}', description='Works with any gadget', price=Decimal('5.00'),
+                    status=ProductStatus.ACTIVE.value, category=self.phones, pid=f'pid_shown{i:05d}')
+            for i in range(1005)
+        ])
+        get_search_backend().index(products)
+
+        data = self._facets(q='gadget')
+        self.assertEqual(data['total'], 1005)
+        self.assertEqual({c['name']: c['count'] for c in data['category']}, {'Phones': 1005})
+
+
+class HotQueryIndexTests(TestCase):
+    """EXPLAIN the main query of hot endpoints and assert they hit an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from apiv1.models import Message
+
+        cls.owner = make_user(1)
+        cls.other = make_user(2)
+        cls.category = Category.objects.create(name='Phones')
+        statuses = [tag.value for tag in ProductStatus]
+        Product.objects.bulk_create([
+            Product(
+                owner=cls.owner if i % 3 else cls.other, name=f'Product {i}', description='A product',
+                price=Decimal('10.00'), status=statuses[i % len(statuses)],
+                category=cls.category if i % 2 else None, is_taken=not i % 7, pid=f'pid_seed{i:05d}',
+            )
+            for i in range(400)
+        ])
+        rooms = ChatRoom.objects.bulk_create([ChatRoom(room_id=f'room-{i}', name=f'room-{i}') for i in range(30)])
+        cls.room = rooms[0]
+        for room in rooms:
+            room.members.add(cls.owner, cls.other)
+        Message.objects.bulk_create([
+            Message(room=rooms[i % len(rooms)], sender=cls.owner if i % 2 else cls.other, content='hi')
+            for i in range(600)
+        ])
+        plan = Subscription.objects.create(
+            name='Gold', tier='gold', price=Decimal('50.00'), multiplier=Decimal('2.50'),
+            features='boost', duration_days=30, max_products=0,
+        )
+        subscribers = User.objects.bulk_create([
+            User(email=f'seed{i}@example.com', phone=f'03000000{i:02d}', name=f'Seed {i}', password='!')
+            for i in range(40)
+        ])
+        now = timezone.now()
+        UserSubscription.objects.bulk_create([
+            UserSubscription(
+                user=subscribers[i % len(subscribers)] if i % 4 else cls.owner, subscription=plan, start_date=now,
+                end_date=now + timedelta(days=i - 100), is_active=i % 10 == 0,
+            )
+            for i in range(400)
+        ])
+
+    def assertUsesIndex(self, queryset, model, fields):
+        index = next(idx for idx in model._meta.indexes if list(idx.fields) == fields)
+        plan = queryset.explain()
+        self.assertIn(index.name, plan, plan)
+
+    def _view_queryset(self, viewset, action, user=None, **params):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+
+        django_request = APIRequestFactory().get('/', params)
+        if user is not None:
+            force_authenticate(django_request, user=user)
+        view = viewset(action_map={'get': action}, args=(), kwargs={}, format_kwarg=None)
+        view.request = view.initialize_request(django_request)
+        return view.filter_queryset(view.get_queryset())
+
+    def test_public_product_feed(self):
+        from apiv1.viewsets import ProductViewSet
+
+        qs = self._view_queryset(ProductViewSet, 'list')
+        self.assertUsesIndex(qs, Product, ['status', 'created_at'])
+
+    def test_category_feed(self):
+        qs = Product.objects.filter(category=self.category, status=ProductStatus.ACTIVE.value).order_by('-created_at')
+        self.assertUsesIndex(qs, Product, ['category', 'status', 'created_at'])
+
+    def test_owner_ad_counters(self):
+        qs = Product.objects.filter(owner=self.owner, is_taken=False)
+        self.assertUsesIndex(qs, Product, ['owner', 'is_taken'])
+
+    def test_room_history_and_unread_count(self):
+        from apiv1.models import Message
+        from apiv1.viewsets import MessageViewSet
+
+        qs = self._view_queryset(MessageViewSet, 'list', user=self.owner, room=self.room.pk)
+        self.assertUsesIndex(qs, Message, ['room', 'created_at'])
+        self.assertUsesIndex(self.room.messages.order_by('created_at'), Message, ['room', 'created_at'])
+        # The per-member count behind unread.actual_unread (the reconcile path); it runs unordered.
+        cursor = Message.objects.filter(room=self.room).order_by('id')[5].pk
+        unread = self.room.messages.filter(id__gt=cursor, sender__is_active=True).exclude(sender=self.owner).order_by()
+        self.assertUsesIndex(unread, Message, ['room', 'id'])
+
+    def test_active_subscription_lookup(self):
+        now = timezone.now()
+        qs = UserSubscription.objects.filter(user=self.owner, is_active=True, start_date__lte=now, end_date__gte=now)
+        self.assertUsesIndex(qs, UserSubscription, ['user', 'end_date'])
+
+
+class ProductBulkRepostTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = make_user(1)
+        self.other = make_user(2)
+        phones = Category.objects.create(name='Phones')
+        subcategory = SubCategory.objects.create(category=phones, name='Smartphones')
+        brand = Feature.objects.create(subcategory=subcategory, name='Brand', description='Brand')
+        self.taken = []
+        for i in range(3):
+            product = make_product(self.owner, i, category=phones, is_taken=True, image=f'https://cdn.example.com/{i}.jpg')
+            ProductFeature.objects.create(product=product, feature=brand, value='Samsung')
+            for j in range(2):
+                ProductImage.objects.create(product=product, image=f'https://cdn.example.com/{i}-{j}.jpg')
+            self.taken.append(product)
+        self.untaken = make_product(self.owner, 3)
+        self.foreign = make_product(self.other, 4, is_taken=True)
+        self.plan = Subscription.objects.create(
+            name='Gold', tier='gold', price=Decimal('50.00'), multiplier=Decimal('2.50'),
+            features='boost', duration_days=30, max_products=5,
+        )
+        now = timezone.now()
+        UserSubscription.objects.create(
+            user=self.owner, subscription=self.plan, start_date=now, end_date=now + timedelta(days=30),
+        )
+        self.client.force_authenticate(self.owner)
+
+    def _repost(self, ids):
+        return self.client.post('/api-v1/products/bulk-repost/', {'ids': ids}, format='json')
+
+    def test_reports_a_result_per_id(self):
+        ids = [p.id for p in self.taken] + [self.untaken.id, self.foreign.id, 999999]
+        response = self._repost(ids)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item['id'] for item in response.data], ids)
+        self.assertEqual([item['status'] for item in response.data], ['created'] * 3 + ['error'] * 3)
+        clone = Product.objects.get(pk=response.data[0]['product']['id'])
+        self.assertEqual((clone.status, clone.is_taken, clone.owner_id), (ProductStatus.ACTIVE.value, False, self.owner.id))
+        self.assertEqual(clone.product_features.get().value, 'Samsung')
+        self.assertEqual(clone.images.count(), 2)
+        self.assertEqual(clone.image_urls, self.taken[0].build_image_urls())
+        self.owner.refresh_from_db()
+        self.assertEqual(self.owner.total_ads, 3)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        from django.core.cache import cache
+
+        with CaptureQueriesContext(connection) as single:
+            self.assertEqual(self._repost([self.taken[0].id]).status_code, 201)
+        cache.clear()  # the owner multiplier lookup is cached by the first call
+        with CaptureQueriesContext(connection) as batch:
+            self.assertEqual(self._repost([p.id for p in self.taken[1:]]).status_code, 201)
+        self.assertEqual(len(batch.captured_queries), len(single.captured_queries))
+
+    def test_subscription_limit_covers_the_whole_batch(self):
+        self.plan.max_products = 3
+        self.plan.save()
+        response = self._repost([p.id for p in self.taken])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual({item['status'] for item in response.data}, {'error'})
+        self.assertEqual(Product.objects.filter(owner=self.owner).count(), 4)
+
+
+class ProductBatchModerationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = make_user(1)
+        self.staff.is_staff = True
+        self.staff.save(update_fields=['is_staff'])
+        self.owner = make_user(2)
+        self.pending = [make_product(self.owner, i, status=ProductStatus.PENDING.value) for i in range(4)]
+        self.active = make_product(self.owner, 9)
+        self.client.force_authenticate(self.staff)
+
+    def _moderate(self, ids, **body):
+        return self.client.post('/api-v1/products/batch-set-status/', {'ids': ids, **body}, format='json')
+
+    def test_approves_in_bulk_and_defers_delivery(self):
+        from unittest.mock import patch
+
+        from notifications.models import Alert
+
+        ids = [p.id for p in self.pending] + [self.active.id, 999999]
+        with patch('notifications.dispatch.send_push_notification') as push, \
+                self.captureOnCommitCallbacks() as callbacks:
+            response = self._moderate(ids, status='ACTIVE')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], ids[:-1])
+        self.assertEqual(response.data['not_found'], [999999])
+        self.assertEqual(response.data['alerts_created'], 4)
+        self.assertEqual(Product.objects.filter(status='ACTIVE').count(), 5)
+        self.assertEqual(Alert.objects.filter(user=self.owner, kind='PRODUCT_APPROVED').count(), 4)
+        push.assert_not_called()
+        self.assertEqual(len(callbacks), 1)
+
+    def test_approval_queues_a_related_refresh(self):
+        from apiv1.models import RelatedProductRefresh
+
+        RelatedProductRefresh.objects.all().delete()
+        self._moderate([p.id for p in self.pending], status='ACTIVE')
+        self.assertEqual(
+            set(RelatedProductRefresh.objects.values_list('product_id', flat=True)), {p.id for p in self.pending},
+        )
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self._moderate([self.pending[0].id], status='ACTIVE').status_code, 200)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self._moderate([p.id for p in self.pending[1:]], status='ACTIVE').status_code, 200)
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+    def test_suspension_requires_note_and_clears_on_reinstate(self):
+        ids = [p.id for p in self.pending]
+        self.assertEqual(self._moderate(ids, status='SUSPENDED').status_code, 400)
+        self.assertEqual(self._moderate(ids, status='SUSPENDED', suspension_note='Spam').status_code, 200)
+        self.assertEqual(set(Product.objects.filter(pk__in=ids).values_list('suspension_note', flat=True)), {'Spam'})
+        self._moderate(ids, status='PENDING')
+        self.assertEqual(set(Product.objects.filter(pk__in=ids).values_list('suspension_note', flat=True)), {None})
+
+    def test_staff_only(self):
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self._moderate([self.pending[0].id], status='ACTIVE').status_code, 403)
+
+
+class ModerationQueueTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.first, self.second = make_user(1), make_user(2)
+        for moderator in (self.first, self.second):
+            moderator.is_staff = True
+            moderator.save(update_fields=['is_staff'])
+        owner = make_user(3)
+        now = timezone.now()
+        self.pending = []
+        for i in range(5):
+            product = make_product(owner, i, status=ProductStatus.PENDING.value)
+            Product.objects.filter(pk=product.pk).update(created_at=now - timedelta(hours=10 - i))
+            self.pending.append(product)
+        make_product(owner, 9)
+
+    def _claim(self, moderator, limit):
+        self.client.force_authenticate(moderator)
+        response = self.client.post('/api-v1/products/moderation-queue/', {'limit': limit}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_moderators_get_disjoint_batches_oldest_first(self):
+        ids = [p.id for p in self.pending]
+        self.assertEqual(self._claim(self.first, 2), ids[:2])
+        self.assertEqual(self._claim(self.second, 2), ids[2:4])
+        # A moderator asking again gets their own claims back first.
+        self.assertEqual(self._claim(self.first, 3), ids[:2] + ids[4:])
+        self.assertEqual(self._claim(self.second, 5), ids[2:4])
+
+    def test_expired_and_moderated_claims_are_released(self):
+        claimed = self._claim(self.first, 2)
+        Product.objects.filter(pk=claimed[0]).update(claimed_until=timezone.now() - timedelta(seconds=1))
+        self.client.force_authenticate(self.first)
+        self.client.put(f'/api-v1/products/{claimed[1]}/set-status/', {'id': claimed[1], 'status': 'ACTIVE'})
+
+        self.assertEqual(self._claim(self.second, 1), [claimed[0]])
+        self.assertEqual(Product.objects.get(pk=claimed[1]).claimed_by, None)
+
+    def test_queue_scan_uses_status_index(self):
+        index = next(idx for idx in Product._meta.indexes if list(idx.fields) == ['status', 'created_at'])
+        qs = Product.objects.filter(status=ProductStatus.PENDING.value, claimed_until__isnull=True).order_by('created_at')
+        self.assertIn(index.name, qs.explain())
+
+    def test_staff_only(self):
+        self.client.force_authenticate(make_user(4))
+        self.assertEqual(self.client.post('/api-v1/products/moderation-queue/').status_code, 403)
+
+
+class ProductExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = make_user(1)
+        self.staff.is_staff = True
+        self.staff.save(update_fields=['is_staff'])
+        phones = Category.objects.create(name='Phones')
+        brand = Feature.objects.create(
+            subcategory=SubCategory.objects.create(category=phones, name='Smartphones'), name='Brand', description='Brand',
+        )
+        self.products = [make_product(self.staff, i, category=phones) for i in range(3)]
+        ProductFeature.objects.create(product=self.products[0], feature=brand, value='Samsung')
+        make_product(self.staff, 9, status=ProductStatus.PENDING.value)
+        self.client.force_authenticate(self.staff)
+
+    def _export(self, **params):
+        response = self.client.get('/api-v1/products/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_ndjson_streams_one_product_per_line(self):
+        import json
+
+        with self.assertNumQueries(2):  # one chunk of products + its features
+            lines = self._export(status='ACTIVE').splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['id'] for row in rows], [p.id for p in self.products])
+        self.assertEqual(rows[0]['features'], {'Brand': 'Samsung'})
+        self.assertEqual(rows[0]['category_name'], 'Phones')
+
+    def test_csv_has_header_and_rows(self):
+        import csv
+
+        rows = list(csv.DictReader(self._export(output='csv').splitlines()))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]['features'], '{"Brand": "Samsung"}')
+
+    def test_rejects_bad_parameters_and_non_staff(self):
+        self.assertEqual(self.client.get('/api-v1/products/export/', {'output': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get('/api-v1/products/export/', {'updated_since': 'yesterday'}).status_code, 400)
+        self.client.force_authenticate(make_user(2))
+        self.assertEqual(self.client.get('/api-v1/products/export/').status_code, 403)
+
+
+class ProductImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = make_user(1)
+        self.phones = Category.objects.create(name='Phones')
+        self.brand = Feature.objects.create(
+            subcategory=SubCategory.objects.create(category=self.phones, name='Smartphones'), name='Brand', description='Brand',
+        )
+        PosibleFeatureValue.objects.create(feature=self.brand, value='Samsung')
+        self.plan = Subscription.objects.create(
+            name='Gold', tier='gold', price=Decimal('50.00'), multiplier=Decimal('2.50'),
+            features='boost', duration_days=30, max_products=10,
+        )
+        now = timezone.now()
+        UserSubscription.objects.create(
+            user=self.owner, subscription=self.plan, start_date=now, end_date=now + timedelta(days=30),
+        )
+        self.client.force_authenticate(self.owner)
+
+    def _upload(self, name, content, **data):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        upload = SimpleUploadedFile(name, content.encode('utf-8'))
+        return self.client.post('/api-v1/products/import/', {'file': upload, **data}, format='multipart')
+
+    def _csv(self, rows):
+        header = 'name,description,price,category,images,features\n'
+        return header + ''.join(rows)
+
+    def test_csv_rows_are_created_and_errors_reported(self):
+        content = self._csv([
+            'Galaxy S21,Mint condition,2500,Phones,https://cdn.example.com/a.jpg|https://cdn.example.com/b.jpg,"{""Brand"": ""Samsung""}"\n',
+            'Galaxy S20,Used,abc,Phones,,\n',
+            'Pixel 7,Used,1800,Tablets,,\n',
+            'iPhone 12,Used,2000,Phones,,"{""Brand"": ""Apple""}"\n',
+        ])
+        response = self._upload('items.csv', content)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['rows'], response.data['created']), (4, 1))
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 4, 5])
+        self.assertIn('price', response.data['errors'][0]['errors'])
+        self.assertIn('category', response.data['errors'][1]['errors'])
+        self.assertIn('features', response.data['errors'][2]['errors'])
+        product = Product.objects.get(pk=response.data['created_ids'][0])
+        self.assertEqual((product.status, product.owner_id, product.category_id), ('PENDING', self.owner.id, self.phones.id))
+        self.assertEqual(product.product_features.get().value, 'Samsung')
+        self.assertEqual(product.images.count(), 2)
+        self.assertEqual(product.image_urls, ['https://cdn.example.com/a.jpg', 'https://cdn.example.com/b.jpg'])
+
+    def test_queries_do_not_grow_with_row_count(self):
+        row = 'Galaxy,Used,100,Phones,https://cdn.example.com/a.jpg,"{""Brand"": ""Samsung""}"\n'
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self._upload('items.csv', self._csv([row])).status_code, 201)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self._upload('items.csv', self._csv([row] * 5)).status_code, 201)
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+    def test_quota_is_checked_once_for_the_file(self):
+        lines = ''.join(
+            f'{{"name": "Item {i}", "description": "Used", "price": "10", "category": "{self.phones.id}"}}\n' for i in range(12)
+        )
+        response = self._upload('items.ndjson', lines)
+
+        self.assertEqual(response.data['created'], 10)
+        self.assertEqual([error['row'] for error in response.data['errors']], [11, 12])
+
+    def test_file_breaking_partway_keeps_and_reports_created_rows(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from apiv1.importing import ProductImporter, read_rows
+
+        # Line 5 is not valid UTF-8.
+        content = self._csv(['Galaxy,Used,100,Phones,,\n'] * 3).encode('utf-8') + b'Broken,\xff\xfe,100,Phones,,\n'
+        upload = SimpleUploadedFile('items.csv', content)
+        response = self.client.post('/api-v1/products/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(response.data['read_error']['line'], 5)
+        self.assertEqual(sorted(response.data['created_ids']), sorted(Product.objects.filter(owner=self.owner).values_list('id', flat=True)))
+
+        # Rows committed in earlier chunks are reported too.
+        result = ProductImporter(self.owner, chunk_size=2).run(read_rows(content.splitlines(keepends=True), 'csv'))
+        self.assertEqual((len(result.created_ids), result.read_error['line']), (3, 5))
+
+        response = self._upload('items.json', '[{"name": ')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created_ids'], [])
+        self.assertIsNotNone(response.data['read_error'])
+
+    def test_dry_run_and_management_command(self):
+        import os
+        import tempfile
+
+        content = self._csv(['Galaxy,Used,100,Phones,,\n', 'Pixel,Used,x,Phones,,\n'])
+        response = self._upload('items.csv', content, dry_run='true')
+        self.assertEqual((response.status_code, response.data['created'], len(response.data['errors'])), (200, 0, 1))
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(content)
+        self.addCleanup(os.remove, handle.name)
+        out = StringIO()
+        call_command('import_products', handle.name, owner=self.owner.email, stdout=out)
+        self.assertIn('Created 1 of 2 rows, 1 errors.', out.getvalue())
+        self.assertEqual(Product.objects.filter(owner=self.owner).count(), 1)
+
+
+class ProductBatchFetchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = make_user(1)
+        self.viewer = make_user(2)
+        self.products = [make_product(self.owner, i) for i in range(4)]
+        for product in self.products:
+            ProductImage.objects.create(product=product, image=f'https://cdn.example.com/{product.pk}.jpg')
+        self.hidden = make_product(self.owner, 9, status=ProductStatus.PENDING.value)
+
+    def _batch(self, **params):
+        response = self.client.get('/api-v1/products/batch/', params)
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data]
+
+    def test_returns_visible_products_in_request_order(self):
+        a, b, c, _ = self.products
+        ids = f'{c.id},{self.hidden.id},{a.id},999999'
+        self.assertEqual(self._batch(ids=ids, pids=b.pid), [c.id, a.id, b.id])
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self._batch(ids=f'{self.hidden.id},{a.id}', pids=a.pid), [self.hidden.id, a.id])
+
+    def test_uses_the_list_query_plan(self):
+        self.client.force_authenticate(self.viewer)
+        with CaptureQueriesContext(connection) as listing:
+            self.client.get('/api-v1/products/')
+        with CaptureQueriesContext(connection) as batch:
+            self.assertEqual(len(self._batch(ids=','.join(str(p.id) for p in self.products))), 4)
+        self.assertEqual(len(batch.captured_queries), len(listing.captured_queries))
+
+        with CaptureQueriesContext(connection) as cards:
+            self._batch(ids=str(self.products[0].id), view='card')
+        self.assertLess(len(cards.captured_queries), len(batch.captured_queries))
+
+    def test_validates_parameters(self):
+        self.assertEqual(self.client.get('/api-v1/products/batch/').status_code, 400)
+        self.assertEqual(self.client.get('/api-v1/products/batch/', {'ids': '1,x'}).status_code, 400)
+        too_many = ','.join(str(i) for i in range(1, 102))
+        self.assertEqual(self.client.get('/api-v1/products/batch/', {'ids': too_many}).status_code, 400)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = make_user(1)
+        self.category = Category.objects.create(name='Phones')
+        self.products = [make_product(self.owner, i, category=self.category) for i in range(3)]
+        for product in self.products:
+            ProductImage.objects.create(product=product, image=f'https://cdn.example.com/{product.pk}.jpg')
+        self.client.force_authenticate(self.owner)
+
+    def _get(self, path, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_fields_and_omit_trim_products_and_their_queries(self):
+        full, full_queries = self._get('/api-v1/products/')
+        trimmed, trimmed_queries = self._get('/api-v1/products/', fields='id,name,price')
+        self.assertEqual(set(trimmed.data[0]), {'id', 'name', 'price'})
+        self.assertLess(trimmed_queries, full_queries)
+
+        omitted, omitted_queries = self._get('/api-v1/products/', omit='images,product_features,owner')
+        self.assertFalse({'images', 'product_features', 'owner'} & set(omitted.data[0]))
+        self.assertIn('total_likes', omitted.data[0])
+        self.assertEqual(omitted_queries, full_queries - 2)
+
+    def test_expand_replaces_category_id(self):
+        response, _ = self._get(f'/api-v1/products/{self.products[0].id}/', expand='category', fields='id')
+        self.assertEqual(set(response.data), {'id', 'category'})
+        self.assertEqual(response.data['category']['name'], 'Phones')
+
+    def test_detail_etag_depends_on_fieldset(self):
+        path = f'/api-v1/products/{self.products[0].id}/'
+        full, _ = self._get(path)
+        trimmed, _ = self._get(path, fields='id')
+        self.assertNotEqual(full['ETag'], trimmed['ETag'])
+
+    def test_admin_user_list_counts_ads_in_one_query(self):
+        self.owner.is_staff = True
+        self.owner.save(update_fields=['is_staff'])
+        for n in range(2, 5):
+            make_user(n)
+        full, full_queries = self._get('/api-v1/admin/users/')
+        self.assertEqual(full.data[-1]['active_ads'], 3)
+        trimmed, trimmed_queries = self._get('/api-v1/admin/users/', fields='id,email')
+        self.assertEqual(set(trimmed.data[0]), {'id', 'email'})
+        self.assertEqual(full_queries, trimmed_queries)
+
+    def test_writes_ignore_sparse_parameters(self):
+        product = self.products[0]
+        response = self.client.patch(f'/api-v1/products/{product.id}/?fields=id', {'name': 'Renamed'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Renamed')
+
+    def test_chat_rooms_skip_omitted_blocks(self):
+        from apiv1.models import Message
+
+        other = make_user(2)
+        for i in range(3):
+            room = ChatRoom.objects.create(room_id=f'room-{i}', name=f'room-{i}', product=self.products[i])
+            room.members.add(self.owner, other)
+            Message.objects.create(room=room, sender=other, content='hi')
+        full, full_queries = self._get('/api-v1/chatrooms/')
+        trimmed, trimmed_queries = self._get('/api-v1/chatrooms/', omit='members,messages')
+        self.assertFalse({'members', 'messages'} & set(trimmed.data[0]))
+        self.assertEqual(trimmed_queries, full_queries - 3)
+
+
+class ChatListFanOutTests(TestCase):
+    def setUp(self):
+        from channels.layers import get_channel_layer
+
+        self.layer = get_channel_layer()
+        self.seller, self.buyer, self.outsider = make_user(1), make_user(2), make_user(3)
+        self.room = ChatRoom.objects.create(room_id='room-1', name='room-1')
+        self.room.members.add(self.seller, self.buyer)
+
+    def _consumer(self, consumer_class, user, **attrs):
+        from unittest.mock import AsyncMock
+
+        consumer = consumer_class()
+        consumer.channel_layer = self.layer
+        consumer.channel_name = f'test-{user.pk}'
+        consumer.user = user
+        consumer.send = AsyncMock()
+        for name, value in attrs.items():
+            setattr(consumer, name, value)
+        return consumer
+
+    def _listen(self, group):
+        from asgiref.sync import async_to_sync
+
+        channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(group, channel)
+        return channel
+
+    def test_message_notifies_only_room_members_with_a_delta(self):
+        import json
+        from asgiref.sync import async_to_sync
+        from apiv1.consumers import NewChatConsumer
+
+        buyer_channel = self._listen('chatrooms_%s' % self.buyer.pk)
+        seller_channel = self._listen('chatrooms_%s' % self.seller.pk)
+        outsider_channel = self._listen('chatrooms_%s' % self.outsider.pk)
+        consumer = self._consumer(
+            NewChatConsumer, self.seller, room=self.room, room_group_name='chat_room-1',
+        )
+        async_to_sync(consumer.receive)(json.dumps({'message': 'Is it available?'}))
+
+        event = async_to_sync(self.layer.receive)(buyer_channel)
+        self.assertEqual(event['type'], 'chatrooms_delta')
+        self.assertEqual((event['room'], event['unread']), (self.room.pk, 1))
+        self.assertEqual(event['last_message']['text'], 'Is it available?')
+        self.assertEqual(async_to_sync(self.layer.receive)(seller_channel)['unread'], 0)
+        self.assertIsNone(self._poll(outsider_channel))
+
+    def _poll(self, channel):
+        import asyncio
+        from asgiref.sync import async_to_sync
+
+        async def receive():
+            try:
+                return await asyncio.wait_for(self.layer.receive(channel), timeout=0.05)
+            except asyncio.TimeoutError:
+                return None
+
+        return async_to_sync(receive)()
+
+    def test_chat_list_applies_deltas_without_queries(self):
+        import json
+        from asgiref.sync import async_to_sync
+        from apiv1.consumers import ChatRoomsConsumer
+
+        consumer = self._consumer(ChatRoomsConsumer, self.buyer)
+        async_to_sync(consumer.send_chatrooms_list)()
+        delta = {
+            'type': 'chatrooms_delta', 'room': self.room.pk, 'unread': 4,
+            'last_message': {'text': 'hello', 'is_media': False, 'created_at': '2026-01-01T00:00:00', 'sender': 'User 1'},
+        }
+        with self.assertNumQueries(0):
+            async_to_sync(consumer.chatrooms_delta)(delta)
+
+        payload = json.loads(consumer.send.call_args.kwargs['text_data'])
+        self.assertEqual(payload['chatrooms'][0]['unread'], 4)
+        self.assertEqual(payload['chatrooms'][0]['last_message']['text'], 'hello')
+
+
+class ChatRoomListBuilderTests(TestCase):
+    def setUp(self):
+        from apiv1.models import Message
+
+        self.user = make_user(1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        owner = make_user(2)
+        self.rooms = []
+        for i in range(6):
+            other = make_user(10 + i)
+            product = make_product(owner, i, image=f'https://cdn.example.com/{i}.jpg')
+            room = ChatRoom.objects.create(room_id=f'room-{i}', name=f'room-{i}', product=product)
+            room.members.add(self.user, other)
+            for j in range(i):
+                Message.objects.create(room=room, sender=other if j % 2 == 0 else self.user, content=f'msg {j}')
+            self.rooms.append((room, other))
+
+    def test_list_matches_per_room_values_in_constant_queries(self):
+        from apiv1.chatlist import build_chatroom_list
+
+        with self.assertNumQueries(2):
+            rooms = build_chatroom_list(self.user)
+
+        self.assertEqual(len(rooms), 6)
+        for data, (room, other) in zip(rooms, self.rooms):
+            self.assertEqual(data['unread'], room.get_total_unread_messages(self.user))
+            self.assertEqual(data['other_user'], other.name)
+            self.assertEqual(data['ad_image'], f'https://cdn.example.com/{room.product.name[-1]}.jpg')
+            last = room.messages.order_by('-created_at', '-id').first()
+            self.assertEqual(data['last_message'] and data['last_message']['text'], last and last.content)
+
+    def test_rest_list_uses_annotated_unread(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api-v1/chatrooms/', {'omit': 'messages,members'})
+        self.assertEqual(response.status_code, 200)
+        unread = {item['id']: item['total_unread'] for item in response.data}
+        self.assertEqual(unread[self.rooms[5][0].id], 3)
+        self.assertLessEqual(len(ctx.captured_queries), 4)
+
+
+class ChatHistoryWindowTests(TestCase):
+    def setUp(self):
+        from apiv1.models import Message
+
+        self.seller, self.buyer = make_user(1), make_user(2)
+        self.room = ChatRoom.objects.create(room_id='room-1', name='room-1')
+        self.room.members.add(self.seller, self.buyer)
+        self.ids = [
+            Message.objects.create(room=self.room, sender=self.buyer if i % 2 else self.seller, content=f'msg {i}').pk
+            for i in range(7)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def _consumer(self):
+        from unittest.mock import AsyncMock
+        from apiv1.consumers import NewChatConsumer
+
+        consumer = NewChatConsumer()
+        consumer.user = self.buyer
+        consumer.room = self.room
+        consumer.room_group_name = 'chat_room-1'
+        consumer.send = AsyncMock()
+        return consumer
+
+    def _frame(self, consumer):
+        import json
+
+        return json.loads(consumer.send.await_args.kwargs['text_data'])
+
+    def test_connect_sends_latest_window_in_constant_queries(self):
+        from asgiref.sync import async_to_sync
+
+        consumer = self._consumer()
+        with self.assertNumQueries(1):
+            async_to_sync(consumer.send_chat_history)(None, 3)
+        frame = self._frame(consumer)
+        self.assertEqual(frame['type'], 'chat_history')
+        self.assertEqual([m['id'] for m in frame['messages']], self.ids[-3:])
+        self.assertEqual(frame['messages'][0]['email'], self.seller.email)
+        self.assertTrue(frame['has_more'])
+
+    def test_history_command_pages_backwards(self):
+        import json
+        from asgiref.sync import async_to_sync
+
+        consumer = self._consumer()
+        async_to_sync(consumer.receive)(json.dumps({'type': 'history', 'before': self.ids[4], 'limit': 3}))
+        frame = self._frame(consumer)
+        self.assertEqual([m['id'] for m in frame['messages']], self.ids[1:4])
+        self.assertTrue(frame['has_more'])
+
+        async_to_sync(consumer.receive)(json.dumps({'type': 'history', 'before': self.ids[1], 'limit': 3}))
+        frame = self._frame(consumer)
+        self.assertEqual([m['id'] for m in frame['messages']], self.ids[:1])
+        self.assertFalse(frame['has_more'])
+
+        async_to_sync(consumer.receive)(json.dumps({'type': 'history', 'before': 'latest'}))
+        self.assertEqual(self._frame(consumer)['code'], 'invalid_history_request')
+
+    def test_rest_messages_share_the_cursor_contract(self):
+        url = f'/api-v1/chatrooms/{self.room.pk}/messages/'
+        response = self.client.get(url, {'limit': 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['id'] for m in response.data['messages']], self.ids[-4:])
+        self.assertTrue(response.data['has_more'])
+
+        response = self.client.get(url, {'before': self.ids[3], 'limit': 4})
+        self.assertEqual([m['id'] for m in response.data['messages']], self.ids[:3])
+        self.assertFalse(response.data['has_more'])
+
+        self.assertEqual(self.client.get(url, {'limit': 0}).status_code, 400)
+        # Without a cursor the full history is still returned as a list.
+        self.assertEqual([m['id'] for m in self.client.get(url).data], self.ids)
+
+
+class ChatReadCursorTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.seller, self.buyer, self.third = make_user(1), make_user(2), make_user(3)
+        self.room = ChatRoom.objects.create(room_id='room-1', name='room-1', is_group=True)
+        self.room.members.add(self.seller, self.buyer, self.third)
+
+    def _send(self, sender, count):
+        from apiv1.models import Message
+
+        return [Message.objects.create(room=self.room, sender=sender, content=f'msg {i}').pk for i in range(count)]
+
+    def test_memberships_follow_room_members(self):
+        from apiv1.models import ChatMembership
+
+        members = lambda: set(ChatMembership.objects.filter(room=self.room).values_list('user_id', flat=True))
+        self.assertEqual(members(), {self.seller.pk, self.buyer.pk, self.third.pk})
+        self.room.members.remove(self.third)
+        self.assertEqual(members(), {self.seller.pk, self.buyer.pk})
+        self.third.chatrooms.add(self.room)
+        self.assertIn(self.third.pk, members())
+        self.room.members.clear()
+        self.assertEqual(members(), set())
+
+    def test_marking_read_is_a_single_row_write_per_member(self):
+        from apiv1.models import ChatMembership
+
+        ids = self._send(self.seller, 3)
+        with self.assertNumQueries(1):
+            self.room.read_all_messages(self.buyer)
+
+        self.assertEqual(ChatMembership.objects.get(room=self.room, user=self.buyer).last_read_message_id, ids[-1])
+        self.assertEqual(self.room.get_total_unread_messages(self.buyer), 0)
+        self.assertEqual(self.room.get_total_unread_messages(self.third), 3)
+        self.assertEqual(self.room.get_total_unread_messages(self.seller), 0)
+
+        self._send(self.buyer, 2)
+        self.assertEqual(self.room.get_total_unread_messages(self.seller), 2)
+        self.assertEqual(self.room.get_total_unread_messages(self.third), 5)
+
+    def test_read_state_derives_from_other_members_cursors(self):
+        from apiv1.chatlist import history_item, message_window
+
+        self._send(self.seller, 2)
+        self.room.read_all_messages(self.buyer)
+        read = lambda: [history_item(m)['is_read'] for m in message_window(self.room)[0]]
+        self.assertEqual(read(), [False, False])
+        self.room.read_all_messages(self.third)
+        self.assertEqual(read(), [True, True])
+
+    def test_total_unread_count_is_one_query(self):
+        from asgiref.sync import async_to_sync
+        from apiv1.consumers import UnreadCountConsumer
+        from apiv1.models import Message
+
+        other = ChatRoom.objects.create(room_id='room-2', name='room-2')
+        other.members.add(self.seller, self.buyer)
+        self._send(self.seller, 2)
+        Message.objects.create(room=other, sender=self.seller, content='hi')
+
+        consumer = UnreadCountConsumer()
+        consumer.user = self.buyer
+        with self.assertNumQueries(1):
+            self.assertEqual(async_to_sync(consumer.get_total_unread_count)(), 3)
+        self.room.read_all_messages(self.buyer)
+        self.assertEqual(async_to_sync(consumer.get_total_unread_count)(), 1)
+
+
+class ChatUnreadCounterTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.seller, self.buyer, self.third = make_user(1), make_user(2), make_user(3)
+        self.room = ChatRoom.objects.create(room_id='room-1', name='room-1', is_group=True)
+        self.room.members.add(self.seller, self.buyer, self.third)
+
+    def _send(self, sender, count=1):
+        from apiv1.models import Message
+
+        for i in range(count):
+            Message.objects.create(room=self.room, sender=sender, content=f'msg {i}')
+
+    def _counts(self):
+        from apiv1.models import ChatMembership
+
+        return dict(ChatMembership.objects.filter(room=self.room).values_list('user_id', 'unread_count'))
+
+    def test_messages_increment_other_members_and_read_resets(self):
+        self._send(self.seller, 2)
+        self._send(self.buyer)
+        self.assertEqual(self._counts(), {self.seller.pk: 1, self.buyer.pk: 2, self.third.pk: 3})
+
+        self.room.read_all_messages(self.third)
+        self.assertEqual(self._counts()[self.third.pk], 0)
+        self.assertEqual(self.room.get_total_unread_messages(self.buyer), 2)
+
+        late = make_user(4)
+        self.room.members.add(late)
+        self.assertEqual(self._counts()[late.pk], 3)
+
+    def test_read_before_the_increment_does_not_recount_the_message(self):
+        from unittest.mock import patch
+        from apiv1 import unread
+        from apiv1.models import Message
+
+        # Simulate the buyer's read landing between the INSERT and the counter UPDATE.
+        message = Message(room=self.room, sender=self.seller, content='hi')
+        with patch('apiv1.unread.record_message'):
+            message.save()
+        self.room.read_all_messages(self.buyer)
+        unread.record_message(message)
+
+        self.assertEqual(self._counts(), {self.seller.pk: 0, self.buyer.pk: 0, self.third.pk: 1})
+
+    def test_cached_totals_follow_messages_and_reads(self):
+        from apiv1 import unread
+        from apiv1.models import Message
+
+        other = ChatRoom.objects.create(room_id='room-2', name='room-2')
+        other.members.add(self.seller, self.buyer)
+        self._send(self.seller, 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(unread.totals([self.buyer.pk, self.third.pk]), {self.buyer.pk: 2, self.third.pk: 2})
+
+        Message.objects.create(room=other, sender=self.seller, content='hi')
+        with self.assertNumQueries(0):
+            self.assertEqual(unread.totals([self.buyer.pk, self.third.pk]), {self.buyer.pk: 3, self.third.pk: 2})
+
+        self.room.read_all_messages(self.buyer)
+        self.assertEqual(unread.totals([self.buyer.pk])[self.buyer.pk], 1)
+        other.is_deleted = True
+        other.save(update_fields=['is_deleted'])
+        self.assertEqual(unread.totals([self.buyer.pk])[self.buyer.pk], 0)
+
+    def test_lookup_racing_a_message_does_not_cache_a_stale_total(self):
+        from unittest.mock import patch
+        from django.core.cache import cache
+        from apiv1 import unread
+        from apiv1.models import Message
+
+        add = cache.add
+        raced = []
+
+        def message_lands_first(key, *args, **kwargs):
+            # The new message is counted after the lookup summed but before it stored.
+            if not raced:
+                raced.append(key)
+                Message.objects.create(room=self.room, sender=self.seller, content='late')
+            return add(key, *args, **kwargs)
+
+        with patch.object(cache, 'add', side_effect=message_lands_first):
+            self.assertEqual(unread.totals([self.buyer.pk])[self.buyer.pk], 0)
+        self.assertEqual(unread.totals([self.buyer.pk])[self.buyer.pk], 1)
+
+    def test_unread_events_carry_totals(self):
+        import json
+        from unittest.mock import AsyncMock
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+        from apiv1.consumers import NewChatConsumer, UnreadCountConsumer
+
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(f'unread_count_{self.buyer.pk}', channel)
+
+        sender = NewChatConsumer()
+        sender.channel_layer = layer
+        sender.channel_name = 'test-seller'
+        sender.user = self.seller
+        sender.room = self.room
+        sender.room_group_name = 'chat_room-1'
+        sender.send = AsyncMock()
+        async_to_sync(sender.receive)(json.dumps({'message': 'Still available?'}))
+        event = async_to_sync(layer.receive)(channel)
+        self.assertEqual((event['type'], event['count']), ('unread_count_update', 1))
+
+        listener = UnreadCountConsumer()
+        listener.user = self.buyer
+        listener.send = AsyncMock()
+        with self.assertNumQueries(0):
+            async_to_sync(listener.unread_count_update)(event)
+        payload = json.loads(listener.send.await_args.kwargs['text_data'])
+        self.assertEqual(payload, {'type': 'unread_count', 'count': 1})
+
+    def test_reconcile_command_repairs_drift(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from apiv1.models import ChatMembership
 
-# Create your tests here.
+        self._send(self.seller, 3)
+        ChatMembership.objects.filter(room=self.room, user=self.buyer).update(unread_count=9)
+        out = StringIO()
+        call_command('reconcile_chat_unread', stdout=out)
+        self.assertIn('fixed 1', out.getvalue())
+        self.assertEqual(self._counts()[self.buyer.pk], 3)
@@ -0,0 +1,135 @@
+'''
+Per-member unread counters for chat rooms.
+
+``ChatMembership.unread_count`` is bumped for every other member with one
+``UPDATE`` when a message is saved (see ``apiv1.signals``) and reset together
+with the read cursor in ``ChatRoom.read_all_messages``. Each user's total
+across live rooms is mirrored in the cache for ``CHAT_UNREAD_CACHE_TTL``
+seconds (0 disables the mirror): new messages increment cached totals in
+place, while reads and membership changes drop them so the next lookup sums
+the counters again.
+
+Cached totals are keyed by a per-user version. Dropping a total bumps the
+version instead of deleting the key, so a lookup that summed the counters
+before a concurrent write stores its sum under the old version, where nobody
+reads it, rather than over the newer count.
+
+Counters can drift when messages are deleted or a sender is deactivated;
+``manage.py reconcile_chat_unread`` recomputes them from the read cursors.
+'''
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+DEFAULT_TTL = 300
+
+
+def cache_ttl() -> int:
+    return getattr(settings, 'CHAT_UNREAD_CACHE_TTL', DEFAULT_TTL)
+
+
+def version_key(user_id) -> str:
+    return f'chat:unread:version:{user_id}'
+
+
+def total_key(user_id, version=0) -> str:
+    return f'chat:unread:{user_id}:{version}'
+
+
+def versions(user_ids) -> dict:
+    cached = cache.get_many([version_key(user_id) for user_id in user_ids])
+    return {user_id: cached.get(version_key(user_id), 0) for user_id in user_ids}
+
+
+def _bump_versions(user_ids) -> None:
+    for user_id in user_ids:
+        # Versions never expire, or an old total could become current again.
+        cache.add(version_key(user_id), 0, timeout=None)
+        cache.incr(version_key(user_id))
+
+
+def actual_unread():
+    '''Expression counting a membership's messages past its read cursor.
+
+    For annotating ``ChatMembership`` querysets; it scans messages, so it is
+    only used to seed and repair the stored counters.
+    '''
+    from .models import Message
+
+    unread = (
+        Message.objects
+        .filter(room=OuterRef('room'), id__gt=OuterRef('last_read_message_id'), sender__is_active=True)
+        .exclude(sender=OuterRef('user'))
+        .order_by()
+        .values('room')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return Coalesce(Subquery(unread, output_field=IntegerField()), 0)
+
+
+def record_message(message) -> None:
+    '''Count ``message`` as unread for every room member but its sender.'''
+    from .models import ChatMembership
+
+    if not message.sender.is_active:
+        return
+    # A member who already read past the message (their read can commit
+    # between the message INSERT and this UPDATE) must not count it again.
+    others = (
+        ChatMembership.objects
+        .filter(room_id=message.room_id, last_read_message_id__lt=message.pk)
+        .exclude(user_id=message.sender_id)
+    )
+    others.update(unread_count=F('unread_count') + 1)
+    if cache_ttl():
+        missed = []
+        for user_id, version in versions(list(others.values_list('user_id', flat=True))).items():
+            try:
+                cache.incr(total_key(user_id, version))
+            except ValueError:
+                # Not mirrored, but a lookup may be summing right now; retire
+                # the version its (possibly stale) sum would be stored under.
+                missed.append(user_id)
+        _bump_versions(missed)
+
+
+def invalidate(user_ids) -> None:
+    if cache_ttl():
+        _bump_versions(set(user_ids))
+
+
+def totals(user_ids) -> dict:
+    '''Return ``{user_id: unread messages across their live rooms}``.
+
+    Served from the cache mirror when possible; misses cost one grouped
+    query for all of them.
+    '''
+    from .models import ChatMembership
+
+    user_ids = list(user_ids)
+    ttl = cache_ttl()
+    found = {}
+    if ttl:
+        keys = {user_id: total_key(user_id, version) for user_id, version in versions(user_ids).items()}
+        cached = cache.get_many(list(keys.values()))
+        found = {user_id: cached[key] for user_id, key in keys.items() if key in cached}
+    missing = [user_id for user_id in user_ids if user_id not in found]
+    if missing:
+        summed = dict.fromkeys(missing, 0)
+        summed.update(
+            ChatMembership.objects
+            .filter(user_id__in=missing, room__is_deleted=False)
+            .values('user_id')
+            .annotate(total=Sum('unread_count'))
+            .order_by()
+            .values_list('user_id', 'total')
+        )
+        if ttl:
+            # add(), not set(): never replace a total a newer lookup already stored.
+            for user_id, total in summed.items():
+                cache.add(keys[user_id], total, timeout=ttl)
+        found.update(summed)
+    return found
@@ -23,10 +23,12 @@ from rest_framework.views import APIView
 
 from accounts.models import OTP, User
 from accounts.models import Wallet, WalletCashoutRequest
+from apiv1.manager import with_ad_counts
 from apiv1.models import JobApplication
 from apiv1.serializers import ChangePasswordSerializer, LoginSerializer, RegisterUserSerializer, ResetPasswordSerializer, UserSerializer
 from notifications.models import Alert
 from notifications import utils as notification_utils
+from oysloecore.sysutils.fieldsets import field_requested
 from apiv1.serializers import AdminCategoryWithSubcategoriesSerializer, AdminVerifyIdSerializer
 from django.db.models import Q
 from django.db import transaction
@@ -243,7 +245,9 @@ class AdminListUsersAPIView(APIView):
         if q:
             qs = qs.filter(Q(name__icontains=q) | Q(email__icontains=q) | Q(phone__icontains=q))
         qs = qs.order_by('-created_at')
-        return Response(UserSerializer(qs, many=True).data)
+        if field_requested(request, 'active_ads') or field_requested(request, 'taken_ads'):
+            qs = with_ad_counts(qs)
+        return Response(UserSerializer(qs, many=True, context={'request': request}).data)
 
 
 class AdminReinstateCouponRedemptionAPIView(APIView):
@@ -1,9 +1,11 @@
+import logging
 import requests
 import threading
 from uuid import uuid4
 from rest_framework import permissions, viewsets, status, filters
 from rest_framework import serializers
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 
 from apiv1.models import (
@@ -16,10 +18,14 @@ from apiv1.models import (
 )
 from apiv1.models import Location
 from apiv1.serializers import (
-    CategorySerializer, SubCategorySerializer, ProductSerializer, ProductImageSerializer,
+    CategorySerializer, SubCategorySerializer, ProductSerializer, ProductCardSerializer, ProductExportSerializer,
+    ProductImageSerializer,
     FeatureSerializer, PosibleFeatureValueSerializer, ProductFeatureSerializer, ProductFeatureCreateSerializer, ReviewSerializer,
     ChatRoomSerializer, MessageSerializer, AdminChangeProductStatusSerializer,
+    AdminBatchProductStatusSerializer, AdminBatchProductStatusResultSerializer,
+    ModerationQueueRequestSerializer, ModerationQueueResponseSerializer, ProductImportResultSerializer,
     LocationSerializer, CreateReviewSerializer, AlertSerializer, MarkAsTakenSerializer,
+    BulkRepostSerializer, BulkRepostResultSerializer,
     FeedbackSerializer, SubscriptionSerializer, UserSubscriptionSerializer,
     PaymentSerializer, AccountDeleteRequestSerializer,
     PrivacyPolicySerializer, TermsAndConditionsSerializer, ProductReportSerializer,
@@ -30,12 +36,25 @@ from accounts.models import Wallet, WalletCashoutRequest
 from django.db import transaction, models
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiResponse
+from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter, OpenApiResponse
 from oysloecore.sysutils.constants import ProductStatus
+from oysloecore.sysutils.conditional import ConditionalGetMixin, make_etag
+from oysloecore.sysutils.fieldsets import field_requested
+from oysloecore.sysutils.pagination import OptionalKeysetPagination, OptionalOffsetPagination
+from apiv1 import catalog_cache
+from apiv1.chatlist import (
+    HISTORY_LIMIT, MAX_HISTORY_LIMIT, chatroom_list_queryset, history_params, message_window,
+)
+from apiv1.manager import prefetch_product, prefetch_user
+from apiv1.reposting import clone_products, repostable_products
+from apiv1.search import ProductSearchFilter, get_search_backend
 from notifications.models import Alert
+from notifications.dispatch import dispatch_alerts
 from django.conf import settings
 from notifications import utils as notification_utils
 
+logger = logging.getLogger(__name__)
+
 
 class ErrorDetailSerializer(serializers.Serializer):
     detail = serializers.CharField()
@@ -72,20 +91,20 @@ class IsAuthenticated(permissions.IsAuthenticated):
 class AllowAny(permissions.AllowAny):
     pass
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all().order_by('name')
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
 
 
-class SubCategoryViewSet(viewsets.ModelViewSet):
+class SubCategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = SubCategory.objects.all().order_by('name')
     serializer_class = SubCategorySerializer
     permission_classes = [AllowAny]
     filterset_fields = ['category']
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all().order_by('-created_at')
     serializer_class = ProductSerializer
     # Only authenticated users can create products; anyone can list/retrieve.
@@ -93,7 +112,57 @@ class ProductViewSet(viewsets.ModelViewSet):
     filterset_fields = ['category', 'pid']
     search_fields = ['name', 'description']
     ordering_fields = ['created_at', 'price']
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [ProductSearchFilter, filters.OrderingFilter]
+    pagination_class = OptionalKeysetPagination
+    # Detail payloads carry counters and per-user flags from other tables, so
+    # they are validated against the catalog generation instead of updated_at.
+    conditional_actions = ('retrieve',)
+    conditional_vary = ('Authorization',)
+    # Actions that accept ``?view=card`` and the columns the card needs.
+    CARD_ACTIONS = ('list', 'favourites', 'related', 'batch')
+    CARD_FIELDS = (
+        'id', 'pid', 'name', 'price', 'type', 'status', 'is_taken', 'image', 'image_urls', 'created_at',
+        'owner', 'location__id', 'location__region', 'location__name',
+        'likes_count', 'favourites_count', 'reviews_count', 'rating_sum',
+    )
+
+    def is_card_view(self) -> bool:
+        request = getattr(self, 'request', None)
+        return (
+            self.action in self.CARD_ACTIONS
+            and request is not None
+            and request.query_params.get('view') == 'card'
+        )
+
+    def get_serializer_class(self):
+        if self.is_card_view():
+            return ProductCardSerializer
+        return super().get_serializer_class()
+
+    @property
+    def paginator(self):
+        # Relevance-ranked ``?search=`` results have no column to key a cursor
+        # on, so they are paged by offset to keep the ranking.
+        if not hasattr(self, '_paginator'):
+            request = getattr(self, 'request', None)
+            ranked = self.action == 'list' and request is not None and ProductSearchFilter().is_ranked(request)
+            self._paginator = OptionalOffsetPagination() if ranked else self.pagination_class()
+        return self._paginator
+
+    def shape_queryset(self, qs):
+        """Apply the loading plan for the serializer in use.
+
+        Cards load only their columns; full products prefetch every nested
+        relation ``ProductSerializer`` renders.
+        """
+        if self.is_card_view():
+            return qs.select_related('location').only(*self.CARD_FIELDS)
+        request = getattr(self, 'request', None)
+        return qs.with_details(
+            owner=field_requested(request, 'owner'),
+            images=field_requested(request, 'images'),
+            features=field_requested(request, 'product_features'),
+        )
 
     def get_queryset(self):
         """Control visibility of products based on user role/ownership.
@@ -102,13 +171,19 @@ class ProductViewSet(viewsets.ModelViewSet):
         - Product owners see all their own products (any status) plus ACTIVE products from others.
         - Other authenticated users and anonymous users see only ACTIVE products.
         """
-        base_qs = Product.objects.all().order_by('-created_at')
-
         # During schema generation, avoid DB hits
         if getattr(self, 'swagger_fake_view', False):  # pragma: no cover
-            return base_qs.none()
+            return Product.objects.none()
 
         user = getattr(self.request, 'user', None)
+        qs = Product.objects.order_by('-created_at')
+        if field_requested(self.request, 'liked_by_user') or field_requested(self.request, 'favourited_by_user'):
+            qs = qs.with_engagement(user)
+        return self.visible_products(self.shape_queryset(qs))
+
+    def visible_products(self, base_qs):
+        """Restrict ``base_qs`` to the products the requester may see."""
+        user = getattr(self.request, 'user', None)
 
         # Anonymous or unauthenticated: only ACTIVE products
         if not user or not getattr(user, 'is_authenticated', False):
@@ -122,13 +197,189 @@ class ProductViewSet(viewsets.ModelViewSet):
         from django.db.models import Q
         return base_qs.filter(Q(owner=user) | Q(status=ProductStatus.ACTIVE.value))
 
+    def visibility_scope(self) -> str:
+        """Cache scope matching ``visible_products``: who sees the same set."""
+        user = self.request.user
+        if not user.is_authenticated:
+            return 'anon'
+        return 'staff' if user.is_staff else f'user:{user.pk}'
+
+    def get_detail_validators(self):
+        user = self.request.user
+        # Resolving the object first keeps 404s for missing or hidden products;
+        # retrieve() reuses it.
+        obj = self.get_object()
+        self._conditional_object = obj
+        # The owner block is not covered by the generation, so its timestamp is part of the tag.
+        etag = make_etag(
+            catalog_cache.get_generation(), self.request.get_full_path(),
+            user.pk if user.is_authenticated else '', obj.owner.updated_at.isoformat(),
+        )
+        return etag, None
+
+    def list(self, request, *args, **kwargs):
+        """List products, serving anonymous requests from the listing cache.
+
+        Every anonymous user sees the same ACTIVE catalog, so responses are
+        shared between them (see ``apiv1.catalog_cache``).
+        """
+        if request.user.is_authenticated or catalog_cache.cache_ttl() <= 0:
+            return super().list(request, *args, **kwargs)
+
+        key = catalog_cache.list_cache_key(request)
+        data = catalog_cache.get_cached_list(key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            catalog_cache.set_cached_list(key, response.data)
+        return response
+
+    @action(detail=False, methods=['get'], url_path='facets')
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='q', type=str, location=OpenApiParameter.QUERY, required=False,
+                             description='Full-text search terms.'),
+            OpenApiParameter(name='category', type=int, location=OpenApiParameter.QUERY, required=False),
+            OpenApiParameter(name='subcategory', type=int, location=OpenApiParameter.QUERY, required=False),
+            OpenApiParameter(name='location', type=int, location=OpenApiParameter.QUERY, required=False),
+            OpenApiParameter(name='region', type=str, location=OpenApiParameter.QUERY, required=False),
+            OpenApiParameter(name='type', type=str, location=OpenApiParameter.QUERY, required=False),
+            OpenApiParameter(name='min_price', type=float, location=OpenApiParameter.QUERY, required=False),
+            OpenApiParameter(name='max_price', type=float, location=OpenApiParameter.QUERY, required=False),
+        ],
+        responses={
+            200: OpenApiResponse(description='Counts per category, subcategory, location, region, type and price bucket.'),
+            400: ErrorDetailSerializer,
+        },
+        operation_id='product_facets',
+    )
+    def facets(self, request):
+        """Facet counts for the products matching the given filters.
+
+        Counts respect the same visibility rules as the product list and are
+        cached per filter signature until the catalog changes.
+        """
+        from apiv1.facets import apply_facet_filters, compute_facets
+
+        key = catalog_cache.list_cache_key(request, scope=self.visibility_scope())
+        data = catalog_cache.get_cached_list(key)
+        if data is not None:
+            return Response(data)
+        try:
+            qs = apply_facet_filters(self.visible_products(Product.objects.all()), request.query_params)
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        data = compute_facets(qs)
+        catalog_cache.set_cached_list(key, data)
+        return Response(data)
+
+    BATCH_LIMIT = 100
+
+    @action(detail=False, methods=['get'], url_path='batch')
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='ids', type=str, location=OpenApiParameter.QUERY, required=False,
+                             description='Comma-separated product ids.'),
+            OpenApiParameter(name='pids', type=str, location=OpenApiParameter.QUERY, required=False,
+                             description='Comma-separated product pids.'),
+            OpenApiParameter(name='view', type=str, location=OpenApiParameter.QUERY, required=False,
+                             description='Set to "card" for the compact representation.'),
+        ],
+        responses={200: ProductSerializer(many=True), 400: ErrorDetailSerializer},
+        operation_id='product_batch',
+    )
+    def batch(self, request):
+        """Fetch up to ``BATCH_LIMIT`` products by id or pid in one request.
+
+        Products are returned in the requested order; ids that do not exist
+        or are not visible to the requester are left out.
+        """
+        def _values(name):
+            return [
+                value.strip()
+                for raw in request.query_params.getlist(name)
+                for value in raw.split(',')
+                if value.strip()
+            ]
+
+        ids, pids = _values('ids'), _values('pids')
+        if not ids and not pids:
+            return Response({'detail': 'ids or pids is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if not all(value.isdigit() for value in ids):
+            return Response({'detail': 'ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        keys = list(dict.fromkeys([int(value) for value in ids] + pids))
+        if len(keys) > self.BATCH_LIMIT:
+            return Response({'detail': f'At most {self.BATCH_LIMIT} products per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        from django.db.models import Q
+        products = self.get_queryset().filter(Q(pk__in=[int(value) for value in ids]) | Q(pid__in=pids))
+        found = {}
+        for product in products:
+            found[product.pk] = found[product.pid] = product
+        ordered = list({product.pk: product for product in (found[key] for key in keys if key in found)}.values())
+        return Response(self.get_serializer(ordered, many=True).data)
+
+    @action(detail=False, methods=['get'], url_path='cache-stats', permission_classes=[permissions.IsAdminUser])
+    @extend_schema(
+        responses={200: OpenApiResponse(description='Hit/miss counters of the anonymous listing cache.')},
+        operation_id='product_cache_stats',
+    )
+    def cache_stats(self, request):
+        """Hit/miss counters for the anonymous listing cache; ``?reset=1`` clears them."""
+        stats = catalog_cache.cache_stats()
+        if request.query_params.get('reset') in ('1', 'true'):
+            catalog_cache.reset_stats()
+        return Response(stats)
+
+    @action(detail=False, methods=['get'], url_path='export', permission_classes=[permissions.IsAdminUser])
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='output', description='ndjson (default) or csv', required=False, type=str),
+            OpenApiParameter(name='status', description='Only products with this status', required=False, type=str),
+            OpenApiParameter(name='category', description='Only products in this category id', required=False, type=int),
+            OpenApiParameter(name='owner', description='Only products of this owner id', required=False, type=int),
+            OpenApiParameter(name='updated_since', description='ISO 8601; only products updated since then', required=False, type=str),
+        ],
+        responses={200: OpenApiResponse(description='Streamed NDJSON or CSV, one product per line.')},
+        operation_id='product_export',
+    )
+    def export(self, request):
+        """Stream the catalogue as NDJSON or CSV. Staff-only.
+
+        Rows are fetched in chunks and serialized one at a time, so the
+        response starts immediately and memory does not grow with the
+        catalogue.
+        """
+        from django.http import StreamingHttpResponse
+        from apiv1 import export as catalog_export
+
+        output = request.query_params.get('output', 'ndjson')
+        if output not in catalog_export.FORMATS:
+            return Response({'detail': 'output must be one of: ' + ', '.join(catalog_export.FORMATS)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            queryset = catalog_export.export_queryset(request.query_params)
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = ProductExportSerializer(context={'request': request})
+        rows = catalog_export.iter_rows(queryset, serializer)
+        if output == 'csv':
+            body = catalog_export.stream_csv(rows, ProductExportSerializer.Meta.fields)
+        else:
+            body = catalog_export.stream_ndjson(rows)
+        response = StreamingHttpResponse(body, content_type=catalog_export.CONTENT_TYPES[output])
+        filename = f"products-{timezone.now():%Y%m%d-%H%M%S}.{output}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
     def get_permissions(self):
         """Allow unauthenticated read-only access but require auth for writes.
 
         This keeps existing public browsing behaviour while enforcing
         subscription checks on create/update actions.
         """
-        if self.action in ['list', 'retrieve', 'related']:
+        if self.action in ['list', 'retrieve', 'related', 'search', 'facets', 'batch']:
             return [AllowAny()]
         return [permission() for permission in self.permission_classes]
 
@@ -143,36 +394,48 @@ class ProductViewSet(viewsets.ModelViewSet):
             .first()
         )
 
-    def _enforce_subscription_limits(self, user):
-        """Ensure user has an active subscription and is within product limits.
+    def _subscription_quota(self, user):
+        """Return ``(error_response, max_products, current_count)`` for the user.
 
-        Returns ``None`` when checks pass, or a DRF ``Response`` when they fail.
+        ``error_response`` is a DRF ``Response`` when the user has no active
+        subscription; ``max_products`` is ``None`` when there is no limit.
         """
         # Staff/admin users can always manage products without subscription checks
         if getattr(user, 'is_staff', False):
-            return None
+            return None, None, None
 
         active_user_sub = self._get_active_user_subscription(user)
         if not active_user_sub:
             return Response(
                 {'detail': 'You must have an active subscription before adding products.'},
                 status=status.HTTP_403_FORBIDDEN,
-            )
+            ), None, None
 
         subscription = active_user_sub.subscription
         max_products = getattr(subscription, 'max_products', 0) or 0
-        if max_products and max_products > 0:
-            # Count products owned by this user that are not marked as taken
-            current_count = Product.objects.filter(owner=user, is_taken=False).count()
-            if current_count >= max_products:
-                return Response(
-                    {
-                        'detail': 'You have reached the maximum number of products for your subscription.',
-                        'max_products': max_products,
-                        'current_products': current_count,
-                    },
-                    status=status.HTTP_403_FORBIDDEN,
-                )
+        if not max_products or max_products <= 0:
+            return None, None, None
+        # Count products owned by this user that are not marked as taken
+        current_count = Product.objects.filter(owner=user, is_taken=False).count()
+        return None, max_products, current_count
+
+    def _enforce_subscription_limits(self, user, adding=1):
+        """Ensure user has an active subscription and room for ``adding`` more products.
+
+        Returns ``None`` when checks pass, or a DRF ``Response`` when they fail.
+        """
+        error_response, max_products, current_count = self._subscription_quota(user)
+        if error_response is not None:
+            return error_response
+        if max_products is not None and current_count + adding > max_products:
+            return Response(
+                {
+                    'detail': 'You have reached the maximum number of products for your subscription.',
+                    'max_products': max_products,
+                    'current_products': current_count,
+                },
+                status=status.HTTP_403_FORBIDDEN,
+            )
         return None
 
     def create(self, request, *args, **kwargs):
@@ -208,13 +471,74 @@ class ProductViewSet(viewsets.ModelViewSet):
         except Exception:
             pass
 
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser])
+    @extend_schema(
+        request={
+            'multipart/form-data': {
+                'type': 'object',
+                'properties': {
+                    'file': {'type': 'string', 'format': 'binary'},
+                    'file_format': {'type': 'string', 'enum': ['csv', 'ndjson', 'json']},
+                    'dry_run': {'type': 'boolean'},
+                    'owner': {'type': 'integer', 'description': 'Staff only: import on behalf of this user.'},
+                },
+                'required': ['file'],
+            }
+        },
+        responses={200: ProductImportResultSerializer, 201: ProductImportResultSerializer, 400: ProductImportResultSerializer},
+        operation_id='product_import',
+        description=(
+            'Create many products from an uploaded CSV, NDJSON or JSON file. Rows are '
+            'validated one by one and reported with their row number; valid rows are '
+            'inserted in chunks as PENDING products. The subscription quota is checked '
+            'once for the whole file. If the file becomes unreadable partway through, '
+            'rows before the bad line are still imported and `read_error` gives the line '
+            '(400 when nothing was created). See `apiv1.importing` for the row format.'
+        ),
+    )
+    def import_products(self, request):
+        """Bulk-create products from a file (see ``apiv1.importing``)."""
+        from apiv1.importing import FORMATS, ProductImporter, detect_format, read_rows
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'detail': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('file_format') or detect_format(upload.name)
+        if file_format not in FORMATS:
+            return Response({'detail': 'file_format must be one of: csv, ndjson, json'}, status=status.HTTP_400_BAD_REQUEST)
+
+        owner = request.user
+        if request.user.is_staff and request.data.get('owner'):
+            owner = get_user_model().objects.filter(pk=request.data['owner']).first()
+            if owner is None:
+                return Response({'detail': 'Owner not found'}, status=status.HTTP_400_BAD_REQUEST)
+
+        error_response, max_products, current_count = self._subscription_quota(owner)
+        if error_response is not None:
+            return error_response
+        limit = None if max_products is None else max(max_products - current_count, 0)
+
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true')
+        importer = ProductImporter(owner, limit=limit, dry_run=dry_run)
+        result = importer.run(read_rows(upload, file_format))
+        # Products created before an unreadable line are kept and listed, so
+        # the response is the import result even when reading failed.
+        if result.created_ids:
+            response_status = status.HTTP_201_CREATED
+        elif result.read_error:
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_200_OK
+        return Response(result.as_dict(), status=response_status)
+
     @action(detail=False, methods=['get'], url_path='related')
     def related(self, request):
         """Return products related to a given product.
 
         Expects a ``product_id`` query parameter for the *source* product.
-        Uses that product's category, subcategory, features and name to
-        find similar ACTIVE products.
+        Neighbours come from the precomputed ``RelatedProduct`` table (see
+        ``build_related_products``); products not indexed yet fall back to
+        matching on category, subcategory, features and name.
         """
         from django.db.models import Q
 
@@ -227,6 +551,15 @@ class ProductViewSet(viewsets.ModelViewSet):
         except Product.DoesNotExist:
             return Response({'detail': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
 
+        indexed = list(
+            self.shape_queryset(Product.objects)
+            .filter(neighbour_of__product_id=base_product.id, status=ProductStatus.ACTIVE.value)
+            .with_engagement(request.user)
+            .order_by('neighbour_of__rank')
+        )
+        if indexed:
+            return Response(self.get_serializer(indexed, many=True).data)
+
         # Start from ACTIVE products only and exclude the base product itself
         qs = Product.objects.filter(status=ProductStatus.ACTIVE.value).exclude(id=base_product.id)
 
@@ -258,21 +591,76 @@ class ProductViewSet(viewsets.ModelViewSet):
         if name:
             qs = qs.filter(Q(name__icontains=name) | Q(description__icontains=name))
 
-        qs = qs.distinct().order_by('-created_at')[:50]
+        qs = self.shape_queryset(qs.distinct()).with_engagement(request.user).order_by('-created_at')[:50]
         return Response(self.get_serializer(qs, many=True).data)
 
+    @action(detail=False, methods=['get'], url_path='search')
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='q', type=str, location=OpenApiParameter.QUERY, required=True,
+                             description='Search terms; each term also matches as a prefix.'),
+            OpenApiParameter(name='category', type=int, location=OpenApiParameter.QUERY, required=False),
+            OpenApiParameter(name='location', type=int, location=OpenApiParameter.QUERY, required=False),
+            OpenApiParameter(name='status', type=str, location=OpenApiParameter.QUERY, required=False,
+                             description='Defaults to ACTIVE for non-staff users.'),
+            OpenApiParameter(name='limit', type=int, location=OpenApiParameter.QUERY, required=False),
+            OpenApiParameter(name='offset', type=int, location=OpenApiParameter.QUERY, required=False),
+        ],
+        responses={200: ProductSerializer(many=True), 400: ErrorDetailSerializer},
+        operation_id='product_search',
+        description='Full-text product search ranked by relevance (best match first).',
+    )
+    def search(self, request):
+        """Rank products against ``q`` using the configured search backend.
+
+        Results respect the same visibility rules as the product list.
+        """
+        query = (request.query_params.get('q') or '').strip()
+        if not query:
+            return Response({'detail': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            category = int(request.query_params['category']) if request.query_params.get('category') else None
+            location = int(request.query_params['location']) if request.query_params.get('location') else None
+            limit = min(max(int(request.query_params.get('limit') or 20), 1), 100)
+            offset = max(int(request.query_params.get('offset') or 0), 0)
+        except ValueError:
+            return Response({'detail': 'category, location, limit and offset must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        status_value = request.query_params.get('status')
+        if status_value and status_value not in [tag.value for tag in ProductStatus]:
+            return Response({'detail': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
+        if not status_value and not getattr(request.user, 'is_staff', False):
+            status_value = ProductStatus.ACTIVE.value
+
+        # Visibility and filters go in before the slice so hidden hits cannot
+        # leave a page short.
+        qs = self.get_queryset()
+        if category is not None:
+            qs = qs.filter(category_id=category)
+        if location is not None:
+            qs = qs.filter(location_id=location)
+        if status_value:
+            qs = qs.filter(status=status_value)
+        backend = get_search_backend()
+        qs = backend.ranked(qs, query)
+        qs = qs.order_by('-search_rank', '-created_at') if backend.full_text else qs.order_by('-created_at')
+        return Response(self.get_serializer(qs[offset:offset + limit], many=True).data)
+
     @action(detail=True, methods=['post'], url_path='favourite')
     def favourite(self, request, pk=None):
         """Toggle favourite status of a product for the current user."""
         if not request.user.is_authenticated:
             return Response({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
         product = self.get_object()
-        fav, created = Favourite.objects.get_or_create(user=request.user, product=product)
-        if not created:
-            fav.delete()
-            state = 'removed'
-        else:
-            state = 'added'
+        with transaction.atomic():
+            fav, created = Favourite.objects.get_or_create(user=request.user, product=product)
+            if not created:
+                fav.delete()
+                state = 'removed'
+            else:
+                state = 'added'
+            Product.adjust_counters(product.pk, favourites_count=1 if created else -1)
         return Response({'status': state})
 
     @action(detail=False, methods=['get'], url_path='favourites')
@@ -280,7 +668,15 @@ class ProductViewSet(viewsets.ModelViewSet):
         """Return list of the current user's favourite products."""
         if not request.user.is_authenticated:
             return Response({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
-        qs = Product.objects.filter(favourited_by__user=request.user).order_by('-created_at')
+        qs = (
+            self.shape_queryset(Product.objects)
+            .filter(favourited_by__user=request.user)
+            .with_engagement(request.user)
+            .order_by('-created_at')
+        )
+        page = self.paginate_queryset(qs)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
         serializer = self.get_serializer(qs, many=True)
         return Response(serializer.data)
 
@@ -290,12 +686,14 @@ class ProductViewSet(viewsets.ModelViewSet):
         if not request.user.is_authenticated:
             return Response({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
         product = self.get_object()
-        like, created = ProductLike.objects.get_or_create(user=request.user, product=product)
-        if not created:
-            like.delete()
-            state = 'removed'
-        else:
-            state = 'added'
+        with transaction.atomic():
+            like, created = ProductLike.objects.get_or_create(user=request.user, product=product)
+            if not created:
+                like.delete()
+                state = 'removed'
+            else:
+                state = 'added'
+            Product.adjust_counters(product.pk, likes_count=1 if created else -1)
         return Response({'status': state})
 
     @action(detail=True, methods=['post'], url_path='report')
@@ -308,11 +706,14 @@ class ProductViewSet(viewsets.ModelViewSet):
         message = request.data.get('message')
         if reason not in dict(ProductReport.REASON_CHOICES):
             return Response({'detail': 'Invalid reason'}, status=status.HTTP_400_BAD_REQUEST)
-        report, created = ProductReport.objects.get_or_create(
-            product=product,
-            user=request.user,
-            defaults={'reason': reason, 'message': message},
-        )
+        with transaction.atomic():
+            report, created = ProductReport.objects.get_or_create(
+                product=product,
+                user=request.user,
+                defaults={'reason': reason, 'message': message},
+            )
+            if created:
+                Product.adjust_counters(product.pk, reports_count=1)
         if not created:
             # Update existing report
             report.reason = reason
@@ -458,45 +859,80 @@ class ProductViewSet(viewsets.ModelViewSet):
         if error_response is not None:
             return error_response
 
-        # Clone the product record (excluding PK and relational counters)
-        clone = Product.objects.create(
-            owner=owner,
-            name=original.name,
-            image = original.image,
-            description=original.description,
-            category=original.category,
-            price=original.price,
-            location=original.location,
-            status=ProductStatus.ACTIVE.value,
-            is_taken=False,
-        )
-
-        # Persistent counters: reposting creates a new ad
-        try:
-            if owner and hasattr(owner, 'total_ads') and getattr(owner, 'pk', None):
-                owner.__class__.objects.filter(pk=owner.pk).update(total_ads=models.F('total_ads') + 1)
-        except Exception:
-            pass
-
-        # Copy product features
-        for pf in original.product_features.all():
-            ProductFeature.objects.create(
-                product=clone,
-                feature=pf.feature,
-                value=pf.value,
-            )
-
-        # Copy images
-        for img in original.images.all():
-            ProductImage.objects.create(
-                product=clone,
-                image=img.image,
-            )
+        clone, = clone_products(list(repostable_products([original.pk])))
 
         serializer = ProductSerializer(clone, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+    @action(detail=False, methods=['post'], url_path='bulk-repost')
+    @extend_schema(
+        request=BulkRepostSerializer,
+        responses={201: BulkRepostResultSerializer(many=True), 400: ErrorDetailSerializer},
+        operation_id='product_bulk_repost',
+        description=(
+            'Repost several taken products in one request. Each id gets its own '
+            'result; the subscription limit is checked once per owner for the '
+            'whole batch.'
+        ),
+        examples=[
+            OpenApiExample('Bulk repost example', value={"ids": [12, 15, 19]}, request_only=True),
+        ],
+    )
+    def bulk_repost(self, request):
+        """Clone many taken products at once.
+
+        Applies the same rules as `repost_ad` per item. Products that pass are
+        cloned together in one transaction; the response lists one result per
+        requested id, in request order.
+        """
+        serializer = BulkRepostSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+
+        originals = {product.pk: product for product in repostable_products(ids)}
+        errors, by_owner = {}, {}
+        for pk in ids:
+            original = originals.get(pk)
+            if original is None:
+                errors[pk] = 'Product not found'
+            elif original.owner is None:
+                errors[pk] = 'Product has no owner assigned'
+            elif request.user != original.owner and not request.user.is_staff:
+                errors[pk] = 'Only the product owner can repost this ad'
+            elif not original.is_taken:
+                errors[pk] = 'Only taken products can be reposted'
+            else:
+                by_owner.setdefault(original.owner, []).append(pk)
+
+        accepted = []
+        for owner, owner_ids in by_owner.items():
+            error_response = self._enforce_subscription_limits(owner, adding=len(owner_ids))
+            if error_response is not None:
+                for pk in owner_ids:
+                    errors[pk] = error_response.data['detail']
+            else:
+                accepted.extend(owner_ids)
+
+        accepted.sort(key=ids.index)
+        clones = clone_products([originals[pk] for pk in accepted])
+        clone_ids = {pk: clone.pk for pk, clone in zip(accepted, clones)}
+        rendered = {}
+        if clones:
+            queryset = Product.objects.filter(pk__in=clone_ids.values()).with_engagement(request.user).with_details()
+            rendered = {
+                item['id']: item
+                for item in ProductSerializer(queryset, many=True, context={'request': request}).data
+            }
+
+        results = []
+        for pk in ids:
+            if pk in clone_ids:
+                results.append({'id': pk, 'status': 'created', 'product': rendered[clone_ids[pk]]})
+            else:
+                results.append({'id': pk, 'status': 'error', 'detail': errors[pk]})
+        return Response(results, status=status.HTTP_201_CREATED if clones else status.HTTP_400_BAD_REQUEST)
+
     @action(detail=True, methods=['put'], url_path='set-status', permission_classes=[permissions.IsAdminUser])
     @extend_schema(
         request=AdminChangeProductStatusSerializer,
@@ -540,7 +976,10 @@ class ProductViewSet(viewsets.ModelViewSet):
             # Clear any previous suspension note when leaving suspended state
             product.suspension_note = None
 
-        product.save(update_fields=['status', 'suspension_note', 'updated_at'])
+        # Moderated: release any moderation-queue claim.
+        product.claimed_by = None
+        product.claimed_until = None
+        product.save(update_fields=['status', 'suspension_note', 'claimed_by', 'claimed_until', 'updated_at'])
         # generate product approval alert if possible
         if new_status in ["VERIFIED", ProductStatus.ACTIVE.value]:
             owner = None
@@ -562,19 +1001,159 @@ class ProductViewSet(viewsets.ModelViewSet):
         return Response(ProductSerializer(product, context={'request': request}).data)
 
 
+    @action(detail=False, methods=['post'], url_path='batch-set-status', permission_classes=[permissions.IsAdminUser])
+    @extend_schema(
+        request=AdminBatchProductStatusSerializer,
+        responses={200: AdminBatchProductStatusResultSerializer, 400: ErrorDetailSerializer},
+        operation_id='product_batch_set_status',
+        description=(
+            'Apply one status (and suspension note) to many products. Staff-only. '
+            'Owners of newly approved products get an alert; push/SMS delivery '
+            'happens in the background.'
+        ),
+        examples=[
+            OpenApiExample(
+                'Batch approve example',
+                value={"ids": [42, 43, 44], "status": "ACTIVE"},
+                request_only=True,
+            )
+        ]
+    )
+    def batch_set_status(self, request):
+        """Moderate many products with a single UPDATE. Staff-only."""
+        from apiv1.models import RelatedProduct
+        from apiv1.related import schedule_refresh
+
+        serializer = AdminBatchProductStatusSerializer(data=request.data)
+        if not serializer.is_valid():
+            first_field, errors = next(iter(serializer.errors.items()))
+            first_error = errors[0] if isinstance(errors, list) else errors
+            return Response({'detail': f'{first_field}: {first_error}'}, status=status.HTTP_400_BAD_REQUEST)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        new_status = serializer.validated_data['status']
+        suspension_note = (
+            serializer.validated_data.get('suspension_note')
+            if new_status == ProductStatus.SUSPENDED.value else None
+        )
+
+        rows = list(Product.objects.filter(pk__in=ids).values_list('id', 'owner_id', 'name', 'status'))
+        found_set = {pk for pk, _, _, _ in rows}
+        found = [pk for pk in ids if pk in found_set]
+        alerts = []
+        if new_status == ProductStatus.ACTIVE.value:
+            # Only products that were not approved already notify their owner.
+            alerts = [
+                Alert(
+                    user_id=owner_id,
+                    title='Product approved',
+                    body=f'Your product "{name}" has been approved.',
+                    kind='PRODUCT_APPROVED',
+                )
+                for _, owner_id, name, old_status in rows
+                if owner_id and old_status != new_status
+            ]
+
+        with transaction.atomic():
+            Product.objects.filter(pk__in=found).update(
+                status=new_status, suspension_note=suspension_note,
+                claimed_by=None, claimed_until=None, updated_at=timezone.now(),
+            )
+            if new_status == ProductStatus.ACTIVE.value:
+                schedule_refresh(*found)
+            else:
+                RelatedProduct.objects.filter(product_id__in=found).delete()
+            Alert.objects.bulk_create(alerts)
+            dispatch_alerts(alert.pk for alert in alerts)
+
+        # update() skips the post_save signals; repeat their bookkeeping once.
+        try:
+            get_search_backend().index(Product.objects.filter(pk__in=found).only(
+                'id', 'name', 'description', 'category_id', 'location_id', 'status',
+            ))
+        except Exception:
+            logger.exception('Failed to reindex %s moderated products', len(found))
+        catalog_cache.bump_generation()
+
+        return Response({
+            'updated': found,
+            'not_found': [pk for pk in ids if pk not in found_set],
+            'alerts_created': len(alerts),
+        })
+
+
+    @action(detail=False, methods=['post'], url_path='moderation-queue', permission_classes=[permissions.IsAdminUser])
+    @extend_schema(
+        request=ModerationQueueRequestSerializer,
+        responses={200: ModerationQueueResponseSerializer, 400: ErrorDetailSerializer},
+        operation_id='product_moderation_queue',
+        description=(
+            'Claim the next `limit` PENDING products, oldest first. Staff-only. '
+            'Claims last MODERATION_CLAIM_TTL seconds and are released when the '
+            'product is moderated; products claimed by another moderator are skipped. '
+            'Products already claimed by the caller are returned again.'
+        ),
+    )
+    def moderation_queue(self, request):
+        """Hand out PENDING products to concurrent moderators without overlap."""
+        from datetime import timedelta
+        from django.db.models import Q
+
+        serializer = ModerationQueueRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            first_field, errors = next(iter(serializer.errors.items()))
+            return Response({'detail': f'{first_field}: {errors[0]}'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = serializer.validated_data['limit']
+
+        now = timezone.now()
+        claimed_until = now + timedelta(seconds=getattr(settings, 'MODERATION_CLAIM_TTL', 900))
+        claimable = Product.objects.filter(status=ProductStatus.PENDING.value).filter(
+            Q(claimed_until__isnull=True) | Q(claimed_until__lt=now) | Q(claimed_by=request.user)
+        )
+        with transaction.atomic():
+            # Rows another moderator is claiming right now are skipped, not waited on.
+            ids = list(
+                claimable.select_for_update(skip_locked=True, of=('self',))
+                .order_by('created_at', 'id')
+                .values_list('id', flat=True)[:limit]
+            )
+            # The conditional UPDATE keeps claims exclusive on backends
+            # without row locks (SQLite ignores select_for_update).
+            claimable.filter(pk__in=ids).update(claimed_by=request.user, claimed_until=claimed_until)
+
+        products = (
+            Product.objects.filter(pk__in=ids, claimed_by=request.user, claimed_until=claimed_until)
+            .with_engagement(request.user)
+            .with_details()
+            .order_by('created_at', 'id')
+        )
+        results = ProductSerializer(products, many=True, context={'request': request}).data
+        return Response({'claimed_until': claimed_until if results else None, 'results': results})
+
+
 class ProductImageViewSet(viewsets.ModelViewSet):
     queryset = ProductImage.objects.all().order_by('-created_at')
     serializer_class = ProductImageSerializer
     permission_classes = [AllowAny]
     filterset_fields = ['product']
+    pagination_class = OptionalKeysetPagination
 
 
-class FeatureViewSet(viewsets.ModelViewSet):
+class FeatureViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Feature.objects.all().order_by('name')
     serializer_class = FeatureSerializer
     permission_classes = [AllowAny]
     filterset_fields = ['subcategory']
 
+    def get_list_validators(self, queryset):
+        # Features embed their possible values, so those rows count too.
+        etag, last_modified = super().get_list_validators(queryset)
+        values = PosibleFeatureValue.objects.filter(feature__in=queryset).order_by().aggregate(
+            total=models.Count('pk'), last_modified=models.Max('updated_at'),
+        )
+        if values['last_modified'] and (last_modified is None or values['last_modified'] > last_modified):
+            last_modified = values['last_modified']
+        return make_etag(etag, values['total'], values['last_modified']), last_modified
+
     @action(detail=True, methods=['get', 'post', 'patch'], url_path='possible-values')
     def possible_values(self, request, pk=None):
         """List, create or update possible values for this feature.
@@ -650,7 +1229,18 @@ class ReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [AllowAny]
     filterset_fields = ['product', 'user']
-    
+    pagination_class = OptionalKeysetPagination
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):  # pragma: no cover
+            return Review.objects.none()
+        return (
+            Review.objects
+            .prefetch_related(prefetch_user(), prefetch_product(self.request.user))
+            .annotate(num_likes=models.Count('likes'))
+            .order_by('-created_at')
+        )
+
     def get_serializer_class(self):
         # Use a write-oriented serializer for creates to accept FK ids directly
         if getattr(self, 'action', None) == 'create':
@@ -667,7 +1257,9 @@ class ReviewViewSet(viewsets.ModelViewSet):
         if not self.request.user.is_authenticated:
             return Response({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        review = serializer.save(user=self.request.user)
+        with transaction.atomic():
+            review = serializer.save(user=self.request.user)
+            Product.adjust_counters(review.product_id, reviews_count=1, rating_sum=review.rating)
 
         # Send an alert and SMS to the product owner when a new review is created
         product = getattr(review, 'product', None)
@@ -694,6 +1286,18 @@ class ReviewViewSet(viewsets.ModelViewSet):
                 # Never fail the main request because of SMS
                 pass
 
+    def perform_update(self, serializer):
+        # The product is read-only on updates, so only the rating can move.
+        previous_rating = serializer.instance.rating
+        with transaction.atomic():
+            review = serializer.save()
+            Product.adjust_counters(review.product_id, rating_sum=review.rating - previous_rating)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            Product.adjust_counters(instance.product_id, reviews_count=-1, rating_sum=-instance.rating)
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def like(self, request, pk=None):
         """Toggle like on a review for the authenticated user."""
@@ -717,13 +1321,14 @@ class MessageViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
     filterset_fields = ['room']
+    pagination_class = OptionalKeysetPagination
 
     def get_queryset(self):
         # During schema generation, spectacular sets swagger_fake_view to True
         if getattr(self, 'swagger_fake_view', False):  # pragma: no cover
             return Message.objects.none()
         user = self.request.user
-        return Message.objects.filter(room__members=user, room__is_deleted=False).order_by('-created_at')
+        return Message.objects.filter(room__members=user, room__is_deleted=False).with_read_state().order_by('-created_at')
 
 
 class ChatRoomViewSet(viewsets.ReadOnlyModelViewSet):
@@ -733,13 +1338,51 @@ class ChatRoomViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):  # pragma: no cover
             return ChatRoom.objects.none()
-        return ChatRoom.objects.filter(members=self.request.user, is_deleted=False).order_by('-created_at')
+        if self.action not in ('list', 'retrieve'):
+            # Room actions only need the room itself.
+            return ChatRoom.objects.filter(members=self.request.user, is_deleted=False).order_by('-created_at')
+        qs = chatroom_list_queryset(self.request.user).order_by('-created_at')
+        # Nested blocks are only loaded when the response renders them.
+        if field_requested(self.request, 'members'):
+            qs = qs.prefetch_related(prefetch_user('members'))
+        if field_requested(self.request, 'messages'):
+            qs = qs.prefetch_related(
+                models.Prefetch('messages', queryset=Message.objects.with_read_state().prefetch_related(prefetch_user('sender')))
+            )
+        return qs
 
     @action(detail=True, methods=['get'])
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='before', type=int, location=OpenApiParameter.QUERY, required=False,
+                             description='Return messages older than this message id.'),
+            OpenApiParameter(name='limit', type=int, location=OpenApiParameter.QUERY, required=False,
+                             description=f'Messages per page (default {HISTORY_LIMIT}, max {MAX_HISTORY_LIMIT}).'),
+        ],
+        description=(
+            'Room history, oldest first. Sending `before` or `limit` returns one window '
+            '`{messages, before, has_more}` (the same contract as the chat websocket); '
+            'page backwards with `before` set to the oldest id received. Without either '
+            'parameter the full history is returned as a list.'
+        ),
+    )
     def messages(self, request, pk=None):
         room = self.get_object()
-        msgs = room.messages.order_by('created_at')
-        return Response(MessageSerializer(msgs, many=True).data)
+        queryset = Message.objects.with_read_state().prefetch_related(prefetch_user('sender'))
+        params = request.query_params
+        if 'before' not in params and 'limit' not in params:
+            msgs = queryset.filter(room=room).order_by('created_at')
+            return Response(MessageSerializer(msgs, many=True).data)
+        try:
+            before, limit = history_params(params.get('before'), params.get('limit'))
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        msgs, has_more = message_window(room, before, limit, queryset=queryset)
+        return Response({
+            'messages': MessageSerializer(msgs, many=True).data,
+            'before': before,
+            'has_more': has_more,
+        })
 
     @action(detail=True, methods=['post'])
     def send(self, request, pk=None):
@@ -1520,6 +2163,7 @@ class AlertViewSet(viewsets.ModelViewSet):
     """Users can manage their in-app alerts; admins can manage all. When creating an alert as an admin, you can specify the target user by setting the 'user' field in the alert data."""
     serializer_class = AlertSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
 
     def get_queryset(self):
         # During schema generation, spectacular sets swagger_fake_view to True
@@ -1623,7 +2267,7 @@ class AccountDeleteRequestViewSet(viewsets.ModelViewSet):
         return Response({'status': 'rejected'})
 
 
-class PrivacyPolicyViewSet(viewsets.ModelViewSet):
+class PrivacyPolicyViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Admin CRUD for privacy policies; public read access to latest version."""
 
     queryset = PrivacyPolicy.objects.all().order_by('-date', '-created_at')
@@ -1643,10 +2287,11 @@ class PrivacyPolicyViewSet(viewsets.ModelViewSet):
         obj = PrivacyPolicy.objects.all().order_by('-date', '-created_at').first()
         if not obj:
             return Response({'detail': 'No privacy policy found'}, status=status.HTTP_404_NOT_FOUND)
-        return Response(self.get_serializer(obj).data)
+        etag, last_modified = make_etag(obj.pk, obj.updated_at.isoformat()), obj.updated_at
+        return self.conditional_response(request, etag, last_modified, lambda: Response(self.get_serializer(obj).data))
 
 
-class TermsAndConditionsViewSet(viewsets.ModelViewSet):
+class TermsAndConditionsViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Admin CRUD for T&C; public read access to latest version."""
 
     queryset = TermsAndConditions.objects.all().order_by('-date', '-created_at')
@@ -1666,7 +2311,8 @@ class TermsAndConditionsViewSet(viewsets.ModelViewSet):
         obj = TermsAndConditions.objects.all().order_by('-date', '-created_at').first()
         if not obj:
             return Response({'detail': 'No terms and conditions found'}, status=status.HTTP_404_NOT_FOUND)
-        return Response(self.get_serializer(obj).data)
+        etag, last_modified = make_etag(obj.pk, obj.updated_at.isoformat()), obj.updated_at
+        return self.conditional_response(request, etag, last_modified, lambda: Response(self.get_serializer(obj).data))
 
 
 class ProductReportViewSet(viewsets.ReadOnlyModelViewSet):
@@ -1680,9 +2326,14 @@ class ProductReportViewSet(viewsets.ReadOnlyModelViewSet):
         if getattr(self, 'swagger_fake_view', False):  # pragma: no cover
             return ProductReport.objects.none()
         user = self.request.user
+        qs = (
+            ProductReport.objects
+            .prefetch_related(prefetch_user(), prefetch_product(user))
+            .order_by('-created_at')
+        )
         if user.is_staff:
-            return ProductReport.objects.select_related('product', 'user').order_by('-created_at')
-        return ProductReport.objects.select_related('product').filter(user=user).order_by('-created_at')
+            return qs
+        return qs.filter(user=user)
 
 
 class WalletCashoutRequestViewSet(viewsets.ReadOnlyModelViewSet):
@@ -0,0 +1,78 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Alert
+from .utils import send_push_notification, send_sms
+
+logger = logging.getLogger(__name__)
+
+
+def deliver_alert(alert: Alert) -> None:
+    """Send push + SMS for one alert (best-effort; never raises)."""
+    try:
+        # Keep payload small and string-only for FCM data payload compatibility.
+        data_payload = {
+            'kind': (alert.kind or ''),
+            'alert_id': str(alert.id),
+        }
+        send_push_notification(
+            alert.user,
+            alert.title,
+            alert.body or '',
+            data_payload=data_payload,
+        )
+
+        # Fire-and-forget an SMS notification as well (best-effort).
+        try:
+            phone = getattr(alert.user, 'preferred_notification_phone', None) or getattr(alert.user, 'phone', None)
+            phone = (str(phone).strip() if phone else '')
+            if phone and getattr(settings, 'ARKESEL_API_KEY', ''):
+                sms_text = f"{(alert.title or '').strip()} {(alert.body or '').strip()}".strip()
+                sms_text = ' '.join(sms_text.split())  # collapse whitespace/newlines
+                if alert.kind == 'ACCOUNT_CREATED':
+                    sms_text += "\nLogin to your account to get started. https://www.oysloe.com"
+                if sms_text:
+                    def _sms_send(recipient: str, message: str):
+                        try:
+                            send_sms(message=message, recipients=[recipient])
+                        except Exception:
+                            logger.exception('Failed to send SMS notification for Alert')
+
+                    threading.Thread(target=_sms_send, args=(phone, sms_text), daemon=True).start()
+        except Exception:
+            logger.exception('Failed to queue SMS notification for Alert')
+
+    except Exception:
+        # Never fail alert creation due to push issues.
+        logger.exception('Failed to send push notification for Alert')
+
+
+def deliver_alerts(alert_ids) -> None:
+    """Deliver a batch of alerts, loading them (and their users) in one query."""
+    for alert in Alert.objects.filter(pk__in=alert_ids).select_related('user').order_by('id'):
+        deliver_alert(alert)
+
+
+def dispatch_alerts(alert_ids) -> None:
+    """Deliver alerts on a background thread once the current transaction commits.
+
+    Used for alerts created with ``bulk_create``, which skips the post_save
+    signal that delivers single alerts inline.
+    """
+    alert_ids = list(alert_ids)
+    if not alert_ids:
+        return
+
+    def _run():
+        try:
+            deliver_alerts(alert_ids)
+        except Exception:
+            logger.exception('Failed to dispatch %s alerts', len(alert_ids))
+        finally:
+            # The thread opened its own connection; don't leak it.
+            connection.close()
+
+    transaction.on_commit(lambda: threading.Thread(target=_run, daemon=True).start())
@@ -101,6 +101,11 @@ if environment == 'development':
             'BACKEND': 'channels.layers.InMemoryChannelLayer',
         },
     }
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
 else:
     redis_host = os.getenv('REDIS_HOST', '127.0.0.1')
     try:
@@ -117,6 +122,31 @@ else:
             },
         },
     }
+    # Shared cache so every worker sees the same entries and invalidations.
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_URL', f'redis://{redis_host}:{redis_port}/1'),
+        },
+    }
+
+# Seconds an anonymous product listing response stays cached (0 disables it).
+try:
+    PRODUCT_LIST_CACHE_TTL = int(os.getenv('PRODUCT_LIST_CACHE_TTL', '300'))
+except ValueError:
+    PRODUCT_LIST_CACHE_TTL = 300
+
+# Seconds a moderator keeps the products claimed from the moderation queue.
+try:
+    MODERATION_CLAIM_TTL = int(os.getenv('MODERATION_CLAIM_TTL', '900'))
+except ValueError:
+    MODERATION_CLAIM_TTL = 900
+
+# Seconds each user's total unread chat count stays mirrored in the cache (0 disables it).
+try:
+    CHAT_UNREAD_CACHE_TTL = int(os.getenv('CHAT_UNREAD_CACHE_TTL', '300'))
+except ValueError:
+    CHAT_UNREAD_CACHE_TTL = 300
 
 
 
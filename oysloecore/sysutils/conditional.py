@@ -0,0 +1,73 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts) -> str:
+    """Build a strong, quoted ETag from the given parts."""
+    raw = '|'.join(str(part) for part in parts)
+    return quote_etag(hashlib.sha1(raw.encode('utf-8')).hexdigest())
+
+
+class ConditionalGetMixin:
+    """ETag / Last-Modified support for read endpoints.
+
+    Validators are computed before anything is serialized: lists use
+    ``COUNT(*)`` and ``MAX(updated_at)`` of the filtered queryset, details
+    use the object's ``updated_at``. A matching ``If-None-Match`` or
+    ``If-Modified-Since`` gets an empty 304. Views override
+    ``get_list_validators`` / ``get_detail_validators`` when the response
+    depends on more than those rows.
+    """
+    conditional_actions = ('list', 'retrieve')
+    # Request headers the validators depend on (e.g. Authorization for per-user payloads).
+    conditional_vary = ()
+
+    def get_list_validators(self, queryset):
+        stats = queryset.order_by().aggregate(total=Count('pk'), last_modified=Max('updated_at'))
+        last_modified = stats['last_modified']
+        etag = make_etag(self.request.get_full_path(), stats['total'], last_modified and last_modified.isoformat())
+        return etag, last_modified
+
+    def get_detail_validators(self):
+        obj = self.get_object()
+        # Reused by retrieve() so the object is only fetched once.
+        self._conditional_object = obj
+        return make_etag(self.request.get_full_path(), obj.pk, obj.updated_at.isoformat()), obj.updated_at
+
+    def get_object(self):
+        obj = getattr(self, '_conditional_object', None)
+        return obj if obj is not None else super().get_object()
+
+    def conditional_response(self, request, etag, last_modified, render):
+        """Return a 304 when the client's copy is current, else ``render()`` with validators set."""
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request._request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = render()
+            if response.status_code == 200:
+                if etag:
+                    response['ETag'] = etag
+                if timestamp is not None:
+                    response['Last-Modified'] = http_date(timestamp)
+        if self.conditional_vary:
+            patch_vary_headers(response, self.conditional_vary)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if self.action not in self.conditional_actions:
+            return super().list(request, *args, **kwargs)
+        etag, last_modified = self.get_list_validators(self.filter_queryset(self.get_queryset()))
+        return self.conditional_response(
+            request, etag, last_modified, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.action not in self.conditional_actions:
+            return super().retrieve(request, *args, **kwargs)
+        etag, last_modified = self.get_detail_validators()
+        return self.conditional_response(
+            request, etag, last_modified, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
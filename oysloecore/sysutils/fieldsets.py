@@ -0,0 +1,71 @@
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import ListSerializer
+
+
+def _split(value) -> set:
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+def sparse_params(request):
+    """Return ``(fields, omit, expand)`` from the query string.
+
+    ``fields`` is ``None`` when not given (render everything). Only read
+    requests are trimmed so writes keep validating every field.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None, set(), set()
+    params = request.query_params
+    fields = _split(params.get('fields')) or None
+    return fields, _split(params.get('omit')), _split(params.get('expand'))
+
+
+def field_requested(request, name: str) -> bool:
+    """Whether the top-level field ``name`` will be rendered for ``request``.
+
+    Views use this to skip joins, prefetches and annotations that only
+    feed fields the client left out.
+    """
+    fields, omit, expand = sparse_params(request)
+    if name in omit:
+        return False
+    return fields is None or name in fields or name in expand
+
+
+class SparseFieldsetsMixin:
+    """Serializer mixin honouring ``?fields=``, ``?omit=`` and ``?expand=``.
+
+    - ``fields=a,b`` renders only those fields; ``omit=c`` drops fields.
+    - ``expand=x`` adds an optional field declared in
+      ``Meta.expandable_fields`` as ``{name: (serializer, kwargs)}``, where
+      ``serializer`` is a class or its dotted path.
+
+    Only the top-level serializer of a response is trimmed; nested
+    serializers render in full. Dropped fields are removed before
+    rendering, so their ``SerializerMethodField`` getters never run.
+    """
+
+    def _is_root(self) -> bool:
+        parent = self.parent
+        return parent is None or (isinstance(parent, ListSerializer) and parent.parent is None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_root():
+            return fields
+        requested, omit, expand = sparse_params(self.context.get('request'))
+
+        expandable = getattr(getattr(self, 'Meta', None), 'expandable_fields', {})
+        for name in expand:
+            if name in expandable and name not in omit:
+                serializer_class, kwargs = expandable[name]
+                if isinstance(serializer_class, str):
+                    serializer_class = import_string(serializer_class)
+                fields[name] = serializer_class(**{'read_only': True, **kwargs})
+
+        if requested is not None:
+            keep = requested | (expand & set(expandable))
+            fields = {name: field for name, field in fields.items() if name in keep}
+        for name in omit:
+            fields.pop(name, None)
+        return fields
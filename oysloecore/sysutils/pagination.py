@@ -0,0 +1,71 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class OptionalKeysetPagination(CursorPagination):
+    """Keyset pagination on ``(created_at, id)`` with an opaque cursor.
+
+    Pagination is opt-in: requests that send neither ``page_size`` nor
+    ``cursor`` get the full, unpaginated list so existing clients keep
+    working while they migrate. Each page is a single indexed range query,
+    so deep pages cost the same as the first one.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    # The cursor position is taken from the leading ordering column alone, so
+    # it must be (nearly) unique; anything else degrades into offsets.
+    keyset_fields = ('created_at',)
+
+    def is_requested(self, request) -> bool:
+        params = request.query_params
+        return self.page_size_query_param in params or self.cursor_query_param in params
+
+    def get_ordering(self, request, queryset, view):
+        """Reject ``?ordering=`` on non-keyset columns and add an ``id`` tiebreaker."""
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        if ordering[0].lstrip('-') not in self.keyset_fields:
+            raise ValidationError({
+                'ordering': f'Paginated results can only be ordered by {", ".join(self.keyset_fields)}.',
+            })
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        for parameter in parameters:
+            if parameter.get('name') == self.page_size_query_param:
+                parameter['description'] = (
+                    f'Opt into cursor pagination with this page size (max {self.max_page_size}). '
+                    'Omit both page_size and cursor to receive the full list.'
+                )
+        return parameters
+
+
+class OptionalOffsetPagination(LimitOffsetPagination):
+    """Opt-in ``page_size`` / ``offset`` pages for orderings a cursor cannot key on.
+
+    Used for relevance-ranked search results, whose order comes from a
+    computed score rather than an indexed column. Like
+    ``OptionalKeysetPagination`` it only applies when ``page_size`` or
+    ``offset`` is sent.
+    """
+    default_limit = OptionalKeysetPagination.page_size
+    limit_query_param = OptionalKeysetPagination.page_size_query_param
+    max_limit = OptionalKeysetPagination.max_page_size
+
+    def is_requested(self, request) -> bool:
+        params = request.query_params
+        return self.limit_query_param in params or self.offset_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -1,7 +1,9 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from decimal import Decimal
+from django.core.cache import cache
 from django.db import transaction
+from django.utils import timezone
 
 
 INVITER_POINTS = 50
@@ -9,6 +11,11 @@ INVITEE_POINTS = 5
 INVITER_CASH = Decimal('10.00')
 INVITEE_CASH = Decimal('2.00')
 
+DEFAULT_MULTIPLIER = 1.0
+# Upper bound for cached multipliers; entries for subscribed owners expire
+# earlier when their subscription reaches its end_date.
+MULTIPLIER_CACHE_TTL = 60 * 60
+
 
 @dataclass
 class ReferralResult:
@@ -45,4 +52,53 @@ def apply_referral_bonus(*, inviter, invitee) -> ReferralResult:
 		invitee_points=INVITEE_POINTS,
 		inviter_cash=INVITER_CASH,
 		invitee_cash=INVITEE_CASH,
-	)
\ No newline at end of file
+	)
+
+
+def owner_multiplier_cache_key(owner_id) -> str:
+	return f'owner_multiplier:{owner_id}'
+
+
+def resolve_owner_multipliers(owner_ids) -> dict:
+	"""Return an ``owner_id -> multiplier`` map for the given owners.
+
+	Cached owners are read from the shared cache; the rest are resolved with a
+	single query over their active, unexpired subscriptions (latest first).
+	Owners without one get ``DEFAULT_MULTIPLIER``. Cache entries are dropped
+	when a UserSubscription is saved or deleted (see apiv1.signals).
+	"""
+	from apiv1.models import UserSubscription  # local import to avoid circulars
+
+	ids = {owner_id for owner_id in owner_ids if owner_id is not None}
+	if not ids:
+		return {}
+
+	keys = {owner_multiplier_cache_key(owner_id): owner_id for owner_id in ids}
+	multipliers = {keys[key]: value for key, value in cache.get_many(list(keys)).items()}
+	missing = ids - multipliers.keys()
+	if not missing:
+		return multipliers
+
+	now = timezone.now()
+	rows = (
+		UserSubscription.objects
+		.filter(user_id__in=missing, is_active=True, end_date__gt=now)
+		.order_by('user_id', '-created_at')
+		.values_list('user_id', 'subscription__multiplier', 'end_date')
+	)
+	latest = {}
+	for user_id, multiplier, end_date in rows:
+		latest.setdefault(user_id, (multiplier, end_date))
+
+	for owner_id in missing:
+		multiplier, end_date = latest.get(owner_id, (DEFAULT_MULTIPLIER, None))
+		timeout = MULTIPLIER_CACHE_TTL
+		if end_date is not None:
+			timeout = max(1, min(timeout, int((end_date - now).total_seconds())))
+		cache.set(owner_multiplier_cache_key(owner_id), multiplier, timeout)
+		multipliers[owner_id] = multiplier
+	return multipliers
+
+
+def invalidate_owner_multiplier(owner_id) -> None:
+	cache.delete(owner_multiplier_cache_key(owner_id))